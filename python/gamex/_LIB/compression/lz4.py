@@ -0,0 +1,59 @@
+FRAME_MAGIC = 0x184D2204
+SKIPPABLE_MAGIC = 0x184D2A50
+
+class Lz4:
+    # decodes a block into dst at pos, back references may reach into earlier output (linked blocks), returns the new position
+    @staticmethod
+    def decodeBlock(src: memoryview, dst: memoryview, pos: int = 0) -> int:
+        i = 0; o = pos; n = len(src)
+        while i < n:
+            token = src[i]; i += 1
+            # literals
+            size = token >> 4
+            if size == 15:
+                while True:
+                    b = src[i]; i += 1; size += b
+                    if b != 255: break
+            if size: dst[o:o + size] = src[i:i + size]; i += size; o += size
+            if i >= n: break
+            # match
+            offset = src[i] | (src[i + 1] << 8); i += 2
+            size = token & 15
+            if size == 15:
+                while True:
+                    b = src[i]; i += 1; size += b
+                    if b != 255: break
+            size += 4; start = o - offset
+            if offset <= 0 or start < 0: raise Exception(f'Bad LZ4 offset: {offset}')
+            if offset >= size: dst[o:o + size] = dst[start:start + size]
+            else: pattern = bytes(dst[start:o]); dst[o:o + size] = (pattern * (size // offset + 1))[:size]
+            o += size
+        return o
+
+    # decodes concatenated frames into dst, returns the decoded length
+    @staticmethod
+    def decodeFrame(src: memoryview, dst: memoryview) -> int:
+        src = memoryview(src); i = 0; o = 0; n = len(src)
+        while i + 4 <= n:
+            magic = int.from_bytes(src[i:i + 4], 'little'); i += 4
+            if (magic & 0xFFFFFFF0) == SKIPPABLE_MAGIC: i += 4 + int.from_bytes(src[i:i + 4], 'little'); continue
+            if magic != FRAME_MAGIC: raise Exception(f'Bad LZ4 magic: {magic:x}')
+            flg = src[i]; i += 2 # FLG, BD
+            if flg & 0x08: i += 8 # content size
+            if flg & 0x01: i += 4 # dictionary id
+            i += 1 # header checksum
+            while True:
+                size = int.from_bytes(src[i:i + 4], 'little'); i += 4
+                if size == 0: break
+                if size & 0x80000000: size &= 0x7FFFFFFF; dst[o:o + size] = src[i:i + size]; o += size
+                else: o = Lz4.decodeBlock(src[i:i + size], dst, o)
+                i += size
+                if flg & 0x10: i += 4 # block checksum
+            if flg & 0x04: i += 4 # content checksum
+        return o
+
+    # gets the content size of a frame, or None when the frame does not carry it
+    @staticmethod
+    def frameContentSize(src: bytes) -> int:
+        if len(src) < 15 or int.from_bytes(src[0:4], 'little') != FRAME_MAGIC or not src[4] & 0x08: return None
+        return int.from_bytes(src[6:14], 'little')
@@ -3,6 +3,7 @@ from PyQt6.QtWidgets import QApplication
 from PyQt6.QtCore import Qt
 from PyQt6.QtGui import QSurfaceFormat
 from gamex import PlatformX
+from gamex.core.cache import AssetCache
 from openstk.platforms.eginx import EginXPlatform
 from openstk.platforms.opengl import OpenGLPlatform
 from openstk.platforms.panda3d import Panda3dPlatform
@@ -20,6 +21,9 @@ if __name__ == '__main__':
     # fmt.setOption(QSurfaceFormat.FormatOption.DebugContext)
     # QSurfaceFormat.setDefaultFormat(fmt)
 
+    # the explorer only views assets, so they are shared
+    AssetCache.default = AssetCache()
+
     app = QApplication(sys.argv)
     p = MainPage()
     p.startup()
@@ -14,7 +14,8 @@ class AppHexWidget(QWidget):
         self.max_hexdump_byte_len = 8192
         # content
         value = tab.value
-        if isinstance(value, io.BytesIO): self.viewFile(tab.name, value.read(self.max_hexdump_byte_len), sys.getsizeof(value))
+        # streams include mapped ViewStreams, which size by their view
+        if isinstance(value, io.BufferedIOBase): self.viewFile(tab.name, value.read(self.max_hexdump_byte_len), len(value) if hasattr(value, '__len__') else sys.getsizeof(value))
         else: self.viewFile(tab.name, value, len(value))
 
     def closeEvent(self, e):
@@ -61,7 +62,7 @@ class AppHexWidget(QWidget):
 
     def viewFile(self, filename, content, file_size, file_type = None):
         self.text.setText('Loading your file... Please wait')
-        self.content = content.read(self.max_hexdump_byte_len) if isinstance(content, io.BytesIO) else content
+        self.content = content.read(self.max_hexdump_byte_len) if isinstance(content, io.BufferedIOBase) else content
         self.file_size = file_size
         self.ext, self.encoding, self.type = self.getFileInfo(filename, file_type, self.content)
         if self.type == 'txt': self.showText() # show strings as normal text files
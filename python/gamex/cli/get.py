@@ -3,32 +3,8 @@ import os, asyncio
 from typing import TYPE_CHECKING, Any, Optional, cast
 from argparse import ArgumentParser, _SubParsersAction
 from pydantic import BaseModel
-from .. import getFamily, PlatformX, FileSystem, FileOption
-from ..core.app import ExportManager
-
-class ProgramState:
-    @staticmethod
-    def load(func: callable, defaultValue: object):
-        try:
-            if os.path.exists('./lastChunk.txt'):
-                with open('./lastChunk.txt', 'r') as s:
-                    return func(s.read())
-        except: pass
-        return defaultValue
-
-    @staticmethod
-    def store(func: callable):
-        try:
-            data = func()
-            with open('./lastChunk.txt', 'w') as s:
-                s.write(data)
-        except: clear()
-
-    @staticmethod
-    def clear():
-        try:
-            if os.path.exists('./lastChunk.txt'): os.remove('./lastChunk.txt')
-        except: pass
+from .. import getFamily, PlatformX, FileOption, PathMatcher
+from ..core.app import ExportManager, ExportJournal
 
 def register(subparser: _SubParsersAction[ArgumentParser]) -> None:
     sub = subparser.add_parser("get", help="get files contents")
@@ -37,6 +13,10 @@ def register(subparser: _SubParsersAction[ArgumentParser]) -> None:
     sub.add_argument("-m", "--match", type=str, help="Match")
     sub.add_argument("-o", "--option", type=str, default="Default", help="Option")
     sub.add_argument("-p", "--path", type=str, default="./out", help="Output folder")
+    sub.add_argument("-j", "--jobs", type=int, default=1, help="Decode processes")
+    sub.add_argument("-c", "--checkpoint", type=str, help="Checkpoint journal, defaults to <path>/.export.journal")
+    sub.add_argument("--no-checkpoint", action="store_true", help="Disable the checkpoint journal")
+    sub.add_argument("--no-verify", action="store_true", help="Resume on size only, without hashing outputs")
     def func(args: CLIGetArgs) -> None: asyncio.run(getAsync(args))
     sub.set_defaults(func=func, args_model=CLIGetArgs)
 
@@ -46,11 +26,15 @@ class CLIGetArgs(BaseModel):
     path: Optional[str] = None
     match: Optional[str] = None
     option: Optional[str] = None
+    jobs: Optional[int] = None
+    checkpoint: Optional[str] = None
+    no_checkpoint: bool = False
+    no_verify: bool = False
 
 @staticmethod
 async def getAsync(args: CLIGetArgs) -> None:
     args.option = FileOption[args.option]
-    from_ = ProgramState.load(lambda x: x, 0)
+    from_ = 0
     
     # get family
     family = getFamily(args.family)
@@ -59,9 +43,10 @@ async def getAsync(args: CLIGetArgs) -> None:
     # get resource
     res = family.parseResource(args.uri)
     path = PlatformX.decodePath(args.path)
-    match = FileSystem.createMatcher(args.match) if args.match else None
-
-    # export
-    await ExportManager.exportAsync(family, res, path, match, from_, args.option)
+    match = PathMatcher(args.match) if args.match else None
 
-    ProgramState.clear()
\ No newline at end of file
+    # export, resuming from the checkpoint journal
+    journalPath = None if args.no_checkpoint else args.checkpoint or (os.path.join(path, '.export.journal') if path else None)
+    if not journalPath: await ExportManager.exportAsync(family, res, path, match, from_, args.option, args.jobs or 1); return
+    with ExportJournal(journalPath, not args.no_verify) as journal:
+        await ExportManager.exportAsync(family, res, path, match, from_, args.option, args.jobs or 1, journal)
\ No newline at end of file
@@ -1,18 +1,110 @@
 from __future__ import annotations
-import os, io, asyncio, shutil
-from openstk.core import parallelFor, IStream, IWriteToStream
-from gamex import FileOption, Archive, MultiArchive, ArcBinary, BinaryArchive
+import os, io, asyncio, threading, zlib
+from concurrent.futures import ProcessPoolExecutor
+from openstk.core import parallelFor, IStream, IWriteToStream, BinaryReader
+from gamex import FileOption, FileSource, PathMatcher, Archive, MultiArchive, ArcBinary, BinaryArchive, ViewStream
+from gamex.core.cache import IndexCache
+
+# DecodeState - picklable snapshot of the archive state read by ArcBinary.readDataAt, the state the index cache persists
+# slotted, so a readDataAt reading anything else fails in the decode pool instead of reading a stale or missing attribute
+class DecodeState:
+    __slots__ = IndexCache.STATE_FIELDS
+    def __init__(self, source: BinaryArchive):
+        for k in self.__slots__: setattr(self, k, getattr(source, k))
+
+# decodes one entry from its stored bytes, runs in the decode pool
+def _decodeEntry(arcBinary: ArcBinary, state: object, file: FileSource, raw: object, base: int, option: object) -> bytes:
+    data = arcBinary.readDataAt(state, BinaryReader(ViewStream(memoryview(raw), base)), file, option)
+    return data.getvalue() if hasattr(data, 'getvalue') else bytes(data) if data != None else None
+
+# writes one entry, runs on a writer thread
+def _writeEntry(newPath: str, data: bytes) -> int:
+    if not newPath: return None
+    directory = os.path.dirname(newPath)
+    if directory and not os.path.isdir(directory): os.makedirs(directory, exist_ok = True)
+    with open(newPath, 'wb') as s: s.write(data or b'')
+    return zlib.crc32(data or b'')
+
+# copies a stream, returning the crc32 of the bytes written
+def _copyHashed(src: object, dst: object, hash: int = 0) -> int:
+    while (chunk := src.read(0x100000)): dst.write(chunk); hash = zlib.crc32(chunk, hash)
+    return hash
+
+# crc32 of a file
+def _hashFile(path: str) -> int:
+    hash = 0
+    with open(path, 'rb') as s:
+        while (chunk := s.read(0x100000)): hash = zlib.crc32(chunk, hash)
+    return hash
+
+# tag::ExportJournal[]
+# ExportJournal - append-only checkpoint log of exported entries, one archive\tpath\tsize\thash line each
+class ExportJournal:
+    SyncEvery = 256 # records between fsyncs
+
+    def __init__(self, path: str, verify: bool = True):
+        self.path = path
+        self.verify = verify
+        self.done = {}
+        self.pending = 0
+        self.lock = threading.Lock()
+        line = '\n'
+        if os.path.exists(path):
+            with open(path, 'r', encoding = 'utf-8', newline = '\n') as s:
+                for line in s:
+                    # a torn last line from an interrupted run has no newline and is ignored
+                    if not line.endswith('\n') or len(parts := line[:-1].split('\t')) != 4: continue
+                    self.done[(parts[0], parts[1])] = (int(parts[2]), int(parts[3]))
+        directory = os.path.dirname(path)
+        if directory and not os.path.isdir(directory): os.makedirs(directory, exist_ok = True)
+        self.f = open(path, 'a', encoding = 'utf-8', newline = '\n')
+        if self.f.tell() and not line.endswith('\n'): self.f.write('\n') # terminate a torn last line
+    def __enter__(self): return self
+    def __exit__(self, exc_type, exc_val, exc_tb): self.close()
+
+    @staticmethod
+    def key(source: BinaryArchive, file: FileSource) -> tuple[str, str]: return (source.binPath.replace('\t', ' '), file.path.replace('\t', ' '))
+
+    # true when the entry was exported by an earlier run and its output still verifies
+    def skip(self, source: BinaryArchive, file: FileSource, newPath: str) -> bool:
+        if not newPath or not (entry := self.done.get(ExportJournal.key(source, file))): return False
+        try: return os.path.getsize(newPath) == entry[0] and (not self.verify or _hashFile(newPath) == entry[1])
+        except OSError: return False
+
+    # records an exported entry, hashing the output when no hash is given
+    def record(self, source: BinaryArchive, file: FileSource, newPath: str, hash: int = None) -> None:
+        if not newPath or not os.path.isfile(newPath): return
+        size = os.path.getsize(newPath)
+        if hash == None: hash = _hashFile(newPath)
+        key = ExportJournal.key(source, file)
+        with self.lock:
+            self.done[key] = (size, hash)
+            self.f.write(f'{key[0]}\t{key[1]}\t{size}\t{hash}\n')
+            self.pending += 1
+            if self.pending >= ExportJournal.SyncEvery: self.sync()
+
+    def sync(self) -> None:
+        self.f.flush(); os.fsync(self.f.fileno()); self.pending = 0
+
+    def close(self) -> None:
+        if self.f.closed: return
+        with self.lock: self.sync(); self.f.close()
+# end::ExportJournal[]
 
 # ExportManager
 class ExportManager:
     MaxDegreeOfParallelism = 1 #4
+    ReadAhead = 16      # decoded entries in flight between the read and write stages, per job
+    WriteWorkers = 2    # writer threads, per job
+    ReadGap = 0x10000   # largest hole merged into one read
+    ReadMax = 0x4000000 # largest single read
 
     @staticmethod
-    async def exportAsync(family: Family, res: Resource, filePath: str, match: callable, from_: int, option: object) -> None:
+    async def exportAsync(family: Family, res: Resource, filePath: str, match: callable, from_: int, option: object, jobs: int = 1, journal: ExportJournal = None) -> None:
         fo = option if isinstance(option, FileOption) else FileOption.Default
         with family.getArchive(res) as arc:
             # single
-            if not isinstance(arc, MultiArchive): await ExportManager.exportPakAsync(filePath, match, from_, option, arc); return
+            if not isinstance(arc, MultiArchive): await ExportManager.exportPakAsync(filePath, match, from_, option, arc, jobs, journal); return
             # write arcs
             if FileOption.Marker in fo:
                 if filePath and not os.path.isdir(filePath): os.makedirs(filePath)
@@ -22,49 +114,159 @@ class ExportManager:
             #         Files = [.. multi.Archives.Select(x => new FileSource { Path = x.Name })]
             #     }, w, 'Set');
             # multi
-            for _ in arc.archives: await ExportManager.exportPakAsync(filePath, match, from_, option, _)
+            for _ in arc.archives: await ExportManager.exportPakAsync(filePath, match, from_, option, _, jobs, journal)
 
     @staticmethod
-    async def exportPakAsync(filePath: str, match: callable, from_: int, option: object, _: Archive) -> None:
+    async def exportPakAsync(filePath: str, match: callable, from_: int, option: object, _: Archive, jobs: int = 1, journal: ExportJournal = None) -> None:
         arc = _
         if not isinstance(arc, BinaryArchive): raise Exception('not a BinaryArchive')
         newPath = os.path.join(filePath, os.path.basename(arc.binPath)) if filePath else None
         # write arc
         await ExportManager.exportPak2Async(arc, newPath, match, from_, option, \
             lambda file, idx: print(f'{idx:>6}> {file.path}') if (idx % 50) == 0 else None, \
-            lambda file, msg: print(f'ERROR: {msg} - {file.path}'))
+            lambda file, msg: print(f'ERROR: {msg} - {file.path}'), jobs, journal)
 
     @staticmethod
-    async def exportPak2Async(source: BinaryArchive, filePath: str, match: callable, from_: int, option: object, next: callable, error: callable) -> None:
+    async def exportPak2Async(source: BinaryArchive, filePath: str, match: callable, from_: int, option: object, next: callable, error: callable, jobs: int = 1, journal: ExportJournal = None) -> None:
         fo = option if isinstance(option, FileOption) else FileOption.Default
         # create directory
         if filePath and not os.path.isdir(filePath): os.makedirs(filePath)
+        # parallel
+        if jobs > 1: await ExportManager.exportPipelineAsync(source, filePath, match, from_, option, next, error, jobs, journal); return
         # write files
-        async def _lambdax(index: int):
+        candidates, match_ = ExportManager._candidates(source, match, from_)
+        async def _lambdax(i: int):
+            index = candidates[i]
             file = source.files[index].fix()
             # print(match(file.path))
-            if match and not match(file.path): return
+            if match_ and not match_(file.path): return
             newPath = os.path.join(filePath, file.path) if filePath else None
             # create directory
             directory = os.path.dirname(newPath) if newPath else None
             if directory and not os.path.isdir(directory): os.makedirs(directory)
             # recursive extract arc, and exit
-            if file.arc: await ExportManager.exportPak2Async(file.arc, newPath, match, 0, option, next, error); return
+            if file.arc: await ExportManager.exportPak2Async(file.arc, newPath, match, 0, option, next, error, 1, journal); return
+            # skip checkpointed
+            if journal and ExportManager._skip(journal, source, file, filePath, newPath, fo): return
             # ensure cached object factory
             if FileOption.Object in fo: source.ensureCachedAssetFactory(file)
             # extract file
             try:
-                await ExportManager.exportFileAsync(file, source, newPath, option)
-                if file.parts != None and FileOption.Raw in fo:
-                    for part in file.parts: await ExportManager.exportFileAsync(part, source, os.path.join(filePath, part.path), option)
+                await ExportManager._exportWithParts(file, source, filePath, newPath, option, fo, journal)
                 if next: next(file, index)
             except Exception as e: error(file, repr(e)) if error else None # f'Exception: {str(e)}'
-        await parallelFor(from_, len(source.files), { 'max': ExportManager.MaxDegreeOfParallelism }, _lambdax)
+        await parallelFor(0, len(candidates), { 'max': ExportManager.MaxDegreeOfParallelism }, _lambdax)
         # write arc-raw
         # if FileOption.Marker in fo: await StreamArchive(source, new BinaryState(source.Vfx, source.Game, source.Edition, filePath)).Write(null)
 
+    # pipelined export: a read stage over coalesced ranges, a process pool decode stage and a bounded writer stage
     @staticmethod
-    async def exportFileAsync(file: FileSource, source: BinaryArchive, newPath: str, option: object) -> None:
+    async def exportPipelineAsync(source: BinaryArchive, filePath: str, match: callable, from_: int, option: object, next: callable, error: callable, jobs: int, journal: ExportJournal = None) -> None:
+        fo = option if isinstance(option, FileOption) else FileOption.Default
+        # plan, nested archives and objects keep the single file path
+        plain = []; objects = []; indexes = {}
+        candidates, match_ = ExportManager._candidates(source, match, from_)
+        for index in candidates:
+            file = source.files[index].fix()
+            if match_ and not match_(file.path): continue
+            if file.arc: await ExportManager.exportPak2Async(file.arc, os.path.join(filePath, file.path) if filePath else None, match, 0, option, next, error, jobs, journal); continue
+            if journal and ExportManager._skip(journal, source, file, filePath, os.path.join(filePath, file.path) if filePath else None, fo): continue
+            if FileOption.Object in fo: source.ensureCachedAssetFactory(file)
+            indexes[id(file)] = index
+            (objects if file.parts or ExportManager._isObject(file, fo) else plain).append(file)
+        groups, rest = source.planRanges(plain, ExportManager.ReadGap, ExportManager.ReadMax)
+        objects.extend(rest)
+
+        loop = asyncio.get_running_loop()
+        readAhead = max(1, ExportManager.ReadAhead * jobs)
+        queue = asyncio.Queue(readAhead)
+        inflight = asyncio.Semaphore(readAhead)
+        state = DecodeState(source)
+        arcBinary = source.arcBinary
+
+        # write stage
+        async def _write():
+            while (item := await queue.get()) != None:
+                file, data = item
+                try:
+                    newPath = os.path.join(filePath, file.path) if filePath else None
+                    hash = await asyncio.to_thread(_writeEntry, newPath, data)
+                    if journal: await asyncio.to_thread(journal.record, source, file, newPath, hash)
+                    if next: next(file, indexes[id(file)])
+                except Exception as e: error(file, repr(e)) if error else None
+
+        # decode stage
+        async def _decode(pool: ProcessPoolExecutor, file: FileSource, raw: object, base: int):
+            try:
+                data = await loop.run_in_executor(pool, _decodeEntry, arcBinary, state, ExportManager._strip(file), bytes(raw), base, option) if file.compressed else \
+                    _decodeEntry(arcBinary, source, file, raw, base, option)
+                await queue.put((file, data))
+            except Exception as e: error(file, repr(e)) if error else None
+            finally: inflight.release()
+
+        # read stage
+        writers = [asyncio.create_task(_write()) for _ in range(max(1, ExportManager.WriteWorkers * jobs))]
+        tasks = set()
+        with ProcessPoolExecutor(jobs) as pool:
+            for path, start, end, group in groups:
+                buffer = await asyncio.to_thread(source._readRange, path, start, end - start)
+                for _, offset, size, file in group:
+                    await inflight.acquire()
+                    task = asyncio.create_task(_decode(pool, file, buffer[offset - start:offset - start + size], offset))
+                    tasks.add(task); task.add_done_callback(tasks.discard)
+            if tasks: await asyncio.gather(*tasks)
+        for _ in writers: await queue.put(None)
+        await asyncio.gather(*writers)
+
+        # objects and unranged entries
+        async def _lambdax(index: int):
+            file = objects[index]
+            newPath = os.path.join(filePath, file.path) if filePath else None
+            directory = os.path.dirname(newPath) if newPath else None
+            if directory and not os.path.isdir(directory): os.makedirs(directory, exist_ok = True)
+            try:
+                await ExportManager._exportWithParts(file, source, filePath, newPath, option, fo, journal)
+                if next: next(file, indexes[id(file)])
+            except Exception as e: error(file, repr(e)) if error else None
+        await parallelFor(0, len(objects), { 'max': jobs }, _lambdax)
+
+    # resolves the entries to visit, pushing a PathMatcher down into the path index before any entry is fixed
+    @staticmethod
+    def _candidates(source: BinaryArchive, match: callable, from_: int) -> tuple[list[int], callable]:
+        if isinstance(match, PathMatcher) and source.filesByPath != None:
+            return [i for i in match.select(source.filesByPath) if i >= from_], None
+        return range(from_, len(source.files) if source.files else 0), match
+
+    # true when the entry, and its raw part files, were exported by an earlier run
+    @staticmethod
+    def _skip(journal: ExportJournal, source: BinaryArchive, file: FileSource, filePath: str, newPath: str, fo: FileOption) -> bool:
+        if not journal.skip(source, file, newPath): return False
+        return not file.parts or FileOption.Raw not in fo or all(journal.skip(source, part, os.path.join(filePath, part.path)) for part in file.parts)
+
+    # exports an entry and its raw part files, journaling each output with the crc of its write
+    @staticmethod
+    async def _exportWithParts(file: FileSource, source: BinaryArchive, filePath: str, newPath: str, option: object, fo: FileOption, journal: ExportJournal) -> None:
+        hash = await ExportManager.exportFileAsync(file, source, newPath, option)
+        if file.parts != None and FileOption.Raw in fo:
+            for part in file.parts:
+                partPath = os.path.join(filePath, part.path)
+                partHash = await ExportManager.exportFileAsync(part, source, partPath, option)
+                if journal: await asyncio.to_thread(journal.record, source, part, partPath, partHash)
+        # the entry is journaled last, so an interrupted entry is exported again
+        if journal: await asyncio.to_thread(journal.record, source, file, newPath, hash)
+
+    @staticmethod
+    def _isObject(file: FileSource, fo: FileOption) -> bool:
+        oo = file.cachedObjectOption if isinstance(file.cachedObjectOption, FileOption) else fo
+        return file.cachedObjectOption != None and bool(fo & oo)
+
+    # strips a FileSource to the picklable fields read by ArcBinary.readDataAt
+    @staticmethod
+    def _strip(file: FileSource) -> FileSource: return FileSource(id = file.id, path = file.path, offset = file.offset, fileSize = file.fileSize, packedSize = file.packedSize, compressed = file.compressed, flags = file.flags, hash = file.hash, data = file.data, tag = file.tag)
+
+    @staticmethod
+    # exports one entry, returning the crc32 of the bytes written or None when not known
+    async def exportFileAsync(file: FileSource, source: BinaryArchive, newPath: str, option: object) -> int:
         fo = option if isinstance(option, FileOption) else FileOption.Default
         # if (file.fileSize or 0) == 0 and (file.packedSize or 0) == 0: return
         oo = file.cachedObjectOption if isinstance(file.cachedObjectOption, FileOption) else fo
@@ -77,8 +279,7 @@ class ExportManager:
                 obj = await source.getAsset(object, file)
                 if isinstance(obj, IStream):
                     with obj.getStream() as b2, open(newPath, 'wb') if newPath else io.BytesIO() as s2:
-                        shutil.copyfileobj(b2, s2)
-                    return
+                        return _copyHashed(b2, s2)
                 ArcBinary.handleException(None, option, f'BinaryObject: {file.Path} @ {file.FileSize}')
                 raise Exception()
             elif FileOption.StreamObject in oo:
@@ -90,8 +291,9 @@ class ExportManager:
                 ArcBinary.handleException(None, option, f'StreamObject: {file.Path} @ {file.FileSize}')
                 raise Exception()
         with await source.getData(file, option) as b, open(newPath, 'wb') if newPath else io.BytesIO() as s:
-            shutil.copyfileobj(b, s)
+            hash = _copyHashed(b, s)
             if file.parts and FileOption.Raw not in fo:
                 for part in file.parts:
                     with await source.getData(part, option) as b2:
-                        shutil.copyfileobj(b2, s)
+                        hash = _copyHashed(b2, s, hash)
+            return hash
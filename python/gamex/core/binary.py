@@ -1,10 +1,12 @@
 from __future__ import annotations
-import sys, os, re, time
-from itertools import groupby
+import sys, os, re, time, mmap
 from enum import Enum, Flag
-from io import BytesIO
-from openstk.core import _throw, ISource, PlatformX, BinaryReader, GenericPool, SinglePool, StaticPool, IDatabase
-from gamex.core.meta import FileSource, MetaManager, MetaItem, MetaInfo
+from io import BytesIO, BufferedIOBase
+from openstk.core import _throw, ISource, PlatformX, BinaryReader, SinglePool, StaticPool, IDatabase
+from openstk.vfx import DirectoryFileSystem
+from gamex.core.meta import FileSource, FileTable, PathIndex, MetaManager, MetaItem, MetaInfo
+from gamex.core.cache import IndexCache, AssetCache
+from gamex.core.pool import FileHandles, ReaderPool
 
 # FileOption
 class FileOption(Flag):
@@ -100,6 +102,11 @@ class Archive(Binary, ISource):
     #endregion
 # end::Archive[]
 
+# AssetOption - a per-call asset factory, like a partial parse for a scan, never shared through the asset cache
+class AssetOption:
+    def __init__(self, factory: callable, option: object = None): self.factory = factory; self.option = option
+    def __repr__(self): return f'AssetOption:{self.factory}'
+
 # BinaryArchive
 class BinaryArchive(Archive):
     def __init__(self, parent: Archive, state: BinaryState, arcBinary: ArcBinary):
@@ -109,6 +116,10 @@ class BinaryArchive(Archive):
         self.retainInPool = 10
         self.useReader = True
         self.useFileId = False
+        self.useIndexCache = IndexCache.enabled
+        self.useMmap = True
+        self.assetCache = AssetCache.default
+        self.assetToken = AssetCache.token()
         # state
         self.fileMask = None
         self.params = {}
@@ -124,23 +135,56 @@ class BinaryArchive(Archive):
         self.pathSkip = 0
         self.atEnd = False
         # pool
-        self.readers: dict[str, GenericPool] = {}
+        self.readers: dict[str, ReaderPool] = {}
+        self.views: dict[str, memoryview] = {}
+        self.fileHandles: FileHandles = None # archive-owned descriptors, None shares the process-wide LRU
     
     #region Pool
 
     def getReader(self, path: str = None, pooled: bool = True) -> BinaryReader:
         path = path or self.binPath
-        return self.readers.get(path) or self.readers.setdefault(path, GenericPool[BinaryReader](lambda: BinaryReader(self.vfx.open(path)), lambda r: r.seek(0)) if self.vfx.fileExists(path) else None) if pooled else \
+        return self.readers.get(path) or self.readers.setdefault(path, self._createPool(path)) if pooled else \
             SinglePool[BinaryReader](BinaryReader(self.vfx.open(path)) if self.vfx.fileExists(path) else None)
-    
+
+    # local files share positional descriptors, other file systems pool opened streams
+    def _createPool(self, path: str) -> ReaderPool:
+        if not self.vfx.fileExists(path): return None
+        if isinstance(self.vfx, DirectoryFileSystem) and hasattr(os, 'pread') and (fullPath := self.vfx.fileInfo(path)[0]): return ReaderPool.local(fullPath, self.retainInPool, self.fileHandles)
+        return ReaderPool(lambda: BinaryReader(self.vfx.open(path)), self.retainInPool)
+
+    # one-off readers by default, per-entry and batched reads opt in to the pool
     def reader(self, func: callable, path: str = None, pooled: bool = False): self.getReader(path, pooled).action(func)
 
     def readerT(self, func: callable, path: str = None, pooled: bool = False): return self.getReader(path, pooled).func(func)
     
     #endregion
 
+    #region Mmap
+
+    # gets a read-only memory map of a local container file, or None when not mappable
+    def getView(self, path: str = None) -> memoryview:
+        path = path or self.binPath
+        if (view := self.views.get(path)) != None: return view or None
+        view = False
+        if self.useMmap and isinstance(self.vfx, DirectoryFileSystem):
+            try:
+                with open(self.vfx.fileInfo(path)[0], 'rb') as f: view = memoryview(mmap.mmap(f.fileno(), 0, access = mmap.ACCESS_READ))
+            except (OSError, ValueError): view = False
+        self.views[path] = view
+        return view or None
+
+    # gets a zero-copy stream over a stored range of a container file
+    def readView(self, offset: int, size: int, path: str = None) -> ViewStream:
+        view = self.getView(path)
+        return ViewStream(view[offset:offset + size]) if view and offset + size <= len(view) else None
+
+    #endregion
+
     def opening(self) -> None:
-        self.read()
+        key = IndexCache.key(self) if self.useIndexCache else None
+        if not IndexCache.load(self, key):
+            self.read()
+            if key: IndexCache.store(self, key)
         self.process()
         self.valid = self.files != None
         self.count = len(self.filesByPath)
@@ -152,13 +196,21 @@ class BinaryArchive(Archive):
         self.filesRawSet = None
         self.filesById = None
         self.filesByPath = None
-        # for r in self.readers.values(): r.dispose()
+        if self.assetCache: self.assetCache.invalidate(self)
+        for r in self.readers.values():
+            if r: r.dispose()
         self.readers.clear()
+        if self.fileHandles: self.fileHandles.close()
+        for s in self.views.values():
+            if not s: continue
+            try: m = s.obj; s.release(); m.close()
+            except BufferError: pass # still exported by open streams, released on collect
+        self.views.clear()
 
     def contains(self, path: FileSource | str | int) -> bool:
         match path:
             case None: raise Exception('Null')
-            case s if isinstance(path, str): arc, next_ = self._findPath(s); return arc.contains(next_) if arc else self.filesByPath and s.replace('\\', '/').lower() in self.filesByPath
+            case s if isinstance(path, str): arc, next_, key = self._findPath(s); return arc.contains(next_) if arc else bool(self.filesByPath) and key in self.filesByPath
             case i if isinstance(path, int): return self.filesById and i in self.filesById
             case _: raise Exception(f'Unknown: {path}')
 
@@ -167,15 +219,15 @@ class BinaryArchive(Archive):
             case None: raise Exception('Null')
             case f if isinstance(path, FileSource): return (self, f)
             case s if isinstance(path, str):
-                arc, next_ = self._findPath(s)
+                arc, next_, s = self._findPath(s)
                 if arc: return arc.getSource(next_) if next_ else (arc, next_)
-                files = self.filesByPath[s] if self.filesByPath and (s := s.replace('\\', '/').lower()) in self.filesByPath else []
+                files = [self.files[x] for x in self.filesByPath.get(s, ())] if self.filesByPath else []
                 if len(files) == 1: return (self, files[0])
                 print(f'ERROR.LoadFileData: {s} @ {len(files)}')
                 if throwOnError: raise Exception(f'File not found: {s}' if len(files) == 0 else f'More then one file found: {s}')
                 return (None, None)
             case i if isinstance(path, int):
-                files = self.filesById[i] if self.filesById and i in self.filesById else []
+                files = [self.files[x] for x in self.filesById[i]] if self.filesById and i in self.filesById else []
                 if len(files) == 1: return (self, files[0])
                 print(f'ERROR.LoadFileData: {i} @ {len(files)}')
                 if throwOnError: raise Exception(f'File not found: {i}' if len(files) == 0 else f'More then one file found: {i}')
@@ -191,6 +243,33 @@ class BinaryArchive(Archive):
         f = path
         return self.readData(f.fix(), option)
 
+    # plans batched reads: (path, start, end, [(path, offset, size, file)]) groups in container/offset order, and the entries without a range
+    def planRanges(self, files: list[FileSource], gap: int = 0x10000, maxRead: int = 0x4000000) -> tuple[list[list], list[FileSource]]:
+        arcBinary = self.arcBinary
+        ranges = []; rest = []
+        for file in files:
+            file = file.fix()
+            if arcBinary and (z := arcBinary.dataRange(self, file)): ranges.append((z[0] or self.binPath, z[1], z[2], file))
+            else: rest.append(file)
+        order = arcBinary.rangeOrder if arcBinary else lambda source, path: path
+        ranges.sort(key = lambda s: (order(self, s[0]), s[1]))
+        return list(_coalesce(ranges, gap, maxRead)), rest
+
+    # gets many entries in container/offset order, coalescing nearby ranges into single reads
+    async def getDataMany(self, files: list[FileSource], option: object = None, gap: int = 0x10000, maxRead: int = 0x4000000):
+        groups, rest = self.planRanges(files, gap, maxRead)
+        for path, start, end, group in groups:
+            buffer = self._readRange(path, start, end - start)
+            for _, _, _, file in group:
+                yield (file, self.arcBinary.readDataAt(self, BinaryReader(ViewStream(buffer[:], start)), file, option))
+        for file in rest: yield (file, await self.getData(file, option))
+
+    # reads a range of a container, as a view when mapped
+    def _readRange(self, path: str, offset: int, size: int) -> memoryview:
+        if (view := self.getView(path)): return view[offset:min(offset + size, len(view))]
+        def _lambdax(r: BinaryReader): r.seek(offset); return memoryview(r.readBytes(size))
+        return self.readerT(_lambdax, path, True)
+
     async def getAsset(self, t: type, path: FileSource | str | int | object, option: object = None, throwOnError: bool = True) -> object:
         #print(f'getAsset: {t} - {path}')
         if not path: return None
@@ -200,12 +279,22 @@ class BinaryArchive(Archive):
             return await arc.getAsset(t, next_, option, throwOnError) if next_ else path
         f = path
         if self.game._isArcPath(f.path): return None
+        if self.assetCache and self.assetCache.budget > 0 and not isinstance(option, AssetOption):
+            key = (self.assetToken, f.path, f.id, t, option)
+            try: hash(key)
+            except TypeError: key = None
+            if key: return await self.assetCache.getOrAdd(key, lambda: self._getAsset(t, f, option, throwOnError))
+        return await self._getAsset(t, f, option, throwOnError)
+
+    async def _getAsset(self, t: type, f: FileSource, option: object, throwOnError: bool) -> object:
         if isinstance(self.arcBinary, IDatabase) and (s := self.arcBinary):
             res = s.query(f)
             if res: return res
+        factory = None
+        if isinstance(option, AssetOption): factory = option.factory; option = option.option
         data = await self.getData(f, option, throwOnError)
-        if not data: return None
-        assetFactory = self.ensureCachedAssetFactory(f)
+        if data is None: return None # empty views are falsy, still assets
+        assetFactory = factory or self.ensureCachedAssetFactory(f)
         if assetFactory != FileSource.emptyAssetFactory:
             r = BinaryReader(data)
             try:
@@ -229,17 +318,20 @@ class BinaryArchive(Archive):
         return file.cachedObjectFactory
 
     def process(self) -> None:
-        if self.useFileId and self.files: self.filesById = { x.id:x for x in self.files if x }
-        if self.files: self.filesByPath = { k.lower():list(g) for k,g in groupby(sorted(self.files, key=lambda s: s.path), lambda s: s.path) }
+        files = self.files
+        table = isinstance(files, FileTable)
+        if table: files.freeze()
+        if self.useFileId and files: self.filesById = _groupIndex((x if x >= 0 else None for x in files.id) if table else (x.id if x else None for x in files))
+        if files: self.filesByPath = PathIndex(files.paths() if table else (x.path if x else None for x in files))
         if self.arcBinary: self.arcBinary.process(self)
 
-    def _findPath(self, path: str) -> tuple[object, str]:
-        paths = path.split(':', 1)
-        p = paths[0].replace('\\', '/').lower()
-        first = next(iter(self.filesByPath[p]), None) if self.filesByPath and p in self.filesByPath else None
-        arc = first.arc if first else None
+    # splits a nested path, returning the nested archive, its path and the normalized key
+    def _findPath(self, path: str) -> tuple[object, str, str]:
+        key, _, nextPath = path.replace('\\', '/').lower().partition(':')
+        z = self.filesByPath.get(key) if self.filesByPath else None
+        arc = self.files[z[0]].arc if z else None
         if arc: arc.open()
-        return arc, (paths[1] if arc and len(paths) > 1 else None)
+        return arc, (nextPath or None if arc else None), key
 
     #region ArcBinary
     def read(self, tag: object = None) -> None: return \
@@ -247,7 +339,8 @@ class BinaryArchive(Archive):
         self.arcBinary.read(self, None, tag)
 
     def readData(self, file: FileSource, option: object = None) -> bytes: return \
-        self.readerT(lambda r: self.arcBinary.readData(self, r, file, option)) if self.useReader else \
+        z if self.useMmap and self.arcBinary and (z := self.arcBinary.readDataView(self, file, option)) else \
+        self.readerT(lambda r: self.arcBinary.readData(self, r, file, option), pooled = True) if self.useReader else \
         self.arcBinary.readData(self, None, file, option)
     #endregion
 
@@ -259,6 +352,27 @@ class BinaryArchive(Archive):
         return MetaManager.getMetaItems(manager, self) if self.valid else None
     #endregion
 
+# groups entry indexes by key, skipping empty keys
+def _groupIndex(keys: iter) -> dict[object, list[int]]:
+    index = {}
+    for i, k in enumerate(keys):
+        if k == None: continue
+        if (z := index.get(k)) != None: z.append(i)
+        else: index[k] = [i]
+    return index
+
+# groups ranges sorted by (path, offset) into reads, merging ranges closer than gap up to maxRead bytes
+def _coalesce(ranges: list[tuple], gap: int, maxRead: int) -> iter:
+    group = None
+    for s in ranges:
+        path, offset, size, _ = s
+        if group and path == group[0] and offset - group[2] <= gap and max(group[2], offset + size) - group[1] <= maxRead:
+            group[2] = max(group[2], offset + size); group[3].append(s)
+            continue
+        if group: yield group
+        group = [path, offset, offset + size, [s]]
+    if group: yield group
+
 # ManyArchive
 class ManyArchive(BinaryArchive):
     def __init__(self, basis: Archive, parent: Archive, state: BinaryState, name: str, paths: list[str], pathSkip: int = 0):
@@ -369,8 +483,13 @@ class MultiArchive(Archive):
 # tag::ArcBinary[]
 # ArcBinary
 class ArcBinary:
+    cacheVersion: int = None # index cache version stamp, None opts out of the persistent index cache
     def read(self, source: BinaryArchive, r: BinaryReader, tag: object = None) -> None: pass
     def readData(self, source: BinaryArchive, r: BinaryReader, file: FileSource, option: object = None): pass
+    def readDataView(self, source: BinaryArchive, file: FileSource, option: object = None) -> ViewStream: return None
+    def dataRange(self, source: BinaryArchive, file: FileSource) -> tuple[str, int, int]: return None # (container path or None, offset, stored size), enables batched reads
+    def readDataAt(self, source: BinaryArchive, r: BinaryReader, file: FileSource, option: object = None): return self.readData(source, r, file, option) # reads through a reader over the dataRange container
+    def rangeOrder(self, source: BinaryArchive, path: str) -> object: return path # sort key of a dataRange container for batched reads
     def process(self, source: BinaryArchive): pass
     def handleException(self, source: object, option: object, message: str):
         print(message)
@@ -401,6 +520,48 @@ class ArcBinaryT(ArcBinary):
         #         self.arcBinary.read(self, r2, tag)
 # end::ArcBinary[]
 
+# ViewStream
+class ViewStream(BufferedIOBase):
+    def __init__(self, view: memoryview, base: int = 0):
+        self._view = view
+        self._base = base # absolute position of the view, for windows over a container
+        self._pos = 0
+    def __len__(self) -> int: return len(self._view)
+    def readable(self) -> bool: return True
+    def seekable(self) -> bool: return True
+    def writable(self) -> bool: return False
+    def getbuffer(self) -> memoryview: return self._view
+    def getvalue(self) -> bytes: return self._view.tobytes()
+    def tell(self) -> int: return self._base + self._pos
+    def seek(self, offset: int, whence: int = os.SEEK_SET) -> int:
+        match whence:
+            case os.SEEK_SET: pos = offset - self._base
+            case os.SEEK_CUR: pos = self._pos + offset
+            case os.SEEK_END: pos = len(self._view) + offset
+            case _: raise ValueError(f'Invalid whence: {whence}')
+        if pos < 0: raise ValueError(f'Seek before start of view: {offset}')
+        self._pos = pos
+        return self._base + pos
+    def read(self, size: int = -1) -> bytes:
+        start = self._pos; length = len(self._view)
+        end = length if size == None or size < 0 else min(start + size, length)
+        if start >= end: return b''
+        self._pos = end
+        return self._view[start:end].tobytes()
+    def read1(self, size: int = -1) -> bytes: return self.read(size)
+    def readinto(self, b: object) -> int:
+        start = self._pos; dst = memoryview(b).cast('B')
+        size = max(0, min(len(dst), len(self._view) - start))
+        dst[:size] = self._view[start:start + size]
+        self._pos = start + size
+        return size
+    def readinto1(self, b: object) -> int: return self.readinto(b)
+    def close(self) -> None:
+        if not self.closed:
+            try: self._view.release()
+            except BufferError: pass # still exported, released on collect
+        super().close()
+
 # ITransformAsset
 class ITransformAsset:
     def canTransformAsset(self, src: object, transformTo: Archive) -> bool: pass
@@ -0,0 +1,153 @@
+from __future__ import annotations
+import os, sys, io, marshal, hashlib, asyncio, threading, itertools
+from collections import OrderedDict
+from gamex.core.meta import FileSource, FileTable
+
+# typedefs
+class BinaryArchive: pass
+
+# tag::IndexCache[]
+# IndexCache
+class IndexCache:
+    enabled: bool = False
+    root: str = os.path.expanduser('~/.gamex/index')
+    MAGIC = b'GXIC'
+    VERSION = 4
+    FILE_FIELDS = ('id', 'path', 'offset', 'fileSize', 'packedSize', 'compressed', 'flags', 'hash', 'date', 'data', 'tag')
+    STATE_FIELDS = ('binPath', 'magic', 'version', 'tag', 'useReader', 'useFileId', 'pathSkip', 'params')
+
+    # gets the cache path and stamp for an archive, stamped by archive path, size, mtime and arcBinary version
+    @staticmethod
+    def key(source: BinaryArchive) -> tuple[str, tuple]:
+        arcBinary = source.arcBinary
+        if not arcBinary or arcBinary.cacheVersion == None: return None
+        try: path = source.vfx.fileInfo(source.binPath)[0]
+        except Exception: return None
+        if not path or not os.path.isfile(path): return None
+        path = os.path.abspath(path); stat = os.stat(path)
+        name = f'{type(arcBinary).__module__}.{type(arcBinary).__qualname__}'
+        digest = hashlib.sha1(f'{name}:{path}'.encode('utf-8')).hexdigest()
+        return (os.path.join(IndexCache.root, f'{digest}.idx'), (IndexCache.VERSION, marshal.version, tuple(sys.version_info[:2]), name, arcBinary.cacheVersion, stat.st_size, stat.st_mtime_ns))
+
+    # loads the file table into the archive, returns False on a miss
+    @staticmethod
+    def load(source: BinaryArchive, key: tuple[str, tuple]) -> bool:
+        if not key or not os.path.exists(key[0]): return False
+        try:
+            with open(key[0], 'rb') as f:
+                if f.read(4) != IndexCache.MAGIC or marshal.load(f) != key[1]: return False
+                state, table, columns = marshal.load(f)
+        except (OSError, EOFError, ValueError, TypeError): return False
+        for k, v in zip(IndexCache.STATE_FIELDS, state): setattr(source, k, v)
+        fields = IndexCache.FILE_FIELDS
+        source.files = FileTable.fromColumns(columns) if table else [FileSource(**dict(zip(fields, s))) for s in zip(*columns)]
+        return True
+
+    # stores the file table of the archive, skipped when any entry is not serializable
+    @staticmethod
+    def store(source: BinaryArchive, key: tuple[str, tuple]) -> bool:
+        files = source.files
+        table = isinstance(files, FileTable)
+        if not key or files == None or (not table and any(not s or s.arc or s.parts or s.lazy for s in files)): return False
+        try: body = marshal.dumps((
+            tuple(getattr(source, k) for k in IndexCache.STATE_FIELDS),
+            table,
+            files.toColumns() if table else tuple([getattr(s, k) for s in files] for k in IndexCache.FILE_FIELDS)))
+        except ValueError: return False
+        path = key[0]; tmpPath = f'{path}.{os.getpid()}.tmp'
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok = True)
+            with open(tmpPath, 'wb') as f: f.write(IndexCache.MAGIC); marshal.dump(key[1], f); f.write(body)
+            os.replace(tmpPath, path)
+        except OSError:
+            if os.path.exists(tmpPath): os.remove(tmpPath)
+            return False
+        return True
+
+    # invalidates the cache for an archive, or the whole cache
+    @staticmethod
+    def invalidate(source: BinaryArchive = None) -> None:
+        if source:
+            if (key := IndexCache.key(source)) and os.path.exists(key[0]): os.remove(key[0])
+            return
+        if not os.path.isdir(IndexCache.root): return
+        for s in os.listdir(IndexCache.root):
+            if s.endswith('.idx'): os.remove(os.path.join(IndexCache.root, s))
+# end::IndexCache[]
+
+# tag::AssetCache[]
+# AssetCache - LRU of parsed assets bounded by estimated byte size, de-duplicating concurrent loads of the same key
+# opt-in: callers of a cached archive share one asset object and must treat it as read-only
+# keys start with the token of their archive, unlike id() a token is never reused by a later archive
+class AssetCache:
+    budget: int = 256 * 1024 * 1024
+    default: AssetCache = None
+    _tokens = itertools.count(1)
+
+    def __init__(self, budget: int = None):
+        self.budget = budget if budget != None else AssetCache.budget
+        self.items: OrderedDict[tuple, tuple[object, int]] = OrderedDict()
+        self.size = 0
+        self.inflight: dict[tuple, asyncio.Future] = {}
+        self.lock = threading.Lock()
+        self.hits = 0; self.misses = 0; self.evictions = 0
+    def __repr__(self): return f'AssetCache:{len(self.items)}:{self.size}/{self.budget}'
+
+    # gets the cached value for key, or awaits factory once for all concurrent callers
+    async def getOrAdd(self, key: tuple, factory: callable) -> object:
+        with self.lock:
+            if (z := self.items.get(key)) != None: self.items.move_to_end(key); self.hits += 1; return z[0]
+            future = self.inflight.get(key)
+            if future != None and not future.get_loop().is_closed(): self.hits += 1
+            else: future = None; self.misses += 1
+        if future != None: return await asyncio.shield(future)
+        future = self.inflight[key] = asyncio.get_running_loop().create_future()
+        try: value = await factory()
+        except BaseException as e:
+            future.set_exception(e); future.exception() # waiters re-raise, no unretrieved warning
+            raise
+        finally:
+            if self.inflight.get(key) is future: del self.inflight[key]
+        self.add(key, value)
+        future.set_result(value)
+        return value
+
+    def add(self, key: tuple, value: object) -> None:
+        # streams carry a position and are never shared
+        if value == None or isinstance(value, io.IOBase): return
+        size = AssetCache.sizeOf(value)
+        if size > self.budget: return
+        with self.lock:
+            if (z := self.items.pop(key, None)) != None: self.size -= z[1]
+            self.items[key] = (value, size); self.size += size
+            while self.size > self.budget:
+                _, z = self.items.popitem(last = False); self.size -= z[1]; self.evictions += 1
+
+    # removes the entries of an archive, or all entries
+    def invalidate(self, source: object = None) -> None:
+        with self.lock:
+            if source == None: self.items.clear(); self.size = 0; return
+            for key in [k for k in self.items if k[0] == source.assetToken]: self.size -= self.items.pop(key)[1]
+
+    def stats(self) -> dict[str, int]: return { 'count': len(self.items), 'size': self.size, 'budget': self.budget, 'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions }
+
+    # gets a new archive token
+    @staticmethod
+    def token() -> int: return next(AssetCache._tokens)
+
+    # estimates the retained bytes of a value, one level into its buffers
+    @staticmethod
+    def sizeOf(value: object) -> int:
+        if (z := getattr(value, 'nbytes', None)) != None and isinstance(z, int): return z
+        if isinstance(value, (bytes, bytearray, memoryview, str)): return len(value)
+        size = sys.getsizeof(value)
+        children = value.values() if isinstance(value, dict) else value if isinstance(value, (list, tuple)) else \
+            getattr(value, '__dict__', {}).values()
+        for s in children:
+            if (z := getattr(s, 'nbytes', None)) != None and isinstance(z, int): size += z
+            elif isinstance(s, (bytes, bytearray, memoryview, str)): size += len(s)
+            elif isinstance(s, (list, tuple, dict)): size += sys.getsizeof(s)
+        return size
+
+AssetCache.default = None # set to an AssetCache before opening archives to share parsed assets, as the explorer does
+# end::AssetCache[]
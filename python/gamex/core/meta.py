@@ -1,10 +1,12 @@
 from __future__ import annotations
-import sys, os, re, pathlib
-from io import BytesIO
+import sys, os, re, pathlib, fnmatch
+from io import BytesIO, BufferedIOBase
+from array import array
 from openstk.core import _throw
 
 # FileSource
 class FileSource:
+    __slots__ = ('id', 'path', 'offset', 'fileSize', 'packedSize', 'compressed', 'flags', 'hash', 'date', 'arc', 'parts', 'data', 'tag', 'lazy', 'cachedObjectFactory', 'cachedObjectOption')
     emptyAssetFactory = lambda a, b, c: None
     def __init__(self, id = None, path = None, offset = None, fileSize = None, packedSize = None, compressed = None, flags = None, hash = None, date = None, arc = None, parts = None, data = None, tag = None, lazy = None):
         self.id = id
@@ -30,6 +32,191 @@ class FileSource:
         return self
     def __repr__(self): return f'{self.path}:{self.fileSize}'
 
+# FileTable
+# columns never written read back as 0 where a FileSource holds None, only id maps -1 back to None; the families reading into a table test them by value, never for None
+class FileTable:
+    COLUMNS = (('id', 'q'), ('offset', 'q'), ('fileSize', 'q'), ('packedSize', 'q'), ('compressed', 'q'), ('flags', 'i'), ('hash', 'Q'))
+    def __init__(self):
+        for k, t in self.COLUMNS: setattr(self, k, array(t))
+        self.tag: list[object] = None
+        self.data: dict[int, bytes] = None # sparse, by entry index
+        self.pathPool: str = None
+        self.pathEnds = array('I')
+        self._paths: list[str] = []
+        self._views: dict[int, FileSource] = {}
+    def __len__(self): return len(self.offset)
+    def __iter__(self): return (self.view(i) for i in range(len(self.offset)))
+    def __getitem__(self, index: int | slice) -> FileSource | list[FileSource]:
+        if isinstance(index, slice): return [self.view(i) for i in range(*index.indices(len(self.offset)))]
+        return self.view(index if index >= 0 else len(self.offset) + index)
+    def __repr__(self): return f'FileTable:{len(self.offset)}'
+
+    # appends an entry, returning its index
+    def append(self, path: str, offset: int = 0, fileSize: int = 0, packedSize: int = 0, compressed: int = 0, flags: int = 0, hash: int = 0, id: int = -1, tag: object = None) -> int:
+        if self.pathPool != None: raise Exception('FileTable is frozen')
+        index = len(self.offset)
+        self._paths.append(path)
+        self.id.append(id); self.offset.append(offset); self.fileSize.append(fileSize); self.packedSize.append(packedSize)
+        self.compressed.append(compressed); self.flags.append(flags); self.hash.append(hash)
+        if tag != None and self.tag == None: self.tag = [None] * index
+        if self.tag != None: self.tag.append(tag)
+        return index
+
+    # appends entries from columns of equal length, numpy columns are copied in bulk, missing columns take the append defaults
+    def extend(self, paths: list[str], data: dict[int, bytes] = None, **columns) -> FileTable:
+        if self.pathPool != None: raise Exception('FileTable is frozen')
+        index = len(self.offset); count = len(paths)
+        self._paths.extend(paths)
+        for k, t in self.COLUMNS:
+            if (z := columns.get(k)) is None: getattr(self, k).extend(array(t, [-1 if k == 'id' else 0]) * count)
+            elif hasattr(z, 'astype'): getattr(self, k).frombytes(z.astype(t).tobytes())
+            else: getattr(self, k).extend(z)
+        if self.tag != None: self.tag.extend([None] * count)
+        if data: self.data = self.data or {}; self.data.update((index + i, s) for i, s in data.items())
+        return self
+
+    # interns all paths into the path pool
+    def freeze(self) -> FileTable:
+        if self.pathPool != None: return self
+        end = 0; pathEnds = self.pathEnds
+        for s in self._paths: end += len(s); pathEnds.append(end)
+        self.pathPool = ''.join(self._paths); self._paths = None
+        return self
+
+    def path(self, index: int) -> str:
+        if self.pathPool == None: return self._paths[index]
+        ends = self.pathEnds
+        return self.pathPool[ends[index - 1] if index > 0 else 0:ends[index]]
+
+    def paths(self) -> list[str]: return self._paths if self.pathPool == None else [self.path(i) for i in range(len(self.offset))]
+
+    # gets the FileSource view of an entry, created on first access
+    def view(self, index: int) -> FileSource:
+        if (file := self._views.get(index)): return file
+        id = self.id[index]
+        file = self._views[index] = FileSource(
+            id = id if id >= 0 else None,
+            path = self.path(index),
+            offset = self.offset[index],
+            fileSize = self.fileSize[index],
+            packedSize = self.packedSize[index],
+            compressed = self.compressed[index],
+            flags = self.flags[index],
+            hash = self.hash[index],
+            data = self.data.get(index) if self.data else None,
+            tag = self.tag[index] if self.tag else None)
+        return file
+
+    #region Columns
+    def toColumns(self) -> tuple:
+        self.freeze()
+        return (tuple(getattr(self, k).tobytes() for k, _ in self.COLUMNS), self.pathPool, self.pathEnds.tobytes(), self.tag, self.data)
+
+    @staticmethod
+    def fromColumns(columns: tuple) -> FileTable:
+        table = FileTable()
+        numbers, table.pathPool, pathEnds, table.tag, table.data = columns
+        for (k, _), v in zip(FileTable.COLUMNS, numbers): getattr(table, k).frombytes(v)
+        table.pathEnds.frombytes(pathEnds); table._paths = None
+        return table
+    #endregion
+
+# tag::PathIndex[]
+# PathIndex - normalized path to entry indexes, with a directory trie built on first listing
+class PathIndex(dict):
+    WILDCARDS = re.compile(r'[*?\[]')
+    def __init__(self, paths: iter = ()):
+        super().__init__()
+        for i, s in enumerate(paths):
+            if s == None: continue
+            k = s.replace('\\', '/').lower()
+            if (z := self.get(k)) != None: z.append(i)
+            else: self[k] = [i]
+        self._files: dict[str, list[str]] = None
+        self._dirs: dict[str, list[str]] = None
+        self._exts: dict[str, list[str]] = None
+
+    @staticmethod
+    def normalize(path: str) -> str: return path.replace('\\', '/').lower()
+
+    # gets the entry indexes of a path
+    def find(self, path: str) -> list[int]: return self.get(path.replace('\\', '/').lower())
+
+    # gets the first path present in the index
+    def first(self, *paths: str) -> str: return next((s for s in paths if s.replace('\\', '/').lower() in self), None)
+
+    def _build(self) -> None:
+        files = {}; dirs = {}
+        for k in self:
+            i = k.rfind('/'); d = k[:i] if i >= 0 else ''
+            if (z := files.get(d)) != None: z.append(k); continue
+            files[d] = [k]
+            # link the new directory into its parents
+            while d:
+                i = d.rfind('/'); p = d[:i] if i >= 0 else ''
+                if (z := dirs.get(p)) != None:
+                    if d in z: break
+                    z.append(d)
+                else: dirs[p] = [d]
+                d = p
+        self._files = files; self._dirs = dirs
+
+    # gets the paths with an extension, like '.nif'
+    def byExtension(self, ext: str) -> list[str]:
+        if self._exts == None:
+            exts = self._exts = {}
+            for k in self:
+                i = k.rfind('.'); z = k[i:] if i > k.rfind('/') else ''
+                if (e := exts.get(z)) != None: e.append(k)
+                else: exts[z] = [k]
+        return self._exts.get(ext.lower(), [])
+
+    # lists the paths in a directory, or below it when recursive
+    def list(self, dir: str = '', recursive: bool = False) -> list[str]:
+        if self._files == None: self._build()
+        dir = dir.replace('\\', '/').lower().strip('/')
+        if not recursive: return list(self._files.get(dir, ()))
+        paths = []; stack = [dir]
+        while stack:
+            d = stack.pop()
+            paths.extend(self._files.get(d, ())); stack.extend(self._dirs.get(d, ()))
+        return paths
+
+    # gets the paths matching a glob, scanning only below its literal directory prefix
+    def glob(self, pattern: str) -> list[str]:
+        pattern = pattern.replace('\\', '/').lower()
+        if not (m := PathIndex.WILDCARDS.search(pattern)): return [pattern] if pattern in self else []
+        i = pattern.rfind('/', 0, m.start())
+        candidates = self.list(pattern[:i], True) if i >= 0 else self.keys()
+        return [s for s in candidates if fnmatch.fnmatchcase(s, pattern)]
+# end::PathIndex[]
+
+# tag::PathMatcher[]
+# PathMatcher - a compiled glob, or 're:' regex, over normalized paths that resolves its candidates from a PathIndex
+class PathMatcher:
+    def __init__(self, pattern: str):
+        self.pattern = pattern
+        self.glob = None; self.literal = None; self.ext = None; self.dir = None
+        if pattern.startswith('re:'): self.regex = re.compile(pattern[3:], re.IGNORECASE); return
+        g = self.glob = PathIndex.normalize(pattern)
+        self.regex = re.compile(fnmatch.translate(g))
+        # fast paths
+        if not PathIndex.WILDCARDS.search(g): self.literal = g
+        elif g.startswith('*.') and not PathIndex.WILDCARDS.search(g, 2) and not any(c in g[2:] for c in './'): self.ext = g[1:]
+        elif g.endswith('/*') and not PathIndex.WILDCARDS.search(g, 0, len(g) - 2): self.dir = g[:-2]
+    def __call__(self, path: str) -> bool: return (self.regex.match if self.glob != None else self.regex.search)(path.replace('\\', '/').lower()) != None
+    def __repr__(self): return f'PathMatcher:{self.pattern}'
+
+    # gets the sorted entry indexes matching in an index
+    def select(self, index: PathIndex) -> list[int]:
+        if self.literal != None: keys = [self.literal] if self.literal in index else []
+        elif self.ext != None: keys = index.byExtension(self.ext)
+        elif self.dir != None: keys = index.list(self.dir, True)
+        elif self.glob != None: keys = index.glob(self.glob)
+        else: keys = [s for s in index if self.regex.search(s)]
+        return sorted(i for k in keys for i in index[k])
+# end::PathMatcher[]
+
 # MetaContent
 class MetaContent:
     def __init__(self, type: str, name: str, value: object = None, 
@@ -105,7 +292,7 @@ class MetaManager:
         match obj:
             case None: return None
             case s if isinstance(obj, IHaveMetaInfo): nodes = s.getInfoNodes(manager, file)
-            case s if isinstance(obj, BytesIO):
+            case s if isinstance(obj, BufferedIOBase):
                 value = MetaManager._guessStringOrBytes(s)
                 nodes = [
                     MetaInfo(None, MetaContent(type = 'Text', name = os.path.basename(file.path), value = obj)),
@@ -115,9 +302,9 @@ class MetaManager:
                 ] if isinstance(obj, str) else [
                     MetaInfo(None, MetaContent(type = 'Hex', name = os.path.basename(file.path), value = obj)),
                     MetaInfo('Bytes', items = [
-                        MetaInfo(f'Length: {sys.getsizeof(obj)}')
+                        MetaInfo(f'Length: {len(obj) if hasattr(obj, "__len__") else sys.getsizeof(obj)}')
                         ])
-                ] if isinstance(obj, BytesIO) else \
+                ] if isinstance(obj, BufferedIOBase) else \
                     _throw(f'Unknown {obj}')
         nodes.append(MetaInfo('File', items = [
             MetaInfo(f'Path: {file.path}'),
@@ -137,7 +324,9 @@ class MetaManager:
         currentPath = None; currentFolder = None
 
         # parse paths
-        for file in sorted(archive.files, key = lambda x: x.path):
+        files = archive.files
+        for file in sorted(files, key = lambda x: x.path) if not isinstance(files, FileTable) else \
+            (files[i] for i in sorted(range(len(files)), key = files.path)):
             # next path, skip empty
             path = file.path[archive.pathSkip:]
             if not path: continue
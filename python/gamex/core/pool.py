@@ -0,0 +1,133 @@
+from __future__ import annotations
+import os, io, threading
+from collections import OrderedDict
+from openstk.core import BinaryReader
+
+# tag::FileHandles[]
+# FileHandles - process-wide LRU of shared read-only descriptors, capped across all archives
+class FileHandles:
+    maxOpen: int = 64
+    default: FileHandles = None
+
+    def __init__(self, maxOpen: int = None):
+        self.maxOpen = maxOpen or FileHandles.maxOpen
+        self.handles: OrderedDict[str, list] = OrderedDict() # path -> [fd, size, refs]
+        self.lock = threading.Lock()
+        self.opens = 0; self.closes = 0; self.hits = 0
+    def __repr__(self): return f'FileHandles:{len(self.handles)}/{self.maxOpen}'
+
+    def _acquire(self, path: str) -> list:
+        with self.lock:
+            if (z := self.handles.get(path)) != None: z[2] += 1; self.handles.move_to_end(path); self.hits += 1; return z
+            fd = os.open(path, os.O_RDONLY | getattr(os, 'O_BINARY', 0)); self.opens += 1
+            z = self.handles[path] = [fd, os.fstat(fd).st_size, 1]
+            self._trim()
+            return z
+
+    def _release(self, z: list) -> None:
+        with self.lock: z[2] -= 1; self._trim()
+
+    # closes least recently used idle descriptors over the cap
+    def _trim(self) -> None:
+        over = len(self.handles) - self.maxOpen
+        if over <= 0: return
+        for path in [k for k, v in self.handles.items() if v[2] <= 0][:over]:
+            os.close(self.handles.pop(path)[0]); self.closes += 1
+
+    def size(self, path: str) -> int:
+        z = self._acquire(path)
+        try: return z[1]
+        finally: self._release(z)
+
+    # reads into b at a position without touching a shared file position
+    def pread(self, path: str, b: memoryview, position: int) -> int:
+        z = self._acquire(path)
+        try:
+            if hasattr(os, 'preadv'): return os.preadv(z[0], [b], position)
+            data = os.pread(z[0], len(b), position); b[:len(data)] = data
+            return len(data)
+        finally: self._release(z)
+
+    # closes the idle descriptor of a path, or all idle descriptors
+    def close(self, path: str = None) -> None:
+        with self.lock:
+            for k in [k for k, v in self.handles.items() if v[2] <= 0 and (path == None or k == path)]:
+                os.close(self.handles.pop(k)[0]); self.closes += 1
+
+    def stats(self) -> dict[str, int]: return { 'open': len(self.handles), 'maxOpen': self.maxOpen, 'opens': self.opens, 'closes': self.closes, 'hits': self.hits }
+
+FileHandles.default = FileHandles()
+# end::FileHandles[]
+
+# PreadStream - a raw stream with its own position over a shared descriptor
+class PreadStream(io.RawIOBase):
+    def __init__(self, handles: FileHandles, path: str):
+        super().__init__()
+        self.handles = handles
+        self.path = path
+        self.length = handles.size(path)
+        self.position = 0
+    def readable(self) -> bool: return True
+    def seekable(self) -> bool: return True
+    def tell(self) -> int: return self.position
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        match whence:
+            case io.SEEK_SET: self.position = offset
+            case io.SEEK_CUR: self.position += offset
+            case io.SEEK_END: self.position = self.length + offset
+        return self.position
+    def readinto(self, b: memoryview) -> int:
+        if self.position >= self.length: return 0
+        b = memoryview(b).cast('B')
+        n = self.handles.pread(self.path, b[:self.length - self.position], self.position)
+        self.position += n
+        return n
+
+# tag::ReaderPool[]
+# ReaderPool - bounded pool of readers for one container with thread-safe checkout
+class ReaderPool:
+    def __init__(self, factory: callable, retain: int = 10, onDispose: callable = None):
+        self.factory = factory
+        self.retain = retain
+        self.onDispose = onDispose
+        self.idle: list[BinaryReader] = []
+        self.lock = threading.Lock()
+        self.created = 0; self.reused = 0; self.dropped = 0
+    def __repr__(self): return f'ReaderPool:{len(self.idle)}/{self.retain}'
+
+    # creates a pool over a local file, reading through shared positional descriptors
+    @staticmethod
+    def local(path: str, retain: int = 10, handles: FileHandles = None) -> ReaderPool:
+        handles = handles or FileHandles.default
+        return ReaderPool(lambda: BinaryReader(io.BufferedReader(PreadStream(handles, path), 0x10000)), retain, lambda: handles.close(path))
+
+    def get(self) -> BinaryReader:
+        with self.lock:
+            if self.idle: self.reused += 1; return self.idle.pop()
+            self.created += 1
+        return self.factory()
+
+    def release(self, r: BinaryReader) -> None:
+        r.seek(0)
+        with self.lock:
+            if len(self.idle) < self.retain: self.idle.append(r); return
+            self.dropped += 1
+        r.dispose()
+
+    def action(self, func: callable) -> None:
+        r = self.get()
+        try: func(r)
+        finally: self.release(r)
+
+    def func(self, func: callable) -> object:
+        r = self.get()
+        try: return func(r)
+        finally: self.release(r)
+
+    def dispose(self) -> None:
+        with self.lock: idle = self.idle; self.idle = []
+        for r in idle: r.dispose()
+        if self.onDispose: self.onDispose()
+
+    def stats(self) -> dict[str, int]: return { 'idle': len(self.idle), 'retain': self.retain, 'created': self.created, 'reused': self.reused, 'dropped': self.dropped }
+# end::ReaderPool[]
@@ -1,12 +1,15 @@
 import os
 from io import BytesIO
-from itertools import groupby
+from struct import pack
+from itertools import groupby, repeat
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from enum import Enum
 from numpy import ndarray
 from openstk.core import log, Int3, IWriteToStream, CellManager, IDatabase
-from gamex import FileSource, ArcBinaryT, MetaManager, MetaInfo, MetaContent, IHaveMetaInfo, DesSer
-from gamex.families.Uncore.formats.compression import decompressLz4, decompressZlib
-from gamex.families.Bethesda.formats.records import ITes3Name, FormType, Reader, Record, RecordGroup, LTEXRecord, LANDRecord, CELLRecord
+from openstk.vfx import DirectoryFileSystem
+from gamex import FileSource, FileTable, ArcBinaryT, MetaManager, MetaInfo, MetaContent, IHaveMetaInfo, DesSer
+from gamex.families.Uncore.formats.compression import decompressLz4, decompressZlib, getCodec
+from gamex.families.Bethesda.formats.records import ITes3Name, FormType, Reader, Record, RecordGroup, CellIndex, RecordIndex, LTEXRecord, LANDRecord, CELLRecord
 
 # types
 type Vector3 = ndarray
@@ -14,9 +17,12 @@ type Vector3 = ndarray
 # typedefs
 class BinaryReader: pass
 class BinaryArchive: pass
+class MultiArchive: pass
 
 # Binary_Ba2
 class Binary_Ba2(ArcBinaryT):
+    cacheVersion = 2
+
     #region Headers : TES5
 
     # Default header data
@@ -132,10 +138,9 @@ class Binary_Ba2(ArcBinaryT):
                         texc5s = r.readSArray(self.TEXC5, tex5.numChunks)
                         texc5 = texc5s[0]
                         files[i] = FileSource(
-                            fileInfo = tex5,
-                            packedSize = texc5.packedSize,
-                            fileSize = texc5.fileSize,
-                            offset = texc5s.offset,
+                            packedSize = sum(s.packedSize for s in texc5s),
+                            fileSize = sum(s.fileSize for s in texc5s),
+                            offset = texc5.offset,
                             tag = (tex5, texc5s))
                         i += 1
                 # GNMF BA2 Format
@@ -144,7 +149,6 @@ class Binary_Ba2(ArcBinaryT):
                         gnmf5 = r.readS(self.GNMF5)
                         texc5s = r.readSArray(self.TEXC5, gnmf5.numChunks)
                         files[i] = FileSource(
-                            fileInfo = gnmf5,
                             packedSize = gnmf5.packedSize,
                             fileSize = gnmf5.fileSize,
                             offset = gnmf5.offset,
@@ -155,33 +159,111 @@ class Binary_Ba2(ArcBinaryT):
             # assign full names to each file
             if hdr5.nameTableOffset > 0:
                 r.seek(hdr5.nameTableOffset)
-                path = r.readL16Encoding().replace('\\', '/')
-                for file in files: file.path = path
+                for file in files: file.path = r.readL16Encoding().replace('\\', '/')
     # end::Binary_Ba2.read[]
 
+    # dataRange - tag::Binary_Ba2.dataRange[]
+    def dataRange(self, source: BinaryArchive, file: FileSource) -> tuple[str, int, int]:
+        return (None, file.offset, file.packedSize if file.compressed != 0 else file.fileSize) if file.tag == None else None
+    # end::Binary_Ba2.dataRange[]
+
     # readData - tag::Binary_Ba2.readData[]
     def readData(self, source: BinaryArchive, r: BinaryReader, file: FileSource, option: object = None) -> BytesIO:
-        r.seek(file.offset)
-
         # General BA2 Format
-        if file.fileInfo == None:
+        if file.tag == None:
+            r.seek(file.offset)
             return BytesIO(
                 decompressZlib(r, file.packedSize, file.fileSize) if file.compressed != 0 else \
                 r.readBytes(file.fileSize))
 
-        # Texture BA2 Format
-        elif file.fileInfo is self.TEX5:
-            pass
-
-        # GNMF BA2 Format
-        elif file.fileInfo is self.GNMF5:
-            pass
-
-        else: raise Exception(f'Unknown fileInfo: {file.fileInfo}')
+        # Texture and GNMF BA2 Format
+        return BytesIO(self.readTexture(r, file, option.mips, option.parallel) if isinstance(option, Binary_Ba2.TextureOption) else self.readTexture(r, file))
     # end::Binary_Ba2.readData[]
 
+    #region Texture - tag::Binary_Ba2.texture[]
+
+    # DXGI formats, as (fourCC, bits per pixel, rgba masks), a fourCC of DX10 adds the DXT10 header
+    DX10 = 0x30315844
+    DXGI = {
+        71: (0x31545844, 4, None),      # BC1_UNORM: DXT1
+        72: (DX10, 4, None),            # BC1_UNORM_SRGB
+        74: (0x33545844, 8, None),      # BC2_UNORM: DXT3
+        77: (0x35545844, 8, None),      # BC3_UNORM: DXT5
+        78: (DX10, 8, None),            # BC3_UNORM_SRGB
+        80: (DX10, 4, None),            # BC4_UNORM
+        83: (0x32495441, 8, None),      # BC5_UNORM: ATI2
+        84: (DX10, 8, None),            # BC5_SNORM
+        98: (DX10, 8, None),            # BC7_UNORM
+        99: (DX10, 8, None),            # BC7_UNORM_SRGB
+        28: (0, 32, (0x000000FF, 0x0000FF00, 0x00FF0000, 0xFF000000)), # R8G8B8A8_UNORM
+        29: (0, 32, (0x000000FF, 0x0000FF00, 0x00FF0000, 0xFF000000)), # R8G8B8A8_UNORM_SRGB
+        87: (0, 32, (0x00FF0000, 0x0000FF00, 0x000000FF, 0xFF000000)), # B8G8R8A8_UNORM
+        88: (0, 32, (0x00FF0000, 0x0000FF00, 0x000000FF, 0xFF000000)), # B8G8R8X8_UNORM
+        61: (0, 8, (0xFF, 0, 0, 0)),    # R8_UNORM
+    }
+    _pool: ThreadPoolExecutor = None
+
+    # TextureOption - a getData option reading only the chunks of mips (first, last), like (-1, -1) for the smallest mip of a thumbnail
+    class TextureOption:
+        def __init__(self, mips: tuple[int, int] = None, parallel: bool = False): self.mips = mips; self.parallel = parallel
+        def __repr__(self): return f'TextureOption:{self.mips}'
+
+    # builds the dds header of a texture for numMips mips from startMip
+    @staticmethod
+    def ddsHeader(tex: TEX5, startMip: int = 0, numMips: int = None) -> bytes:
+        if tex.format not in Binary_Ba2.DXGI: raise Exception(f'Unsupported DDS format: {tex.format}')
+        fourCC, bpp, masks = Binary_Ba2.DXGI[tex.format]
+        width = max(1, tex.width >> startMip); height = max(1, tex.height >> startMip)
+        numMips = numMips or tex.numMips - startMip
+        # DDSD: CAPS | HEIGHT | WIDTH | PIXELFORMAT | MIPMAPCOUNT | LINEARSIZE, DDSCAPS: TEXTURE | COMPLEX | MIPMAP, DDSCAPS2: CUBEMAP_ALLFACES
+        pf = pack('<8I', 32, 0x4, fourCC, 0, 0, 0, 0, 0) if fourCC else pack('<8I', 32, 0x41 if masks[3] else 0x40, 0, bpp, *masks)
+        header = pack('<8I11I', 0x20534444, 124, 0x000A1007, height, width, width * height * bpp // 8, 0, numMips, *([0] * 11)) + pf + \
+            pack('<5I', 0x401008, 0xFE00 if tex.isCubemap else 0, 0, 0, 0)
+        # DXT10: dxgiFormat, TEXTURE2D, TEXTURECUBE, arraySize, ALPHA_MODE_UNKNOWN
+        return header + pack('<5I', tex.format, 3, 0x4 if tex.isCubemap else 0, 1, 0) if fourCC == Binary_Ba2.DX10 else header
+
+    # builds the gnf header of a GNMF texture
+    @staticmethod
+    def gnfHeader(gnmf: GNMF5, fileSize: int) -> bytes:
+        # magic, content size, version, texture count, alignment, unused, size + header size (big endian)
+        return pack('<2I4B', 0x20464E47, 248, 0x2, 0x1, 0x8, 0x0) + pack('>I', fileSize + 256) + gnmf._header[:32].ljust(32, b'\x00') + bytes(208)
+
+    # reads a texture, or only the chunks covering mips (first, last) where negative mips count from the smallest,
+    # decompressing the chunks in parallel when asked
+    def readTexture(self, r: BinaryReader, file: FileSource, mips: tuple[int, int] = None, parallel: bool = False) -> bytes:
+        tex, chunks = file.tag
+        if isinstance(tex, Binary_Ba2.GNMF5):
+            # the first chunk is inline with the gnmf record and holds the mips before the next chunk, gnmf textures are always read whole
+            chunks = [Binary_Ba2.TEXC5((tex.offset, tex.packedSize, tex.fileSize, 0, max(chunks[0].startMip - 1, 0) if chunks else 0xFFFF, 0))] + list(chunks)
+            header = Binary_Ba2.gnfHeader(tex, sum(s.fileSize for s in chunks))
+        else:
+            startMip, endMip = 0, tex.numMips - 1
+            if mips and not tex.isCubemap:
+                first, last = (s if s >= 0 else tex.numMips + s for s in mips)
+                chunks = [s for s in chunks if s.endMip >= first and s.startMip <= last] or chunks[-1:]
+                startMip, endMip = chunks[0].startMip, chunks[-1].endMip
+            header = Binary_Ba2.ddsHeader(tex, startMip, endMip - startMip + 1)
+        # each chunk inflates into its own slice of the result
+        res = bytearray(len(header) + sum(s.fileSize for s in chunks)); res[:len(header)] = header
+        view = memoryview(res); codec = getCodec('zlib'); raw = []; pos = len(header)
+        for s in chunks:
+            r.seek(s.offset)
+            if s.packedSize: raw.append((r.readBytes(s.packedSize), view[pos:pos + s.fileSize]))
+            else: view[pos:pos + s.fileSize] = r.readBytes(s.fileSize)
+            pos += s.fileSize
+        if parallel and len(raw) > 1:
+            if not Binary_Ba2._pool: Binary_Ba2._pool = ThreadPoolExecutor()
+            list(Binary_Ba2._pool.map(lambda s: codec.decompressInto(*s), raw))
+        else:
+            for s in raw: codec.decompressInto(*s)
+        return res
+
+    #endregion - end::Binary_Ba2.texture[]
+
 # Binary_Bsa
 class Binary_Bsa(ArcBinaryT):
+    cacheVersion = 1
+
     #region Headers : TES4
 
     OB_MAGIC = 0x00415342       # Magic for Oblivion BSA, the literal string "BSA\0".
@@ -269,7 +351,6 @@ class Binary_Bsa(ArcBinaryT):
 
     # read - tag::Binary_Bsa.read[]
     def read(self, source: BinaryArchive, r: BinaryReader, tag: object = None) -> None:
-        files: list[FileSource]
         magic = source.magic = r.readUInt32()
 
         # Oblivion - Skyrim
@@ -290,50 +371,69 @@ class Binary_Bsa(ArcBinaryT):
                 [x.fileCount for x in r.readSArray(self.DIR4, hdr4.folderCount)]
 
             # read-all folder files
-            i = 0
-            source.files = files = [None] * hdr4.fileCount
+            entries = []
             for f in range(hdr4.folderCount):
                 folderName = r.readFAString(r.readByte() - 1).replace('\\', '/')
                 r.skip(1)
                 for s in r.readSArray(self.FILE4, foldersFiles[f]):
                     compressed = (s.size & self.FILE4_SIZECOMPRESS) != 0
                     packedSize = s.size ^ self.FILE4_SIZECOMPRESS if compressed else s.size
-                    files[i] = FileSource(
-                        path = folderName,
-                        offset = s.offset,
-                        compressed = 1 if compressed ^ compressedToggle else 0,
-                        packedSize = packedSize,
-                        fileSize = packedSize & self.FILE4_SIZEMASK if source.version == self.SE_VERSION else packedSize)
-                    i += 1
+                    entries.append((folderName, s.offset, 1 if compressed ^ compressedToggle else 0, packedSize))
 
             # read-all names
-            for file in files: file.path = f'{file.path}/{r.readVWString()}'
+            source.files = files = FileTable()
+            se = source.version == self.SE_VERSION
+            for folderName, offset, compressed, packedSize in entries:
+                files.append(
+                    path = f'{folderName}/{r.readVWString()}',
+                    offset = offset,
+                    compressed = compressed,
+                    packedSize = packedSize,
+                    fileSize = packedSize & self.FILE4_SIZEMASK if se else packedSize)
 
         # Morrowind
         elif magic == self.MW_MAGIC:
             hdr3 = r.readS(self.HDR3)
             dataOffset = 12 + hdr3.hashOffset + (hdr3.fileCount << 3)
 
-            # create filesources
-            i = 0
-            source.files = files = [None] * hdr3.fileCount
-            for s in r.readSArray(self.FILE3, hdr3.fileCount):
-                files[i] = FileSource(
-                    offset = dataOffset + s.fileOffset,
-                    compressed = 0,
-                    fileSize = s.size,
-                    packedSize = s.size)
-                i += 1
+            # read file records
+            file3s = r.readSArray(self.FILE3, hdr3.fileCount)
 
             # read filename offsets
             fnof3s = r.readPArray(None, 'I', hdr3.fileCount) # relative offset in filenames section
 
-            # read filenames
+            # read filenames, create filesources
             tell = r.tell()
-            for i in range(hdr3.fileCount): r.seek(tell + fnof3s[i]); files[i].path = r.readVAString(1000).replace('\\', '/')
+            source.files = files = FileTable()
+            for i, s in enumerate(file3s):
+                r.seek(tell + fnof3s[i])
+                files.append(
+                    path = r.readVAString(1000).replace('\\', '/'),
+                    offset = dataOffset + s.fileOffset,
+                    compressed = 0,
+                    fileSize = s.size,
+                    packedSize = s.size)
         else: raise Exception('BAD MAGIC')
     # end::Binary_Bsa.read[]
 
+    # readDataView - tag::Binary_Bsa.readDataView[]
+    def readDataView(self, source: BinaryArchive, file: FileSource, option: object = None) -> object:
+        if file.compressed != 0 or not (view := source.getView()): return None
+        offset = file.offset; fileSize = file.fileSize
+        if source.tag:
+            prefixLength = view[offset] + 1
+            if source.version == self.SE_VERSION: fileSize -= prefixLength
+            offset += prefixLength
+        return source.readView(offset, max(fileSize, 0))
+    # end::Binary_Bsa.readDataView[]
+
+    # dataRange - tag::Binary_Bsa.dataRange[]
+    def dataRange(self, source: BinaryArchive, file: FileSource) -> tuple[str, int, int]:
+        # an embedded name is counted in the size only for SE, elsewhere its length is known only by reading it
+        if source.tag and source.version != self.SE_VERSION: return None
+        return (None, file.offset, file.fileSize & self.FILE4_SIZEMASK)
+    # end::Binary_Bsa.dataRange[]
+
     # readData - tag::Binary_Bsa.readData[]
     def readData(self, source: BinaryArchive, r: BinaryReader, file: FileSource, option: object = None) -> BytesIO:
         # position
@@ -359,6 +459,8 @@ class Binary_Esm(ArcBinaryT, IDatabase, CellManager.IQueryFunc):
     format: FormType
     record: Record
     groups: dict[FormType, RecordGroup]
+    cells: CellIndex
+    records: RecordIndex = None
 
     @staticmethod
     def getFormat(game: str) -> FormType:
@@ -380,23 +482,42 @@ class Binary_Esm(ArcBinaryT, IDatabase, CellManager.IQueryFunc):
         self.groups = {}
         self.format = self.getFormat(source.game.id)
         r = Reader(b, source.binPath, self.format, source.game.id in ['Fallout3', 'FalloutNV'])
+        cells = self.cells = CellIndex(source, r.format, r.tes4a)
+        self.records = None
         record = self.record = Record.factory(r.format, FormType(r.readUInt32()))
         record.read(r)
         record.readFields(r)
         files = source.files = [FileSource(path = str(record.type), tag = record)]
+        groups = []
         for s in RecordGroup.readAll(r):
             self.groups[s.label] = s
-            if s.preload: s.read(r, files)
+            # cells and worlds are only indexed
+            if s.label == FormType.CELL or s.label == FormType.WRLD: cells.scan(r, s); r.seek(s.position + s.dataSize)
+            elif s.preload: groups.append(s); r.seek(s.position + s.dataSize)
             else: r.seek(r.tell() + s.dataSize)
+        self.readGroups(source, r, groups, files, cells)
+        if cells.worlds: files.append(FileSource(path = f'{FormType.WRLD}/{FormType.WRLD}', flags = FormType.WRLD, tag = list(cells.worlds.values())))
+        # indexed cells and lands, parsed when the node is opened
+        for type in (FormType.CELL, FormType.LAND):
+            if (node := cells.node(type)): files.append(FileSource(path = str(type) if r.format == FormType.TES3 else f'{FormType.CELL}/{type}', flags = type, tag = node))
+
+    # reads the top-level groups, in a process pool when the archive is parallel (BethesdaArchive.parallel) and the plugin is a local file
+    def readGroups(self, source: BinaryArchive, r: Reader, groups: list[RecordGroup], files: list[FileSource], cells: CellIndex) -> None:
+        parallel = getattr(source, 'parallel', 0)
+        path = source.vfx.fileInfo(source.binPath)[0] if parallel > 1 and len(groups) > 1 and r.format != FormType.TES3 and isinstance(source.vfx, DirectoryFileSystem) else None
+        if not path:
+            for s in groups: s.read(r, files, cells)
+            return
+        with ProcessPoolExecutor(min(parallel, len(groups))) as pool:
+            results = list(pool.map(RecordGroup.readFile, repeat(path), repeat(r.format), repeat(r.tes4a), groups))
+        # merged in header order, so the result matches an inline read
+        for s, (z, zfiles) in zip(groups, results): self.groups[s.label] = z; files.extend(zfiles)
     # end::Binary_Esm.read[]
 
     # process - tag::Binary_Esm.process[]
     MANYsById: dict[str, Record]
     LTEXsById: dict[int, CellManager.ILtex]
-    LANDsById: dict[Int3, CellManager.ILand]
-    CELLsById: dict[Int3, CellManager.ICell]
-    CELLsByName: dict[str, CellManager.ICell]
-    WRLDsById: dict[int, tuple]
+    WRLDsById: dict[int, Record]
     # LTEXsByEid: dict[str, CellManager.ILtex]
 
     def process(self, source: BinaryArchive) -> None:
@@ -404,14 +525,8 @@ class Binary_Esm(ArcBinaryT, IDatabase, CellManager.IQueryFunc):
             g0 = self.groups[0]; a = g0.records; g = g0.recordsByType
             self.MANYsById = {s.EDID:s for s in a if s.EDID if isinstance(s, ITes3Name)}
             self.LTEXsById = {s.INTV:s for s in g[FormType.LTEX]} if FormType.LTEX in g else {}
-            self.LANDsById = {s.gridId:s for s in g[FormType.LAND]} if FormType.LAND in g else {}
-            cells = g[FormType.CELL] if FormType.CELL in g else []
-            self.CELLsById = {s.gridId:s for s in cells if not s.isInterior}
-            self.CELLsByName = {s.EDID:s for s in cells if s.isInterior}
             return
-        wrldsByLabel = self.groups[FormType.WRLD].groupsByLabel
-        self.WRLDsById = {s.id:wrldsByLabel[s.id] for s in self.groups[FormType.WRLD].open().records}
-        # self.LTEXsByEid = {s.EDID:(s, wrldsByLabel[s.id]) for s in self.groups[FormType.LTEX].open().records}
+        self.WRLDsById = self.cells.worlds
     # end::Binary_Esm.process[]
 
     #region CellQuery - tag::Binary_Esm.cellQuery[]
@@ -436,9 +551,9 @@ class Binary_Esm(ArcBinaryT, IDatabase, CellManager.IQueryFunc):
         def getCellId(self, point: Vector3) -> Int3: return Int3(int(point[0] // Binary_Esm._cellLengthInMeters), int(point[2] // Binary_Esm._cellLengthInMeters), 0)
         def findAnyByName(self, name: str) -> object: return self._.MANYsById.get(name)
         def findLtex(self, index: int) -> object: return self._.LTEXsById.get(index)
-        def findLand(self, cell: Int3) -> object: return self._.LANDsById.get(cell)
-        def findCell(self, cell: Int3) -> object: return self._.CELLsById.get(cell)
-        def findCellByName(self, name: str) -> object: return self._.CELLsByName.get(name)
+        def findLand(self, cell: Int3) -> object: return self._.cells.findLand(cell)
+        def findCell(self, cell: Int3) -> object: return self._.cells.findCell(cell)
+        def findCellByName(self, name: str) -> object: return self._.cells.findCellByName(name)
     
     class ElseCellQuery(CellManager.IQuery):
         def __init__(self, _: 'Binary_Esm'):
@@ -451,19 +566,9 @@ class Binary_Esm(ArcBinaryT, IDatabase, CellManager.IQueryFunc):
         def getCellId(self, point: Vector3) -> Int3: return Int3(int(point[0] // Binary_Esm._cellLengthInMeters), int(point[2] // Binary_Esm._cellLengthInMeters), self.world)
         def findAnyByName(self, name: str) -> object: return self._.MANYsById.get(name)
         def findLtex(self, index: int) -> object: raise Exception()
-        def findLand(self, cell: Int3) -> object:
-            world = self._.WRLDsById[cell.Z]
-            for wrld in world[1]:
-                for cellBlock in wrld.ensureWrldAndCell(cell):
-                    if cell in cellBlock.LANDsById: return cellBlock.LANDsById[cell]
-            return None
-        def findCell(self, cell: Int3) -> object:
-            world = self._.WRLDsById[cell.Z]
-            for wrld in world[1]:
-                for cellBlock in wrld.ensureWrldAndCell(cell):
-                    if cell in cellBlock.CELLsById: return cellBlock.CELLsById[cell]
-            return None
-        def findCellByName(self, name: str) -> object: raise Exception()
+        def findLand(self, cell: Int3) -> object: return self._.cells.findLand(cell)
+        def findCell(self, cell: Int3) -> object: return self._.cells.findCell(cell)
+        def findCellByName(self, name: str) -> object: return self._.cells.findCellByName(name)
 
     #endregion - end::Binary_Esm.cellQuery[]
 
@@ -481,8 +586,111 @@ class Binary_Esm(ArcBinaryT, IDatabase, CellManager.IQueryFunc):
     
     def query(self, s: object) -> object:
         match s:
+            case FileSource(tag = CellIndex.Node() as z): return Binary_Esm.FindTAG[Record](z.records())
             case FileSource(): return Binary_Esm.FindTAG[Record](s.tag)
             case _: return _throw('OutOfRange')
 
+    # gets the FormID and EditorID index of the plugin, loaded from its sidecar or built once
+    def recordIndex(self) -> RecordIndex:
+        if not self.records: self.records = RecordIndex.open(self.cells.source, self.format, self.cells.tes4a)
+        return self.records
+
+    def findRecord(self, id: int) -> Record: return self.recordIndex().get(id)
+    def findRecordByEditorId(self, name: str) -> Record: return self.recordIndex().getByEditorId(name)
+
     #endregion - end::Binary_Esm.query[]
-  
\ No newline at end of file
+
+# tag::LoadOrder[]
+# LoadOrder - an ordered stack of plugins where later records override earlier ones by FormID, queried like a single plugin
+class LoadOrder:
+    class Plugin:
+        def __init__(self, archive: BinaryArchive, header: Record, records: RecordIndex, cells: CellIndex, remap: list[int]):
+            self.archive = archive
+            self.header = header
+            self.records = records
+            self.cells = cells
+            self.remap = remap
+        def __repr__(self): return f'{os.path.basename(self.archive.binPath)}'
+        # maps a plugin FormID to a load order FormID, the high byte indexes the masters then the plugin itself
+        def globalId(self, id: int) -> int: return (self.remap[min(id >> 24, len(self.remap) - 1)] << 24) | (id & 0xFFFFFF) if self.remap else id
+
+    # the merged CellIndex surface
+    class Cells:
+        def __init__(self, _: 'LoadOrder'): self._ = _
+        def findCell(self, cell: Int3) -> Record: return self._._cell(self._.cellsById.get(cell))
+        def findCellByName(self, name: str) -> Record: return self._._cell(self._.cellsByName.get(name))
+        def findLand(self, cell: Int3) -> Record: return self._._cell(self._.landsById.get(cell))
+        def terrain(self, x0: int, y0: int, x1: int, y1: int, world: int = 0) -> tuple[ndarray, ndarray, ndarray]: return LANDRecord.stitch(self.findLand, x0, y0, x1, y1, world)
+
+    class Named:
+        def __init__(self, _: 'LoadOrder'): self._ = _
+        def get(self, name: str) -> Record: return self._.findRecordByEditorId(name)
+
+    def __init__(self, archives: list[BinaryArchive] = None):
+        self.format: FormType = None
+        self.tes4a = False
+        self.plugins: list[LoadOrder.Plugin] = []
+        self.pluginsByName: dict[str, int] = {}
+        # winners, as (plugin, local id or offset)
+        self.byId: dict[int, tuple[int, int]] = {}
+        self.byEditorId: dict[str, tuple[int, int]] = {}
+        self.cellsById: dict[Int3, tuple[int, int]] = {}
+        self.cellsByName: dict[str, tuple[int, int]] = {}
+        self.landsById: dict[Int3, tuple[int, int]] = {}
+        self.WRLDsById: dict[int, Record] = {}
+        self.LTEXsById: dict[int, Record] = {}
+        self.cells = LoadOrder.Cells(self)
+        self.MANYsById = LoadOrder.Named(self)
+        for s in archives or []: self.add(s)
+    def __repr__(self): return f'LoadOrder:{self.plugins}'
+
+    @staticmethod
+    def fromArchive(arc: MultiArchive) -> 'LoadOrder': return LoadOrder([s for s in arc.archives if os.path.splitext(s.binPath)[1].lower() in ('.esm', '.esp')])
+
+    # adds a plugin on top of the load order, in time proportional to the plugin
+    def add(self, archive: BinaryArchive) -> Plugin:
+        format = Binary_Esm.getFormat(archive.game.id); tes4a = archive.game.id in ['Fallout3', 'FalloutNV']
+        if self.format == None: self.format = format; self.tes4a = tes4a
+        elif format != self.format: raise Exception(f'Mixed plugin formats: {format} over {self.format}')
+        index = len(self.plugins)
+        cells = CellIndex(archive, format, tes4a)
+        def _lambdax(b: BinaryReader) -> Record:
+            r = Reader(b, archive.binPath, format, tes4a)
+            header = Record.factory(format, FormType(r.readUInt32())); header.read(r); header.readFields(r)
+            for s in RecordGroup.readAll(r):
+                if format == FormType.TES3 or s.label == FormType.CELL or s.label == FormType.WRLD: cells.scan(r, s)
+                r.seek(s.position + s.dataSize)
+            return header
+        header = archive.readerT(_lambdax)
+        # remap master indices
+        masters = getattr(header, 'MASTs', None) or []
+        remap = None
+        if format != FormType.TES3:
+            if (missing := [s for s in masters if s.lower() not in self.pluginsByName]): raise Exception(f'Missing masters of {archive.binPath}: {missing}')
+            remap = [self.pluginsByName[s.lower()] for s in masters] + [index]
+        records = RecordIndex.open(archive, format, tes4a)
+        plugin = LoadOrder.Plugin(archive, header, records, cells, remap)
+        self.plugins.append(plugin)
+        self.pluginsByName[os.path.basename(archive.binPath).lower()] = index
+        # override
+        gid = plugin.globalId
+        if format != FormType.TES3:
+            for id in records.byId: self.byId[gid(id)] = (index, id)
+        for k, id in records.byEditorId.items(): self.byEditorId[k] = (index, id)
+        for k, v in cells.cells.items(): self.cellsById[Int3(k.X, k.Y, gid(k.Z) if k.Z else 0)] = (index, v)
+        for k, v in cells.lands.items(): self.landsById[Int3(k.X, k.Y, gid(k.Z) if k.Z else 0)] = (index, v)
+        for k, v in cells.cellsByName.items(): self.cellsByName[k] = (index, v)
+        for k, v in cells.worlds.items(): self.WRLDsById[gid(k)] = v
+        if format == FormType.TES3:
+            for id, v in records.byId.items():
+                if v[0] == FormType.LTEX and (z := records.get(id)): self.LTEXsById[z.INTV] = z
+        return plugin
+
+    def _cell(self, z: tuple[int, int]) -> Record: return self.plugins[z[0]].cells.get(z[1]) if z else None
+
+    # gets the winning record of a load order FormID
+    def findRecord(self, id: int) -> Record: return self.plugins[z[0]].records.get(z[1]) if (z := self.byId.get(id)) else None
+    def findRecordByEditorId(self, name: str) -> Record: return self.plugins[z[0]].records.get(z[1]) if (z := self.byEditorId.get(name)) else None
+
+    def getQuery(self) -> CellManager.IQuery: return Binary_Esm.Tes3CellQuery(self) if self.format == FormType.TES3 else Binary_Esm.ElseCellQuery(self)
+# end::LoadOrder[]
@@ -1,15 +1,19 @@
-import os, sys
+import os, sys, marshal, hashlib
 from io import BytesIO
 from itertools import groupby
 from typing import TypeVar, get_args
 from enum import IntEnum, IntFlag
-from struct import unpack
-from numpy import ndarray, array, zeros
+from struct import unpack, unpack_from
+from threading import Lock
+from collections import OrderedDict
+from math import isqrt
+from numpy import ndarray, array, zeros, full, frombuffer, cumsum, linspace, rint, int8, uint8, float32
 from collections.abc import Iterator
 from openstk.core import log, Byte2, Int2, Byte3, Int3, Float3, CellManager
 from openstk.sys.drawing import Color
 from gamex import FileSource, BinaryReader, ArcBinaryT
 from gamex.core.globalx import ByteColor3, ByteColor4
+from gamex.core.cache import IndexCache
 from gamex.families.Uncore.formats.compression import decompressZlib2
 # sys.setrecursionlimit(1500)
 
@@ -1054,13 +1058,10 @@ class Record:
         FormType.WWED: lambda f: WWEDRecord(),
         FormType.ZOOM: lambda f: ZOOMRecord(),
     }
-    _cellsLoaded: int = 0
     @staticmethod
     def factory(format: FormType, type: FieldType) -> 'Record':
         record = None
-        if type == FormType.CELL: Record._cellsLoaded += 1
-        if type == FormType.CELL and Record._cellsLoaded > 1000: record = Record() # hack to limit cells loading
-        elif not (z := Record._mapx.get(type)): print(f'Unsupported record type: {type}'); record = Record()
+        if not (z := Record._mapx.get(type)): print(f'Unsupported record type: {type}'); record = Record()
         elif Record._factorySet and type != FormType.TES3 and type != FormType.TES4 and type not in Record._factorySet: record = Record()
         else: record = z(format); record.type = type
         return record
@@ -1261,17 +1262,20 @@ class RecordGroup:
             if type != FormType.GRUP: raise Exception(f'{type} not GRUP')
             yield RecordGroup(r, '')
     
-    def read(self, r: Reader, files: list[FileSource]) -> None:
+    def read(self, r: Reader, files: list[FileSource], cells: 'CellIndex' = None) -> None:
         r.seek(self.position)
         end = self.position + self.dataSize
         while not r.atEnd(end):
+            position = r.tell()
             type = FormType(r.readUInt32())
             if type == FormType.GRUP:
                 s = RecordGroup(r, self.path)
-                if s.preload or True: s.read(r, files)
+                if s.preload or True: s.read(r, files, cells)
                 else: r.seek(r.tell() + s.dataSize)
                 _nca(self, 'groups', lambda: []).append(s)
                 continue
+            # cells and lands are indexed, and parsed on demand
+            if cells and type in CellIndex.types: cells.add(r, type, position); continue
             record = Record.factory(r.format, type)
             record.read(r)
             if record.type == 0: r.skip(record.dataSize); continue
@@ -1287,6 +1291,231 @@ class RecordGroup:
     
     def open(self) -> 'RecordGroup': return self
 
+    # reads a group from its own handle on the plugin, used by the Binary_Esm.parallel pool
+    @staticmethod
+    def readFile(path: str, format: FormType, tes4a: bool, group: 'RecordGroup') -> tuple['RecordGroup', list[FileSource]]:
+        files = []
+        with open(path, 'rb') as f: group.read(Reader(BinaryReader(f), path, format, tes4a), files)
+        return group, files
+
+# parses the single record at position
+def readRecordAt(source: 'BinaryArchive', format: FormType, tes4a: bool, position: int) -> Record:
+    def _lambdax(b: BinaryReader) -> Record:
+        r = Reader(b, source.binPath, format, tes4a)
+        r.seek(position)
+        record = Record.factory(r.format, FormType(r.readUInt32()))
+        record.read(r)
+        record.readFields(r)
+        return record
+    return source.readerT(_lambdax, pooled = True) # records and cells load on demand
+
+# reads the records at positions with a single reader, in file order
+def readRecordsAt(source: 'BinaryArchive', format: FormType, tes4a: bool, positions: list[int]) -> list[Record]:
+    def _lambdax(b: BinaryReader) -> list[Record]:
+        r = Reader(b, source.binPath, format, tes4a)
+        records = []
+        for position in positions:
+            r.seek(position)
+            record = Record.factory(r.format, FormType(r.readUInt32()))
+            record.read(r)
+            record.readFields(r)
+            records.append(record)
+        return records
+    return source.readerT(_lambdax, pooled = True)
+
+# tag::CellIndex[]
+# CellIndex - file offsets of CELL and LAND records keyed by (gridX, gridY, world), parsed on demand with LRU eviction
+class CellIndex:
+    types = { FormType.CELL, FormType.LAND }
+    cacheSize: int = 512
+
+    def __init__(self, source: 'BinaryArchive', format: FormType, tes4a: bool):
+        self.source = source
+        self.format = format
+        self.tes4a = tes4a
+        self.cells: dict[Int3, int] = {}
+        self.cellsByName: dict[str, int] = {}
+        self.lands: dict[Int3, int] = {}
+        self.worlds: dict[int, Record] = {}
+        self.cache: OrderedDict[int, Record] = OrderedDict()
+        self.lock = Lock()
+        self.loads = 0; self.hits = 0
+    def __repr__(self): return f'CellIndex:{len(self.cells)}:{len(self.cellsByName)}:{len(self.lands)}'
+
+    # reads the fields of a record without parsing it, returning the raw data of the wanted fields
+    @staticmethod
+    def peekFields(r: Reader, record: Record, want: set[FieldType]) -> dict[FieldType, bytes]:
+        data = r.readBytes(record.dataSize)
+        if record._compressed: data = decompressZlib2(BinaryReader(BytesIO(data[4:])), len(data) - 4, unpack_from('<I', data)[0])
+        fields = {}; i = 0; end = len(data); large = 0
+        while i < end:
+            fieldType, fieldDataSize = unpack_from('<2I', data, i) if r.format == FormType.TES3 else unpack_from('<IH', data, i)
+            i += 8 if r.format == FormType.TES3 else 6
+            if large: fieldDataSize = large; large = 0
+            if fieldType == FieldType.XXXX: large = unpack_from('<I', data, i)[0]; i += fieldDataSize; continue
+            if fieldType in want and fieldType not in fields: fields[fieldType] = data[i:i + fieldDataSize]
+            if fieldType == FieldType.FRMR or len(fields) == len(want): break
+            i += fieldDataSize
+        return fields
+
+    # indexes the record at position, leaving the reader after it
+    def add(self, r: Reader, type: FormType, position: int, world: int = 0, cell: Int3 = None) -> Int3:
+        record = Record(); record.read(r); record.type = type
+        end = r.tell() + record.dataSize
+        match type:
+            case FormType.CELL:
+                fields = CellIndex.peekFields(r, record, { FieldType.EDID, FieldType.NAME, FieldType.DATA, FieldType.XCLC })
+                data = fields.get(FieldType.DATA)
+                if r.format == FormType.TES3:
+                    flags, gridX, gridY = unpack_from('<I2i', data) if data and len(data) >= 12 else (1, 0, 0)
+                else:
+                    flags = data[0] if data else 0
+                    gridX, gridY = unpack_from('<2i', z) if (z := fields.get(FieldType.XCLC)) else (0, 0)
+                if (flags & 0x01) == 0x01 or (r.format != FormType.TES3 and not fields.get(FieldType.XCLC)):
+                    name = fields.get(FieldType.EDID) or fields.get(FieldType.NAME)
+                    if name: self.cellsByName[name.rstrip(b'\x00').decode('latin-1')] = position
+                    cell = None
+                else: cell = Int3(gridX, gridY, world); self.cells[cell] = position
+            case FormType.LAND:
+                if r.format == FormType.TES3:
+                    fields = CellIndex.peekFields(r, record, { FieldType.INTV })
+                    if (z := fields.get(FieldType.INTV)): cell = Int3(*unpack_from('<2i', z), 0)
+                if cell: self.lands[cell] = position
+        r.seek(end)
+        return cell
+
+    # indexes the CELL and WRLD top groups, parsing only the WRLD records
+    def scan(self, r: Reader, group: RecordGroup, world: int = 0, cell: Int3 = None) -> None:
+        r.seek(group.position)
+        end = group.position + group.dataSize
+        while not r.atEnd(end):
+            position = r.tell()
+            type = FormType(r.readUInt32())
+            if type == FormType.GRUP:
+                s = RecordGroup(r, group.path)
+                match s.type:
+                    case RecordGroup.GroupType.WorldChildren: self.scan(r, s, int(s.label))
+                    case RecordGroup.GroupType.CellChildren: self.scan(r, s, world, cell)
+                    case RecordGroup.GroupType.CellPersistentChilden | RecordGroup.GroupType.CellTemporaryChildren | RecordGroup.GroupType.CellVisibleDistantChildren: self.scan(r, s, world, cell)
+                    case _: self.scan(r, s, world)
+                r.seek(s.position + s.dataSize)
+                continue
+            if type == FormType.WRLD:
+                record = Record.factory(r.format, type); record.read(r); record.readFields(r)
+                self.worlds[record.id] = record
+                continue
+            if type == FormType.CELL: cell = self.add(r, type, position, world); continue
+            if type == FormType.LAND: self.add(r, type, position, world, cell); continue
+            record = Record(); record.read(r); r.skip(record.dataSize)
+
+    # gets the record at position, parsing it on first use
+    def get(self, position: int) -> Record:
+        if position == None: return None
+        with self.lock:
+            if (record := self.cache.get(position)) != None: self.cache.move_to_end(position); self.hits += 1; return record
+        record = readRecordAt(self.source, self.format, self.tes4a, position)
+        with self.lock:
+            self.loads += 1
+            self.cache[position] = record
+            while len(self.cache) > CellIndex.cacheSize: self.cache.popitem(last = False)
+        return record
+
+    def findCell(self, cell: Int3) -> Record: return self.get(self.cells.get(cell))
+    def findCellByName(self, name: str) -> Record: return self.get(self.cellsByName.get(name))
+    def findLand(self, cell: Int3) -> Record: return self.get(self.lands.get(cell))
+
+    # Node - the indexed records of a type, listed as an explorer node and parsed when it is opened
+    class Node:
+        def __init__(self, index: 'CellIndex', positions: list[int]): self.index = index; self.positions = positions
+        def __repr__(self): return f'Node:{len(self.positions)}'
+        def __len__(self): return len(self.positions)
+        def records(self) -> list[Record]: return readRecordsAt(self.index.source, self.index.format, self.index.tes4a, self.positions)
+
+    # gets the node of the indexed CELL or LAND records, None when there are none
+    def node(self, type: FormType) -> 'CellIndex.Node':
+        positions = sorted({*self.cells.values(), *self.cellsByName.values()} if type == FormType.CELL else self.lands.values())
+        return CellIndex.Node(self, positions) if positions else None
+
+    # gets the stitched height, normal and colour maps of a region of cells
+    def terrain(self, x0: int, y0: int, x1: int, y1: int, world: int = 0) -> tuple[ndarray, ndarray, ndarray]: return LANDRecord.stitch(self.findLand, x0, y0, x1, y1, world)
+# end::CellIndex[]
+
+# tag::RecordIndex[]
+# RecordIndex - sidecar index of FormID to (group, offset, dataSize, compressed) and EditorID to FormID, stamped by plugin path, size and mtime
+# TES3 records have no FormID, their offset stands in for it
+class RecordIndex:
+    VERSION = 1
+
+    def __init__(self, source: 'BinaryArchive', format: FormType, tes4a: bool):
+        self.source = source
+        self.format = format
+        self.tes4a = tes4a
+        self.byId: dict[int, tuple[int, int, int, int]] = {}
+        self.byEditorId: dict[str, int] = {}
+    def __repr__(self): return f'RecordIndex:{len(self.byId)}'
+
+    # loads the sidecar index of a plugin, building and storing it on a miss
+    @staticmethod
+    def open(source: 'BinaryArchive', format: FormType, tes4a: bool) -> 'RecordIndex':
+        index = RecordIndex(source, format, tes4a)
+        key = index.key()
+        if key and os.path.exists(key[0]):
+            try:
+                with open(key[0], 'rb') as f:
+                    if marshal.load(f) == key[1]: index.byId, index.byEditorId = marshal.load(f); return index
+            except (OSError, EOFError, ValueError, TypeError): pass
+        source.readerT(lambda b: index.build(Reader(b, source.binPath, format, tes4a)))
+        if key: index.store(key)
+        return index
+
+    # the sidecar path and stamp, None when the archive does not use the index cache (IndexCache.enabled)
+    def key(self) -> tuple[str, tuple]:
+        if not getattr(self.source, 'useIndexCache', IndexCache.enabled): return None
+        try: path = self.source.vfx.fileInfo(self.source.binPath)[0]
+        except Exception: return None
+        if not path or not os.path.isfile(path): return None
+        path = os.path.abspath(path); stat = os.stat(path)
+        digest = hashlib.sha1(f'RecordIndex:{path}'.encode('utf-8')).hexdigest()
+        return (os.path.join(IndexCache.root, f'{digest}.esx'), (RecordIndex.VERSION, marshal.version, int(self.format), self.tes4a, path, stat.st_size, stat.st_mtime_ns))
+
+    def store(self, key: tuple[str, tuple]) -> None:
+        path = key[0]; tmpPath = f'{path}.{os.getpid()}.tmp'
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok = True)
+            with open(tmpPath, 'wb') as f: marshal.dump(key[1], f); marshal.dump((self.byId, self.byEditorId), f)
+            os.replace(tmpPath, path)
+        except OSError:
+            if os.path.exists(tmpPath): os.remove(tmpPath)
+
+    # walks every record header, peeking only the editor id
+    def build(self, r: Reader) -> None:
+        r.seek(0)
+        self._scan(r, r.length, 0)
+
+    def _scan(self, r: Reader, end: int, label: int) -> None:
+        tes3 = r.format == FormType.TES3
+        want = { FieldType.NAME } if tes3 else { FieldType.EDID }
+        while not r.atEnd(end):
+            position = r.tell()
+            type = r.readUInt32()
+            if type == FormType.GRUP:
+                s = RecordGroup(r, '')
+                self._scan(r, s.position + s.dataSize, int(s.label) if s.type == RecordGroup.GroupType.Top else label)
+                r.seek(s.position + s.dataSize)
+                continue
+            record = Record(); record.read(r); record.type = type
+            start = r.tell()
+            id = position if tes3 else record.id
+            self.byId[id] = (type if tes3 else label, position, record.dataSize, 1 if record._compressed else 0)
+            if (z := CellIndex.peekFields(r, record, want).get(FieldType.NAME if tes3 else FieldType.EDID)): self.byEditorId[z.rstrip(b'\x00').decode('latin-1')] = id
+            r.seek(start + record.dataSize)
+
+    # gets a record by FormID, parsing only that record
+    def get(self, id: int) -> Record: return readRecordAt(self.source, self.format, self.tes4a, z[1]) if (z := self.byId.get(id)) else None
+
+    def getByEditorId(self, name: str) -> Record: return self.get(z) if (z := self.byEditorId.get(name)) != None else None
+# end::RecordIndex[]
+
 #endregion
 
 #region Fields
@@ -5099,13 +5328,21 @@ class KYWDRecord(Record):
 class LANDRecord(Record, CellManager.ILand):
     class Vhgt:
         referenceHeight: float # A height offset for the entire cell. Decreasing this value will shift the entire cell land down.
-        heightData: list[int] # HeightData
+        heightData: ndarray # HeightData, int8 deltas
+        size: int # vertices per side
         def __init__(self, r: Reader, dataSize: int):
             self.referenceHeight = r.readSingle()
             count = dataSize - 4 - 3
-            self.heightData = r.readPArray(None, 'b', count)
+            self.heightData = frombuffer(r.readBytes(count), dtype = int8)
+            self.size = isqrt(count)
             r.skip(3) # Unused
 
+        # integrates the deltas into absolute heights: column 0 runs down the rows from the reference height, each row then runs across
+        def heightMap(self) -> ndarray:
+            d = self.heightData[:self.size * self.size].reshape(self.size, self.size).astype(float32)
+            d[:, 0] = cumsum(d[:, 0]) + self.referenceHeight
+            return cumsum(d, axis = 1)
+
     # TES3
     class Cord:
         def __repr__(self): return f'{self.cellX},{self.cellY}'
@@ -5147,9 +5384,9 @@ class LANDRecord(Record, CellManager.ILand):
     # The signed value of the 'color' represents the vector's component. Blue
     # is vertical(Z), Red the X direction and Green the Y direction.Note that
     # the y-direction of the data is from the bottom up.
-    VNML: list[Byte3] # XYZ 8 bit floats (vertexs)
+    VNML: ndarray # XYZ 8 bit floats (vertexs), int8[size, size, 3]
     VHGT: Vhgt # Height data
-    VCLR: list[ByteColor3] = None # 24-bit RGB (colors), Vertex color array, looks like another RBG image 65x65 pixels in size. (Optional)
+    VCLR: ndarray = None # 24-bit RGB (colors), Vertex color array, looks like another RBG image 65x65 pixels in size, uint8[size, size, 3]. (Optional)
     VTEX: object = None # A 16x16 array of short texture indices. (Optional)
     # TES3
     INTV: Cord; gridId: Int3 # The cell coordinates of the cell
@@ -5166,17 +5403,49 @@ class LANDRecord(Record, CellManager.ILand):
     @property
     def heightOffset(self) -> float: return self.VHGT.referenceHeight
     @property
-    def heights(self) -> list[int]: return self.VHGT.heightData
+    def heights(self) -> ndarray: return self.VHGT.heightData
+    @property
+    def heightMap(self) -> ndarray: return self.VHGT.heightMap() if getattr(self, 'VHGT', None) else None
 
     def __repr__(self): return f'L[{self.gridId}:{self.EDID}]'
     def __init__(self): super().__init__()
 
+    SIZE: int = 65 # default vertices per side, neighbouring lands share an edge
+    size: int = SIZE # vertices per side of this land, from its VNML/VCLR/VHGT
+
+    # stitches the lands of cells x0..x1, y0..y1 into one height, normal and colour map, rows run north from y0
+    # the grid steps by the largest land, smaller lands are resampled to it by nearest vertex
+    @staticmethod
+    def stitch(findLand: callable, x0: int, y0: int, x1: int, y1: int, world: int = 0, fill: float = 0.) -> tuple[ndarray, ndarray, ndarray]:
+        lands = {(x, y): land for y in range(y0, y1 + 1) for x in range(x0, x1 + 1) if (land := findLand(Int3(x, y, world)))}
+        step = max((land.size for land in lands.values()), default = LANDRecord.SIZE) - 1
+        rows = (y1 - y0 + 1) * step + 1; cols = (x1 - x0 + 1) * step + 1
+        heights = full((rows, cols), fill, dtype = float32)
+        normals = zeros((rows, cols, 3), dtype = int8); normals[..., 2] = 127
+        colors = full((rows, cols, 3), 255, dtype = uint8)
+        def fit(z: ndarray) -> ndarray:
+            if len(z) == step + 1: return z
+            ix = rint(linspace(0, len(z) - 1, step + 1)).astype(int)
+            return z[ix][:, ix]
+        for (x, y), land in lands.items():
+            i = (y - y0) * step; j = (x - x0) * step
+            if (z := land.heightMap) is not None: heights[i:i + step + 1, j:j + step + 1] = fit(z)
+            if (z := getattr(land, 'VNML', None)) is not None: normals[i:i + step + 1, j:j + step + 1] = fit(z)
+            if (z := land.VCLR) is not None: colors[i:i + step + 1, j:j + step + 1] = fit(z)
+        return heights, normals, colors
+
+    # shapes a per-vertex RGB/XYZ field into its square grid
+    @staticmethod
+    def grid(d: ndarray) -> ndarray:
+        size = isqrt(len(d) // 3)
+        return d[:size * size * 3].reshape(size, size, 3)
+
     def readField(self, r: Reader, type: FieldType, dataSize: int) -> object:
         match type:
             case FieldType.DATA: z = self.DATA = r.readInt32()
-            case FieldType.VNML: z = self.VNML = r.readPArray(Byte3, '3B', dataSize // 3)
-            case FieldType.VHGT: z = self.VHGT = LANDRecord.Vhgt(r, dataSize)
-            case FieldType.VCLR: z = self.VCLR = r.readSArray(ByteColor3, dataSize // 3)
+            case FieldType.VNML: z = self.VNML = LANDRecord.grid(frombuffer(r.readBytes(dataSize), dtype = int8)); self.size = len(z)
+            case FieldType.VHGT: z = self.VHGT = LANDRecord.Vhgt(r, dataSize); self.size = z.size
+            case FieldType.VCLR: z = self.VCLR = LANDRecord.grid(frombuffer(r.readBytes(dataSize), dtype = uint8)); self.size = len(z)
             case FieldType.VTEX: z = self.VTEX = r.readPArray(None, 'H', dataSize >> 1) if r.format == FormType.TES3 else r.readPArray(None, 'I', dataSize >> 2)
             # TES3
             case FieldType.INTV: z = self.INTV = r.readS(LANDRecord.Cord, dataSize); self.gridId = Int3(self.INTV.cellX, self.INTV.cellY, 0)
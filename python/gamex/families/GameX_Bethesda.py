@@ -2,7 +2,7 @@ from __future__ import annotations
 import os
 from openstk.core import _pathExtension, log
 from openstk.gfx import ITexture
-from gamex import Family, FamilyGame, Archive, BinaryArchive, FileOption
+from gamex import Family, FamilyGame, Archive, BinaryArchive, FileOption, PathIndex
 from gamex.families.Uncore.formats.binary import Binary_Dds
 from gamex.families.Bethesda.formats.binary import Binary_Ba2, Binary_Bsa, Binary_Esm
 from gamex.families.Gamebryo.formats.binary import Binary_Nif
@@ -25,6 +25,8 @@ class BethesdaArchive(BinaryArchive):
         super().__init__(parent, state, self.getArcBinary(state.game, _pathExtension(state.path).lower()))
         self.assetFactoryFunc = self.assetFactory
         self.pathFinders[type(ITexture)] = self.findTexture
+        # options
+        self.parallel = 0 # processes parsing the top-level groups of a plugin, 0 or 1 parses inline
 
     #region PathFinders
 
@@ -32,14 +34,15 @@ class BethesdaArchive(BinaryArchive):
     def findTexture(self, path: object) -> object:
         p = path
         if not isinstance(p, str): return path
-        textureName = os.path.splitext(os.path.basename(p))[0]
+        # normalized once, then probed directly against the path index, returning the stored path of the entry
+        k = PathIndex.normalize(p)
+        textureName = os.path.splitext(os.path.basename(k))[0]
         textureNameInTexturesDir = f'textures/{textureName}'
-        texturePathWithoutExtension = f'{os.path.dirname(p)}/{textureName}'
-        if self.contains(z := f'{textureNameInTexturesDir}.dds'): return z
-        elif self.contains(z := f'{texturePathWithoutExtension}.dds'): return z
-        elif self.contains(z := f'{textureNameInTexturesDir}.tga'): return z
-        elif self.contains(z := f'{texturePathWithoutExtension}.tga'): return z
-        else: log.info(f'Could not find file "{p}" in an arc file.'); return None
+        texturePathWithoutExtension = f'{os.path.dirname(k)}/{textureName}'
+        index = self.filesByPath or {}
+        for z in (f'{textureNameInTexturesDir}.dds', f'{texturePathWithoutExtension}.dds', f'{textureNameInTexturesDir}.tga', f'{texturePathWithoutExtension}.tga'):
+            if (i := index.get(z)): return self.files[i[0]].path
+        log.info(f'Could not find file "{p}" in an arc file.'); return None
 
     #endregion
 
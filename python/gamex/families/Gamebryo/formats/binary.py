@@ -1,12 +1,11 @@
 import os
 from io import BytesIO
 from enum import Enum
-from openstk.core import ISource, IHaveSource, IWriteToStream
-from gamex import FileSource, ArcBinaryT, MetaManager, MetaInfo, MetaContent, IHaveMetaInfo, DesSer
+from openstk.core import ISource, IHaveSource, IWriteToStream, BinaryReader
+from gamex import FileSource, AssetOption, ArcBinaryT, MetaManager, MetaInfo, MetaContent, IHaveMetaInfo, DesSer
 from gamex.families.Gamebryo.formats.nif import NiReader, NiSkinInstance, NiSourceTexture
 
 # typedefs
-class BinaryReader: pass
 class Archive: pass
 class BinaryArchive: pass
 
@@ -17,8 +16,24 @@ class Binary_Nif(NiReader, IHaveMetaInfo, IHaveSource, IWriteToStream):
     @staticmethod
     async def factory(r: BinaryReader, f: FileSource, s: Archive): return Binary_Nif(r, f, s)
 
-    def __init__(self, r: BinaryReader, f: FileSource, s: Archive):
-        super().__init__(r)
+    # a factory skipping blocks until resolved, parsing only the blocks of types upfront, like (NiSourceTexture,) for a texture scan
+    @staticmethod
+    def lazyFactory(types: tuple[type] = None) -> callable:
+        async def factory(r: BinaryReader, f: FileSource, s: Archive): return Binary_Nif(r, f, s, types, True)
+        return factory
+
+    # the getAsset option of a lazy load, like archive.getAsset(Binary_Nif, path, Binary_Nif.scanOption(NiSourceTexture))
+    @staticmethod
+    def scanOption(*types: type) -> AssetOption: return AssetOption(Binary_Nif.lazyFactory(types or None))
+
+    # loads only the texture and skin blocks of a nif
+    @staticmethod
+    async def scan(source: Archive, path: FileSource | str) -> 'Binary_Nif': return await source.getAsset(Binary_Nif, path, Binary_Nif.scanOption(NiSourceTexture, NiSkinInstance))
+
+    def __init__(self, r: BinaryReader, f: FileSource, s: Archive, types: tuple[type] = None, lazy: bool = False):
+        # skipped blocks are read later, so mapped views are copied as the archive may release them, a BytesIO entry is already private
+        if lazy and not isinstance(r.f, BytesIO): r = BinaryReader(BytesIO(r.f.read()))
+        super().__init__(r, types, lazy)
         self.name = os.path.splitext(os.path.basename(f.path))[0]
         self.source: ISource = s
 
@@ -32,9 +47,9 @@ class Binary_Nif(NiReader, IHaveMetaInfo, IHaveSource, IWriteToStream):
 
     #endregion
 
-    def isSkinnedMesh(self) -> bool: return any((s for s in self.blocks if isinstance(s, NiSkinInstance)))
+    def isSkinnedMesh(self) -> bool: return len(self.blocks.ofType(NiSkinInstance)) > 0
 
-    def getTexturePaths(self) -> list[str]: return (s.fileName for s in self.blocks if isinstance(s, NiSourceTexture) and s.fileName) 
+    def getTexturePaths(self) -> list[str]: return (s.fileName for s in self.blocks.ofType(NiSourceTexture) if s.fileName) 
 
     def getInfoNodes(self, resource: MetaManager = None, file: FileSource = None, tag: object = None) -> list[MetaInfo]: return [
         MetaInfo(None, MetaContent(type = 'Object', name = os.path.basename(file.path), value = self)),
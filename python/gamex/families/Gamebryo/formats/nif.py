@@ -1,7 +1,7 @@
-import os
+import os, threading
 from io import BytesIO
 from enum import Enum, Flag, IntFlag
-from numpy import ndarray, array
+from numpy import ndarray, array, frombuffer, dtype, prod
 from openstk.core import log, BinaryReader
 from gamex import FileSource, ArcBinaryT, MetaManager, MetaInfo, MetaContent, IHaveMetaInfo
 from gamex.core.globalx import Color3, Color4
@@ -37,12 +37,46 @@ class X[T]:
     def ptr(r: BinaryReader): return None if (v := r.readInt32()) < 0 else Ref(r, v)
     @staticmethod # Refers to an object after the current one in the hierarchy.
     def ref(r: BinaryReader): return None if (v := r.readInt32()) < 0 else Ref(r, v)
+class NiBlocks(list):
+    def __init__(self, r: NiReader, blocks: list[NiObject], names: list[str] = None, offsets: list[int] = None):
+        super().__init__(blocks)
+        self.r = r; self.names = names; self.offsets = offsets
+        self.pending: set[int] = set(range(len(blocks))) if offsets else set()
+        self.lock = threading.RLock() # a cached nif resolves blocks from many threads over one reader
+    def __getitem__(self, i: int | slice) -> NiObject:
+        if self.pending:
+            with self.lock:
+                for s in (range(*i.indices(len(self))) if isinstance(i, slice) else (i if i >= 0 else len(self) + i,)):
+                    if s in self.pending: self.parse(s)
+        return super().__getitem__(i)
+    def __iter__(self):
+        for i in range(len(self)): yield self[i]
+    # parses a skipped block at its offset, keeping the reader position
+    def parse(self, i: int) -> NiObject:
+        with self.lock:
+            r = self.r; pos = r.tell(); self.pending.discard(i)
+            try: r.seek(self.offsets[i]); s = NiObject.read(r, self.names[i]); super().__setitem__(i, s)
+            finally: r.seek(pos)
+            return s
+    # the blocks of types, parsing only those of skipped blocks
+    def ofType(self, *types: type) -> list[NiObject]:
+        return [s for i in range(len(self)) if (i not in self.pending or NiBlocks.isType(self.names[i], types)) and isinstance(s := self[i], types)]
+    @staticmethod
+    def isType(name: str, types: tuple[type]) -> bool: return isinstance(z := globals().get(name), type) and issubclass(z, types)
 class Z:
     blockHashes: dict[int, str] = {}
     @staticmethod
-    def readBlocks(r: NiReader) -> list[object]:
+    def readBlocks(r: NiReader, types: tuple[type] = None, lazy: bool = False) -> list[object]:
         v = r.v; pos = r.tell()
-        blocks: list[NiObject] = [None]*r.numBlocks
+        # with block sizes in the header, blocks are skipped by size and parsed when resolved, prefetching the blocks of types
+        if (lazy or types) and r.blockSize and v != 0x14030102:
+            offsets = [0]*r.numBlocks
+            for i, s in enumerate(r.blockSize): offsets[i] = pos; pos += s
+            blocks = NiBlocks(r, [None]*r.numBlocks, [r.blockTypes[s & 0x7FFF] for s in r.blockTypeIndex], offsets)
+            r.seek(pos)
+            if types: blocks.ofType(*types)
+            return blocks
+        blocks: list[NiObject] = NiBlocks(r, [None]*r.numBlocks)
         if v >= 0x0303000d:
             # block types are stored in the header for versions above 10.x.x.x
             if v >= 0x0a000000:
@@ -63,7 +97,7 @@ class Z:
                         dummy = r.readUInt32()
                         if dummy != 0: msg = f'non-zero block separator ({dummy}) preceeding block {type}'; print(msg)
                     # for version 20.2.0.? and above the block size is stored in the header
-                    if hasSize: size = r.blockSize[index]
+                    if hasSize: size = r.blockSize[i]
                     blocks[i] = NiObject.read(r, type)
                 return blocks
             # < 0x05000001
@@ -98,6 +132,11 @@ class Z:
             case _: raise NotImplementedError(f'Tried to read an unsupported type: {s.t}')
     @staticmethod
     def readBool8(r: NiReader) -> int: return r.readByte() if r.v > 0x04000002 else r.readUInt32()
+    @staticmethod # reads count fixed-width elements of shape straight from the buffer, halfs widen to float32
+    def readArray(r: NiReader, t: str, count: int, *shape: int) -> ndarray:
+        z = dtype(t); count = int(count)
+        s = frombuffer(r.readBytes(count * int(prod(shape)) * z.itemsize), z).reshape((count, *shape))
+        return s.astype('<f4') if z.kind == 'f' and z.itemsize == 2 else s
     @staticmethod
     def readBool(r: NiReader) -> bool: return r.readByte() != 0 if r.v > 0x04000002 else r.readUInt32() != 0
     @staticmethod
@@ -919,7 +958,7 @@ class Footer: # X
 # Group of vertex indices of vertices that match.
 class MatchGroup: # X
     def __init__(self, r: NiReader):
-        self.vertexIndices: list[int] = r.readL16PArray(None, 'H') # The vertex indices.
+        self.vertexIndices: ndarray = Z.readArray(r, '<u2', r.readUInt16()) # The vertex indices.
 
 # Description of a mipmap within an NiPixelData object.
 class MipMap: # X
@@ -1033,7 +1072,7 @@ class NiReader(BinaryReader): # X
     blocks: list[NiObject]
     roots: list[Ref[NiObject]]
 
-    def __init__(self, b: BinaryReader):
+    def __init__(self, b: BinaryReader, types: tuple[type] = None, lazy: bool = False):
         super().__init__(b.f)
         (self.headerString, self.v) = Z.parseHeaderStr(b.readVAString(128, b'\x0A')); r = self
         if r.v <= 0x03010000: self.copyright = [r.readL8AString(), r.readL8AString(), r.readL8AString()]
@@ -1056,7 +1095,7 @@ class NiReader(BinaryReader): # X
             self.strings = r.readFArray(lambda z: r.readL32AString(), self.numStrings)
         if r.v >= 0x05000006: self.groups = r.readL32PArray(None, 'I')
         # read blocks
-        self.blocks: list[NiObject] = Z.readBlocks(r)
+        self.blocks: list[NiObject] = Z.readBlocks(r, types, lazy)
         self.roots = Footer(r).roots
 
 # A list of \\0 terminated strings.
@@ -1219,7 +1258,7 @@ class BSVertexData: # Z
     tangent: Vector3 = None
     bitangentZ: int = 0
     vertexColors: Color4 = None
-    boneWeights: list[float] = None
+    boneWeights: ndarray = None
     boneIndices: bytearray = None
     eyeData: float = None
 
@@ -1240,7 +1279,7 @@ class BSVertexData: # Z
             if tangents: self.bitangentZ = r.readByte()
         if arg.HasFlag(VertexFlags.Vertex_Colors): self.vertexColors = Color4(r.readBytes(4))
         if arg.HasFlag(VertexFlags.Skinned):
-            self.boneWeights = [r.readHalf(), r.readHalf(), r.readHalf(), r.readHalf()]
+            self.boneWeights = Z.readArray(r, '<f2', 4)
             self.boneIndices = r.readBytes(4)
         if arg.HasFlag(VertexFlags.Eye_Data): self.eyeData = r.readSingle()
 
@@ -1265,16 +1304,16 @@ class SkinPartition: # Y
     numBones: int = None                                # Number of bones influencing this submesh.
     numStrips: int = None                               # Number of strips in this submesh (zero if not stripped).
     numWeightsPerVertex: int = None                     # Number of weight coefficients per vertex. The Gamebryo engine seems to work well only if this number is equal to 4, even if there are less than 4 influences per vertex.
-    bones: list[int] = None                             # List of bones.
-    vertexMap: list[int] = None                         # Maps the weight/influence lists in this submesh to the vertices in the shape being skinned.
-    vertexWeights: list[list[float]] = None             # The vertex weights.
-    stripLengths: list[int] = None                      # The strip lengths.
-    strips: list[list[int]] = None                      # The strips.
-    triangles: list[Triangle] = None                    # The triangles.
+    bones: ndarray = None                               # List of bones.
+    vertexMap: ndarray = None                           # Maps the weight/influence lists in this submesh to the vertices in the shape being skinned.
+    vertexWeights: ndarray = None                       # The vertex weights.
+    stripLengths: ndarray = None                        # The strip lengths.
+    strips: list[ndarray] = None                        # The strips.
+    triangles: ndarray = None                           # The triangles.
     boneIndices: list[bytearray] = None                 # Bone indices, they index into 'Bones'.
     unknownShort: int = None                            # Unknown
     vertexDesc: BSVertexDesc = None
-    trianglesCopy: list[Triangle] = None
+    trianglesCopy: ndarray = None
 
     def __init__(self, r: NiReader):
         self.numVertices = r.readUInt16()
@@ -1282,27 +1321,27 @@ class SkinPartition: # Y
         self.numBones = r.readUInt16()
         self.numStrips = r.readUInt16()
         self.numWeightsPerVertex = r.readUInt16()
-        self.bones = r.readPArray(None, 'H', self.numBones)
+        self.bones = Z.readArray(r, '<u2', self.numBones)
         if r.v <= 0x0A000102:
-            self.vertexMap = r.readPArray(None, 'H', self.numVertices)
-            self.vertexWeights = r.readFArray(lambda k: r.readPArray(None, 'f', self.numWeightsPerVertex), self.numVertices)
-            self.stripLengths = r.readPArray(None, 'H', self.numStrips)
-            if self.numStrips != 0: self.strips = r.readFArray(lambda k, i: r.readPArray(None, 'H', self.stripLengths[i]), self.numStrips)
-            else: self.triangles = r.readSArray(Triangle, self.numTriangles)
+            self.vertexMap = Z.readArray(r, '<u2', self.numVertices)
+            self.vertexWeights = Z.readArray(r, '<f4', self.numVertices, self.numWeightsPerVertex)
+            self.stripLengths = Z.readArray(r, '<u2', self.numStrips)
+            if self.numStrips != 0: self.strips = r.readFArray(lambda k, i: Z.readArray(r, '<u2', self.stripLengths[i]), self.numStrips)
+            else: self.triangles = Z.readArray(r, '<u2', self.numTriangles, 3)
         elif r.v >= 0x0A010000:
-            if Z.readBool(r): self.vertexMap = r.readPArray(None, 'H', self.numVertices)
+            if Z.readBool(r): self.vertexMap = Z.readArray(r, '<u2', self.numVertices)
             hasVertexWeights = Z.readBool8(r)
-            if hasVertexWeights == 1: self.vertexWeights = r.readFArray(lambda k: r.readPArray(None, 'f', self.numWeightsPerVertex), self.numVertices)
-            if hasVertexWeights == 15: self.vertexWeights = r.readFArray(lambda k: r.readFArray(lambda z: r.readHalf(), self.numWeightsPerVertex), self.numVertices)
-            self.stripLengths = r.readPArray(None, 'H', self.numStrips)
+            if hasVertexWeights == 1: self.vertexWeights = Z.readArray(r, '<f4', self.numVertices, self.numWeightsPerVertex)
+            if hasVertexWeights == 15: self.vertexWeights = Z.readArray(r, '<f2', self.numVertices, self.numWeightsPerVertex)
+            self.stripLengths = Z.readArray(r, '<u2', self.numStrips)
             if Z.readBool(r):
-                if self.numStrips != 0: self.strips = r.readFArray(lambda k, i: r.readPArray(None, 'H', self.stripLengths[i]), self.numStrips)
-                else: self.triangles = r.readSArray(Triangle, self.numTriangles)
+                if self.numStrips != 0: self.strips = r.readFArray(lambda k, i: Z.readArray(r, '<u2', self.stripLengths[i]), self.numStrips)
+                else: self.triangles = Z.readArray(r, '<u2', self.numTriangles, 3)
         if Z.readBool(r): self.boneIndices = r.readFArray(lambda k: r.readBytes(self.numWeightsPerVertex), self.numVertices)
         if r.uv2 > 34: self.unknownShort = r.readUInt16()
         if r.uv2 == 100:
             self.vertexDesc = r.readS(BSVertexDesc)
-            self.trianglesCopy = r.readSArray(Triangle, self.numTriangles)
+            self.trianglesCopy = Z.readArray(r, '<u2', self.numTriangles, 3)
 
 # A plane.
 class NiPlane: # Y
@@ -1374,7 +1413,7 @@ class Morph: # X
     interpolation: KeyType = 0                          # Unlike most objects, the presense of this value is not conditional on there being keys.
     keys: list[Key[float]] = None                       # The morph key frames.
     legacyWeight: float = None
-    vectors: list[Vector3] = None                       # Morph vectors.
+    vectors: ndarray = None                             # Morph vectors.
 
     def __init__(self, r: NiReader, numVertices: int):
         if r.v >= 0x0A01006A: self.frameName = Z.string(r)
@@ -1383,7 +1422,7 @@ class Morph: # X
             self.interpolation = KeyType(r.readUInt32())
             self.keys = r.readFArray(lambda z: Key[float]('[float]', r, self.interpolation), self.numKeys)
         if r.v >= 0x0A010068 and r.v <= 0x14010002 and r.uv2 < 10: self.legacyWeight = r.readSingle()
-        self.vectors = r.readPArray(array, '3f', numVertices)
+        self.vectors = Z.readArray(r, '<f4', numVertices, 3)
 
 # particle array entry
 class Particle: # X
@@ -1827,15 +1866,15 @@ class bhkBoxShape(bhkConvexShape): # Z
 class bhkConvexVerticesShape(bhkConvexShape): # Z
     verticesProperty: hkWorldObjCinfoProperty = None
     normalsProperty: hkWorldObjCinfoProperty = None
-    vertices: list[Vector4] = None                      # Vertices. Fourth component is 0. Lexicographically sorted.
-    normals: list[Vector4] = None                       # Half spaces as determined by the set of vertices above. First three components define the normal pointing to the exterior, fourth component is the signed distance of the separating plane to the origin: it is minus the dot product of v and n, where v is any vertex on the separating plane, and n is the normal. Lexicographically sorted.
+    vertices: ndarray = None                            # Vertices. Fourth component is 0. Lexicographically sorted.
+    normals: ndarray = None                             # Half spaces as determined by the set of vertices above. First three components define the normal pointing to the exterior, fourth component is the signed distance of the separating plane to the origin: it is minus the dot product of v and n, where v is any vertex on the separating plane, and n is the normal. Lexicographically sorted.
 
     def __init__(self, r: NiReader):
         super().__init__(r)
         self.verticesProperty = hkWorldObjCinfoProperty(r)
         self.normalsProperty = hkWorldObjCinfoProperty(r)
-        self.vertices = r.readL32PArray(array, '4f')
-        self.normals = r.readL32PArray(array, '4f')
+        self.vertices = Z.readArray(r, '<f4', r.readUInt32(), 4)
+        self.normals = Z.readArray(r, '<f4', r.readUInt32(), 4)
 
 # A convex transformed shape?
 class bhkConvexTransformShape(bhkTransformShape): # Z
@@ -2370,20 +2409,20 @@ class NiGeometryData(NiObject): # X
     bsMaxVertices: int = None                           # Bethesda uses this for max number of particles in NiPSysData.
     keepFlags: int = 0                                  # Used with NiCollision objects when OBB or TRI is set.
     compressFlags: int = 0                              # Unknown.
-    vertices: list[Vector3] = None                      # The mesh vertices.
+    vertices: ndarray = None                            # The mesh vertices.
     vectorFlags: VectorFlags = 0
     bsVectorFlags: BSVectorFlags = 0
     materialCrc: int = 0
-    normals: list[Vector3] = None                       # The lighting normals.
-    tangents: list[Vector3] = None                      # Tangent vectors.
-    bitangents: list[Vector3] = None                    # Bitangent vectors.
-    unkFloats: list[float] = None
+    normals: ndarray = None                             # The lighting normals.
+    tangents: ndarray = None                            # Tangent vectors.
+    bitangents: ndarray = None                          # Bitangent vectors.
+    unkFloats: ndarray = None
     center: Vector3 = None                              # Center of the bounding box (smallest box that contains all vertices) of the mesh.
     radius: float = None                                # Radius of the mesh: maximal Euclidean distance between the center and all vertices.
     unknown13shorts: list[int] = None                   # Unknown, always 0?
-    vertexColors: list[Color4] = None                   # The vertex colors.
+    vertexColors: ndarray = None                        # The vertex colors.
     numUvSets: int = None                               # The lower 6 (or less?) bits of this field represent the number of UV texture sets. The other bits are probably flag bits. For versions 10.1.0.0 and up, if bit 12 is set then extra vectors are present after the normals.
-    uvSets: list[list[TexCoord]] = None                 # The UV texture coordinates. They follow the OpenGL standard: some programs may require you to flip the second coordinate.
+    uvSets: ndarray = None                              # The UV texture coordinates. They follow the OpenGL standard: some programs may require you to flip the second coordinate.
     consistencyFlags: ConsistencyType = ConsistencyType.CT_MUTABLE # Consistency Flags
     additionalData: Ref[NiObject] = None                # Unknown.
 
@@ -2397,28 +2436,28 @@ class NiGeometryData(NiObject): # X
             self.keepFlags = r.readByte()
             self.compressFlags = r.readByte()
         hasVertices = Z.readBool8(r)
-        if (hasVertices > 0) and (hasVertices != 15): self.vertices = r.readPArray(array, '3f', self.numVertices)
-        if r.v >= 0x14030101 and hasVertices == 15: self.vertices = r.readFArray(lambda z: Vector3(r.readHalf(), r.readHalf(), r.readHalf()), self.numVertices)
+        if (hasVertices > 0) and (hasVertices != 15): self.vertices = Z.readArray(r, '<f4', self.numVertices, 3)
+        if r.v >= 0x14030101 and hasVertices == 15: self.vertices = Z.readArray(r, '<f2', self.numVertices, 3)
         if r.v >= 0x0A000100 and not ((r.v == 0x14020007) and (r.uv2 > 0)): self.vectorFlags = VectorFlags(r.readUInt16())
         if ((r.v == 0x14020007) and (r.uv2 > 0)): self.bsVectorFlags = BSVectorFlags(r.readUInt16())
         if r.v == 0x14020007 and (r.uv == 12): self.materialCrc = r.readUInt32()
         hasNormals = Z.readBool8(r)
-        if (hasNormals > 0) and (hasNormals != 6): self.normals = r.readPArray(array, '3f', self.numVertices)
-        if r.v >= 0x14030101 and hasNormals == 6: self.normals = r.readFArray(lambda z: Vector3(r.readByte(), r.readByte(), r.readByte()), self.numVertices)
+        if (hasNormals > 0) and (hasNormals != 6): self.normals = Z.readArray(r, '<f4', self.numVertices, 3)
+        if r.v >= 0x14030101 and hasNormals == 6: self.normals = Z.readArray(r, 'u1', self.numVertices, 3)
         if r.v >= 0x0A010000 and (hasNormals != 0) and ((self.vectorFlags | self.bsVectorFlags) & 4096) != 0:
-            self.tangents = r.readPArray(array, '3f', self.numVertices)
-            self.bitangents = r.readPArray(array, '3f', self.numVertices)
-        if r.v == 0x14030009 and (r.uv == 0x20000) or (r.uv == 0x30000) and Z.readBool(r): self.unkFloats = r.readPArray(None, 'f', self.numVertices)
+            self.tangents = Z.readArray(r, '<f4', self.numVertices, 3)
+            self.bitangents = Z.readArray(r, '<f4', self.numVertices, 3)
+        if r.v == 0x14030009 and (r.uv == 0x20000) or (r.uv == 0x30000) and Z.readBool(r): self.unkFloats = Z.readArray(r, '<f4', self.numVertices)
         self.center = r.readVector3()
         self.radius = r.readSingle()
         if r.v == 0x14030009 and (r.uv == 0x20000) or (r.uv == 0x30000): self.unknown13shorts = r.readPArray(None, 'h', 13)
         hasVertexColors = Z.readBool8(r)
-        if (hasVertexColors > 0) and (hasVertexColors != 7): self.vertexColors = r.readFArray(lambda z: Color4(r), self.numVertices)
+        if (hasVertexColors > 0) and (hasVertexColors != 7): self.vertexColors = Z.readArray(r, '<f4', self.numVertices, 4)
         if r.v >= 0x14030101 and hasVertexColors == 7: self.vertexColors = r.readFArray(lambda z: Color4(r.readBytes(4)), self.numVertices)
         if r.v <= 0x04020200: self.numUvSets = r.readUInt16()
         hasUv = Z.readBool(r) if r.v <= 0x04000002 else None
-        if (hasVertices > 0) and (hasVertices != 15): self.uvSets = r.readFArray(lambda k: r.readSArray(TexCoord, self.numVertices), ((self.numUvSets & 63) | (self.vectorFlags & 63) | (self.bsVectorFlags & 1)))
-        if r.v >= 0x14030101 and hasVertices == 15: self.uvSets = r.readFArray(lambda k: r.readFArray(lambda z: TexCoord(r, true), self.numVertices), ((self.numUvSets & 63) | (self.vectorFlags & 63) | (self.bsVectorFlags & 1)))
+        if (hasVertices > 0) and (hasVertices != 15): self.uvSets = Z.readArray(r, '<f4', ((self.numUvSets & 63) | (self.vectorFlags & 63) | (self.bsVectorFlags & 1)), self.numVertices, 2)
+        if r.v >= 0x14030101 and hasVertices == 15: self.uvSets = Z.readArray(r, '<f2', ((self.numUvSets & 63) | (self.vectorFlags & 63) | (self.bsVectorFlags & 1)), self.numVertices, 2)
         if r.v >= 0x0A000100: self.consistencyFlags = ConsistencyType(r.readUInt16())
         if r.v >= 0x14000004: self.additionalData = X[AbstractAdditionalGeometryData].ref(r)
 
@@ -2489,14 +2528,14 @@ class NiAlphaProperty(NiProperty): # X
 class NiParticlesData(NiGeometryData): # X
     numParticles: int = None                            # The maximum number of particles (matches the number of vertices).
     particleRadius: float = None                        # The particles' size.
-    radii: list[float] = None                           # The individual particle sizes.
+    radii: ndarray = None                               # The individual particle sizes.
     numActive: int = None                               # The number of active particles at the time the system was saved. This is also the number of valid entries in the following arrays.
-    sizes: list[float] = None                           # The individual particle sizes.
+    sizes: ndarray = None                               # The individual particle sizes.
     rotations: list[Quaternion] = None                  # The individual particle rotations.
-    rotationAngles: list[float] = None                  # Angles of rotation
-    rotationAxes: list[Vector3] = None                  # Axes of rotation.
+    rotationAngles: ndarray = None                      # Angles of rotation
+    rotationAxes: ndarray = None                        # Axes of rotation.
     numSubtextureOffsets: int = 0                       # How many quads to use in BSPSysSubTexModifier for texture atlasing
-    subtextureOffsets: list[Vector4] = None             # Defines UV offsets
+    subtextureOffsets: ndarray = None                   # Defines UV offsets
     aspectRatio: float = None                           # Sets aspect ratio for Subtexture Offset UV quads
     aspectFlags: int = None
     speedtoAspectAspect2: float = None
@@ -2507,16 +2546,16 @@ class NiParticlesData(NiGeometryData): # X
         super().__init__(r)
         if r.v <= 0x04000002: self.numParticles = r.readUInt16()
         if r.v <= 0x0A000100: self.particleRadius = r.readSingle()
-        if r.v >= 0x0A010000 and not ((r.v == 0x14020007) and (r.uv2 > 0)) and Z.readBool(r): self.radii = r.readPArray(None, 'f', self.numVertices)
+        if r.v >= 0x0A010000 and not ((r.v == 0x14020007) and (r.uv2 > 0)) and Z.readBool(r): self.radii = Z.readArray(r, '<f4', self.numVertices)
         self.numActive = r.readUInt16()
-        if not ((r.v == 0x14020007) and (r.uv2 > 0)) and Z.readBool(r): self.sizes = r.readPArray(None, 'f', self.numVertices)
+        if not ((r.v == 0x14020007) and (r.uv2 > 0)) and Z.readBool(r): self.sizes = Z.readArray(r, '<f4', self.numVertices)
         if r.v >= 0x0A000100 and not ((r.v == 0x14020007) and (r.uv2 > 0)) and Z.readBool(r): self.rotations = r.readFArray(lambda z: r.readQuaternionWFirst(), self.numVertices)
         hasRotationAngles = Z.readBool(r) if r.v >= 0x14000004 else None
-        if not ((r.v == 0x14020007) and (r.uv2 > 0)) and hasRotationAngles: self.rotationAngles = r.readPArray(None, 'f', self.numVertices)
-        if r.v >= 0x14000004 and not ((r.v == 0x14020007) and (r.uv2 > 0)) and Z.readBool(r): self.rotationAxes = r.readPArray(array, '3f', self.numVertices)
+        if not ((r.v == 0x14020007) and (r.uv2 > 0)) and hasRotationAngles: self.rotationAngles = Z.readArray(r, '<f4', self.numVertices)
+        if r.v >= 0x14000004 and not ((r.v == 0x14020007) and (r.uv2 > 0)) and Z.readBool(r): self.rotationAxes = Z.readArray(r, '<f4', self.numVertices, 3)
         hasTextureIndices = Z.readBool(r) if ((r.v == 0x14020007) and (r.uv2 > 0)) else None
         if r.uv2 > 34: self.numSubtextureOffsets = r.readUInt32()
-        if ((r.v == 0x14020007) and (r.uv2 > 0)): self.subtextureOffsets = r.readL8PArray(array, '4f')
+        if ((r.v == 0x14020007) and (r.uv2 > 0)): self.subtextureOffsets = Z.readArray(r, '<f4', r.readByte(), 4)
         if r.uv2 > 34:
             self.aspectRatio = r.readSingle()
             self.aspectFlags = r.readUInt16()
@@ -2975,7 +3014,7 @@ class NiParticleSystemController(NiTimeController): # X
     trailer: int = 0                                    # Trailing null byte
     colorData: Ref[NiObject] = None
     unknownFloat1: float = None
-    unknownFloats2: list[float] = None
+    unknownFloats2: ndarray = None
 
     def __init__(self, r: NiReader):
         super().__init__(r)
@@ -3024,7 +3063,7 @@ class NiParticleSystemController(NiTimeController): # X
         if r.v <= 0x03010000:
             self.colorData = X[NiColorData].ref(r)
             self.unknownFloat1 = r.readSingle()
-            self.unknownFloats2 = r.readPArray(None, 'f', self.particleUnknownShort)
+            self.unknownFloats2 = Z.readArray(r, '<f4', self.particleUnknownShort)
 
 # A particle system controller, used by BS in conjunction with NiBSParticleNode.
 class NiBSPArrayController(NiParticleSystemController): # X
@@ -3419,15 +3458,15 @@ class NiTriShape(NiTriBasedGeom): # X
 # Holds mesh data using a list of singular triangles.
 class NiTriShapeData(NiTriBasedGeomData): # X
     numTrianglePoints: int = 0                          # Num Triangles times 3.
-    triangles: list[Triangle] = None                    # Triangle data.
+    triangles: ndarray = None                           # Triangle data.
     matchGroups: list[MatchGroup] = None                # The shared normals.
 
     def __init__(self, r: NiReader):
         super().__init__(r)
         self.numTrianglePoints = r.readUInt32()
         hasTriangles = False if r.v >= 0x0A010000 else None # calculated
-        if r.v <= 0x0A000102: self.triangles = r.readSArray(Triangle, self.numTriangles)
-        if r.v >= 0x0A000103 and hasTriangles: self.triangles = r.readSArray(Triangle, self.numTriangles)
+        if r.v <= 0x0A000102: self.triangles = Z.readArray(r, '<u2', self.numTriangles, 3)
+        if r.v >= 0x0A000103 and hasTriangles: self.triangles = Z.readArray(r, '<u2', self.numTriangles, 3)
         if r.v >= 0x03010000: self.matchGroups = r.readL16FArray(lambda z: MatchGroup(r))
 
 # A shape node that refers to data organized into strips of triangles
@@ -3438,16 +3477,16 @@ class NiTriStrips(NiTriBasedGeom): # Z
 # Holds mesh data using strips of triangles.
 class NiTriStripsData(NiTriBasedGeomData): # Z
     numStrips: int = None                               # Number of OpenGL triangle strips that are present.
-    stripLengths: list[int] = None                      # The number of points in each triangle strip.
-    points: list[list[int]] = None                      # The points in the Triangle strips.  Size is the sum of all entries in Strip Lengths.
+    stripLengths: ndarray = None                        # The number of points in each triangle strip.
+    points: list[ndarray] = None                        # The points in the Triangle strips.  Size is the sum of all entries in Strip Lengths.
 
     def __init__(self, r: NiReader):
         super().__init__(r)
         self.numStrips = r.readUInt16()
-        self.stripLengths = r.readPArray(None, 'H', self.numStrips)
+        self.stripLengths = Z.readArray(r, '<u2', self.numStrips)
         hasPoints = Z.readBool(r) if r.v >= 0x0A000103 else None
-        if r.v <= 0x0A000102: self.points = r.readFArray(lambda k, i: r.readPArray(None, 'H', self.stripLengths[i]), self.numStrips)
-        if r.v >= 0x0A000103 and hasPoints: self.points = r.readFArray(lambda k, i: r.readPArray(None, 'H', self.stripLengths[i]), self.numStrips)
+        if r.v <= 0x0A000102: self.points = r.readFArray(lambda k, i: Z.readArray(r, '<u2', self.stripLengths[i]), self.numStrips)
+        if r.v >= 0x0A000103 and hasPoints: self.points = r.readFArray(lambda k, i: Z.readArray(r, '<u2', self.stripLengths[i]), self.numStrips)
 
 # DEPRECATED (pre-10.1), REMOVED (20.3).
 # Time controller for texture coordinates.
@@ -3489,12 +3528,12 @@ class NiVertexColorProperty(NiProperty): # X
 # Unsure of use - perhaps for morphing animation or gravity.
 class NiVertWeightsExtraData(NiExtraData): # X
     numBytes: int = 0                                   # Number of bytes in this data object.
-    weight: list[float] = None                          # The vertex weights.
+    weight: ndarray = None                              # The vertex weights.
 
     def __init__(self, r: NiReader):
         super().__init__(r)
         self.numBytes = r.readUInt32()
-        self.weight = r.readL16PArray(None, 'f')
+        self.weight = Z.readArray(r, '<f4', r.readUInt16())
 
 # DEPRECATED (10.2), REMOVED (?), Replaced by NiBoolData.
 # Visibility data for a controller.
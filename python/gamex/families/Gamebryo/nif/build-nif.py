@@ -51,10 +51,10 @@ using static OpenStack;
 namespace GameX.Gamebryo.Formats.Nif;
 
 ''',
-'''import os
+'''import os, threading
 from io import BytesIO
 from enum import Enum, Flag, IntFlag
-from numpy import ndarray, array
+from numpy import ndarray, array, frombuffer, dtype, prod
 from openstk.core import log, BinaryReader
 from gamex import FileSource, ArcBinaryT, MetaManager, MetaInfo, MetaContent, IHaveMetaInfo
 from gamex.core.globalx import Color3, Color4
@@ -271,12 +271,46 @@ class X[T]:
     def ptr(r: BinaryReader): return None if (v := r.readInt32()) < 0 else Ref(r, v)
     @staticmethod # Refers to an object after the current one in the hierarchy.
     def ref(r: BinaryReader): return None if (v := r.readInt32()) < 0 else Ref(r, v)
+class NiBlocks(list):
+    def __init__(self, r: NiReader, blocks: list[NiObject], names: list[str] = None, offsets: list[int] = None):
+        super().__init__(blocks)
+        self.r = r; self.names = names; self.offsets = offsets
+        self.pending: set[int] = set(range(len(blocks))) if offsets else set()
+        self.lock = threading.RLock() # a cached nif resolves blocks from many threads over one reader
+    def __getitem__(self, i: int | slice) -> NiObject:
+        if self.pending:
+            with self.lock:
+                for s in (range(*i.indices(len(self))) if isinstance(i, slice) else (i if i >= 0 else len(self) + i,)):
+                    if s in self.pending: self.parse(s)
+        return super().__getitem__(i)
+    def __iter__(self):
+        for i in range(len(self)): yield self[i]
+    # parses a skipped block at its offset, keeping the reader position
+    def parse(self, i: int) -> NiObject:
+        with self.lock:
+            r = self.r; pos = r.tell(); self.pending.discard(i)
+            try: r.seek(self.offsets[i]); s = NiObject.read(r, self.names[i]); super().__setitem__(i, s)
+            finally: r.seek(pos)
+            return s
+    # the blocks of types, parsing only those of skipped blocks
+    def ofType(self, *types: type) -> list[NiObject]:
+        return [s for i in range(len(self)) if (i not in self.pending or NiBlocks.isType(self.names[i], types)) and isinstance(s := self[i], types)]
+    @staticmethod
+    def isType(name: str, types: tuple[type]) -> bool: return isinstance(z := globals().get(name), type) and issubclass(z, types)
 class Z:
     blockHashes: dict[int, str] = {}
     @staticmethod
-    def readBlocks(r: NiReader) -> list[object]:
+    def readBlocks(r: NiReader, types: tuple[type] = None, lazy: bool = False) -> list[object]:
         v = r.v; pos = r.tell()
-        blocks: list[NiObject] = [None]*r.numBlocks
+        # with block sizes in the header, blocks are skipped by size and parsed when resolved, prefetching the blocks of types
+        if (lazy or types) and r.blockSize and v != 0x14030102:
+            offsets = [0]*r.numBlocks
+            for i, s in enumerate(r.blockSize): offsets[i] = pos; pos += s
+            blocks = NiBlocks(r, [None]*r.numBlocks, [r.blockTypes[s & 0x7FFF] for s in r.blockTypeIndex], offsets)
+            r.seek(pos)
+            if types: blocks.ofType(*types)
+            return blocks
+        blocks: list[NiObject] = NiBlocks(r, [None]*r.numBlocks)
         if v >= 0x0303000d:
             # block types are stored in the header for versions above 10.x.x.x
             if v >= 0x0a000000:
@@ -297,7 +331,7 @@ class Z:
                         dummy = r.readUInt32()
                         if dummy != 0: msg = f'non-zero block separator ({dummy}) preceeding block {type}'; print(msg)
                     # for version 20.2.0.? and above the block size is stored in the header
-                    if hasSize: size = r.blockSize[index]
+                    if hasSize: size = r.blockSize[i]
                     blocks[i] = NiObject.read(r, type)
                 return blocks
             # < 0x05000001
@@ -332,6 +366,11 @@ class Z:
             case _: raise NotImplementedError(f'Tried to read an unsupported type: {s.t}')
     @staticmethod
     def readBool8(r: NiReader) -> int: return r.readByte() if r.v > 0x04000002 else r.readUInt32()
+    @staticmethod # reads count fixed-width elements of shape straight from the buffer, halfs widen to float32
+    def readArray(r: NiReader, t: str, count: int, *shape: int) -> ndarray:
+        z = dtype(t); count = int(count)
+        s = frombuffer(r.readBytes(count * int(prod(shape)) * z.itemsize), z).reshape((count, *shape))
+        return s.astype('<f4') if z.kind == 'f' and z.itemsize == 2 else s
     @staticmethod
     def readBool(r: NiReader) -> bool: return r.readByte() != 0 if r.v > 0x04000002 else r.readUInt32() != 0
     @staticmethod
@@ -435,11 +474,11 @@ DesSer.add({'Ref':RefJsonConverter, 'TexCoord':TexCoordJsonConverter, 'Triangle'
             # read blocks
             values.insert(18, Class.Comment(s, 'read blocks'))
             values.insert(19, vx0 := Class.Value(s, Elem({ 'name': 'Blocks', 'type': 'NiObject', 'arr1': 'x' })))
-            vx0.initcw = ('Blocks = Z.ReadBlocks(r);', 'self.blocks: list[NiObject] = Z.readBlocks(r)')
+            vx0.initcw = ('Blocks = Z.ReadBlocks(r);', 'self.blocks: list[NiObject] = Z.readBlocks(r, types, lazy)')
             values.insert(20, vx1 := Class.Value(s, Elem({ 'name': 'Roots', 'type': 'Ref', 'template': 'NiObject', 'arr1': 'x' })))
             vx1.initcw = ('Roots = new Footer(r).Roots;', 'self.roots = Footer(r).roots')
         def Header_code(s):
-            s.init = (['BinaryReader b', 'b: BinaryReader'], ['rx', 'rx'], [f'new NiReader(r)', f'NiReader(r)'])
+            s.init = (['BinaryReader b', 'b: BinaryReader, types: tuple[type] = None, lazy: bool = False'], ['rx', 'rx'], [f'new NiReader(r)', f'NiReader(r)'])
             s.namecw = ('NiReader', 'NiReader'); s.inherit = 'BinaryReader' if self.ex == CS else 'BinaryReader'
             s.values[0].initcw = ('(HeaderString, V) = Z.ParseHeaderStr(b.ReadVAString(0x80, 0xA)); var r = this;', '(self.headerString, self.v) = Z.parseHeaderStr(b.readVAString(128, b\'\\x0A\')); r = self')
         def StringPalette_code(s):
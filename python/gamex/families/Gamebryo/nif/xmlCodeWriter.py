@@ -13,6 +13,12 @@ MS = 0; MN = 1; MD = 2; MI = 3; MA = 4
 
 def fmt_cwname(s: str) -> str: return 'X' + s.replace(' ', '_') if s[0].isdigit() else s.replace(' ', '_')
 def fmt_py(s: str) -> str: return fmt_camel(s)
+# bulk array read of (dtype, width), from a count or a length prefix like L32, and an optional fixed (or jagged [i]) inner count
+def fmt_bulk(bulk: tuple[str, int], c1: str, c2: str = None, jagged: bool = False) -> str:
+    c1 = {'L8': 'r.readByte()', 'L16': 'r.readUInt16()', 'L32': 'r.readUInt32()'}.get(c1, c1)
+    width = f', {bulk[1]}' if bulk[1] else ''
+    if jagged: return f'r.readFArray(lambda k, i: Z.readArray(r, \'{bulk[0]}\', {c2}{width}), {c1})'
+    return f'Z.readArray(r, \'{bulk[0]}\', {c1}{f', {c2}' if c2 else ''}{width})'
 def op_flip(s: str) -> str: return s \
     .replace(' == ', ' Z!= ') \
     .replace(' != ', ' Z== ') \
@@ -116,6 +122,11 @@ class XmlCodeWriter(CodeWriter):
             # Triangle -> Triangle
             # BSVertexDesc
         }
+        # fixed-width numeric types whose arrays are read straight from the buffer, as (dtype, width)
+        self.bulk = {
+            'float': ('<f4', 0), 'hfloat': ('<f2', 0), 'ushort': ('<u2', 0),
+            'Vector3': ('<f4', 3), 'Vector4': ('<f4', 4), 'HalfVector3': ('<f2', 3), 'ByteVector3': ('u1', 3),
+            'Color4': ('<f4', 4), 'TexCoord': ('<f4', 2), 'HalfTexCoord': ('<f2', 2), 'Triangle': ('<u2', 3) }
         self.struct = {}
         if self.ex == CS:
             super().__init__(default_delim=('{', '}'))
@@ -446,6 +457,7 @@ class Class:
                 if self.arr1 and self.arr2: self.typecw = [f'byte[][]', f'list[bytearray]'] if self.type == 'byte' else [f'{cs}[][]', f'list[list[{py}]]']
                 elif self.arr1: self.typecw = [f'byte[]', f'bytearray'] if self.type == 'byte' else [f'{cs}[]', f'list[{py}]']
                 else: self.typecw = [cs, py]
+                if self.arr1 and self.type in cw.bulk and not self.template: self.typecw[PY] = 'list[ndarray]' if self.arr2 and self.arr2.endswith('[i]') else 'ndarray'
             # toinit
             if not self.initcw:
                 # type
@@ -459,6 +471,10 @@ class Class:
                         if self.arr2:
                             if self.arr2.endswith('[i]'): cs = f'r.ReadFArray((k, i) => {cs}, {self.arr1})'; py = f'r.readFArray(lambda k, i: {py}, {self.arr1})'
                             else: cs = f'r.ReadFArray(k => {cs}, {self.arr1})'; py = f'r.readFArray(lambda k: {py}, {self.arr1})'
+                        # fixed-width numeric arrays, including nested ones, become a single numpy read
+                        if self.type in cw.bulk and not self.template:
+                            if self.arr2: py = fmt_bulk(cw.bulk[self.type], self.arr1, root.cond(parent, self.arr2, cw)[PY], self.arr2.endswith('[i]'))
+                            else: py = fmt_bulk(cw.bulk[self.type], self.arr1 if self.arr1.startswith('L') else root.cond(parent, self.arr1, cw)[PY])
                     if self.template: cs = cs.replace('{T}', self.templatecs); py = py.replace('{T}', self.templatepy)
                 elif 'calculated' in root.custom: (cs, py) = root.custom['calculated'](self.name)
                 else: raise Exception(f'calculated? {root.name}')
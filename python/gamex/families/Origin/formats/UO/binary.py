@@ -13,6 +13,16 @@ class Archive: pass
 class MetaManager: pass
 class TextureFlags: pass
 
+# expands runs to the indices they cover, in run order
+def _runIndex(starts: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    ends = np.cumsum(lengths)
+    return np.arange(ends[-1] if len(ends) else 0) + np.repeat(starts - ends + lengths, lengths)
+
+# writes run pixels, later runs win where a run spilled past its row
+def _blit(pixels: np.ndarray, index: np.ndarray, values: np.ndarray, spilled: bool) -> None:
+    if spilled: index, last = np.unique(index[::-1], return_index = True); values = values[::-1][last]
+    pixels[index] = values
+
 # Binary_Anim
 class Binary_Anim(IHaveMetaInfo):
     @staticmethod
@@ -436,21 +446,21 @@ class Binary_Gump(IHaveMetaInfo, ITexture):
         self.load(r.readBytes(length), width, height)
 
     def load(self, data: bytes, width: int, height: int) -> None:
-        lookup = np.frombuffer(data, dtype = np.int32); dat = np.frombuffer(data, dtype = np.uint16); lookup_ = 0; datLen = len(dat)
+        lookup = np.frombuffer(data, dtype = np.int32); dat = np.frombuffer(data, dtype = np.uint16)
         bd = self.pixels = bytearray(width * height << 1)
-        mv = memoryview(np.frombuffer(bd, dtype = np.uint16))
-        line = 0
-        for y in range(height):
-            count = lookup[lookup_] << 1; lookup_ += 1
-            cur = line; end = line + width
-            while cur < end:
-                if count < datLen: color = dat[count + 0]; next = cur + int(dat[count + 1]); count += 2
-                else: color = 0
-                if color == 0: cur = next
-                else:
-                    color ^= 0x8000
-                    while cur < next: mv[cur] = color; cur += 1
-            line += width
+        pixels = np.frombuffer(bd, dtype = np.uint16)
+        if not pixels.size: return
+        # (color, run) pairs, each row takes pairs from its lookup until the row is covered
+        colors = dat[0:len(dat) & ~1:2]; runs = dat[1::2].astype(np.int64)
+        cum = np.concatenate(([0], np.cumsum(runs)))
+        first = lookup[:height].astype(np.int64)
+        last = np.searchsorted(cum, cum[first] + width)
+        if last.max() >= len(cum): raise Exception('Gump rows overrun the data')
+        counts = last - first
+        pairs = _runIndex(first, counts)
+        starts = np.repeat(np.arange(height, dtype = np.int64) * width - cum[first], counts) + cum[pairs]
+        keep = colors[pairs] != 0; pairs = pairs[keep]
+        _blit(pixels, _runIndex(starts[keep], runs[pairs]), np.repeat(colors[pairs] ^ 0x8000, runs[pairs]), bool((cum[last] - cum[first] > width).any()))
 
     def loadWithHue(self, data: bytes, hue: 'Binary_Hues.Record', onlyHueGrayPixels: bool) -> None:
         pass
@@ -559,24 +569,13 @@ class Binary_Land(IHaveMetaInfo, ITexture):
     @staticmethod
     async def factory(r: BinaryReader, f: FileSource, s: Archive): return Binary_Land(r, f.fileSize)
 
+    # pixel indices of the 44x44 diamond in stored order, widening then narrowing rows
+    index = np.concatenate([np.arange(21 - y, 23 + y) + y * 44 for y in range(22)] + [np.arange(y, 44 - y) + (22 + y) * 44 for y in range(22)])
+
     def __init__(self, r: BinaryReader, length: int):
-        bdata = np.frombuffer(r.readBytes(length), dtype = np.uint16); bdata_ = 0
+        bdata = np.frombuffer(r.readBytes(length), dtype = np.uint16)
         bd = self.pixels = bytearray(44 * 44 << 1)
-        mv = memoryview(np.frombuffer(bd, dtype = np.uint16))
-        width = 44
-        line = 0
-        # run
-        xOffset = 21; xRun = 2
-        for y in range(22):
-            cur = line + xOffset; end = cur + xRun
-            while cur < end: mv[cur] = bdata[bdata_] ^ 0x8000; cur += 1; bdata_ += 1
-            xOffset -= 1; xRun += 2; line += width
-        # run
-        xOffset = 0; xRun = 44
-        for y in range(22):
-            cur = line + xOffset; end = cur + xRun
-            while cur < end: mv[cur] = bdata[bdata_] ^ 0x8000; cur += 1; bdata_ += 1
-            xOffset += 1; xRun -= 2; line += width
+        np.frombuffer(bd, dtype = np.uint16)[Binary_Land.index] = bdata[:len(Binary_Land.index)] ^ 0x8000
 
     #region ITexture
 
@@ -604,17 +603,14 @@ class Binary_Light(IHaveMetaInfo, ITexture):
     async def factory(r: BinaryReader, f: FileSource, s: Archive): return Binary_Light(r, f.fileSize, f.compressed)
 
     def __init__(self, r: BinaryReader, length: int, extra: int):
-        bdata = np.frombuffer(r.readBytes(length), dtype = np.int8); bdata_ = 0
+        bdata = np.frombuffer(r.readBytes(length), dtype = np.int8)
         width = self.width = extra & 0xFFFF
         height = self.height = (extra >> 16) & 0xFFFF
         if width <= 0 or height <= 0: return
         bd = self.pixels = bytearray(width * height << 1)
-        mv = memoryview(np.frombuffer(bd, dtype = np.uint16))
-        line = 0
-        for y in range(height):
-            cur = line; end = cur + width
-            while cur < end: v = int(bdata[bdata_]); bdata_ += 1; mv[cur] = (((0x1f + v) << 10) + ((0x1F + v) << 5) + (0x1F + v)) & 0xFFFF; cur += 1
-            line += width
+        # the same 5-bit level in each channel: v * (1 << 10 | 1 << 5 | 1)
+        v = bdata[:width * height].astype(np.int32) + 0x1F
+        np.frombuffer(bd, dtype = np.uint16)[:] = (v * 0x421) & 0xFFFF
 
     #region ITexture
 
@@ -904,29 +900,30 @@ class Binary_Art(IHaveMetaInfo, ITexture):
     async def factory(r: BinaryReader, f: FileSource, s: Archive): return Binary_Art(r, f.fileSize)
 
     def __init__(self, r: BinaryReader, length: int):
-        bdata = np.frombuffer(r.readBytes(length), dtype = np.uint16); bdata_ = 0
-        count = 2
-        width = self.width = bdata[count]; count += 1
-        height = self.height = bdata[count]; count += 1
+        bdata = np.frombuffer(r.readBytes(length), dtype = np.uint16); words = memoryview(bdata)
+        width = self.width = words[2]
+        height = self.height = words[3]
         if width <= 0 or height <= 0: return
         start = height + 4
-        lookups = [start + bdata[count + i] for i in range(height)]; count += height
         bd = self.pixels = bytearray(width * height << 1)
-        mv = memoryview(np.frombuffer(bd, dtype = np.uint16))
+        # walk the run headers, then copy every run in one gather
+        dst = []; src = []; runs = []; spilled = False
         line = 0
         for y in range(height):
-            count = lookups[y]
+            count = start + words[4 + y]
             cur = line
-            xOffset = xRun = 0
-            while (xOffset := bdata[count+0]) + (xRun := bdata[count+1]) != 0:
+            while (xOffset := words[count]) + (xRun := words[count + 1]) != 0:
                 count += 2
                 if xOffset > width: break
                 cur += xOffset
                 if xOffset + xRun > width: break
                 # run
-                end = cur + xRun
-                while cur < end: mv[cur] = bdata[count] ^ 0x8000; cur += 1; count += 1
+                dst.append(cur); src.append(count); runs.append(xRun)
+                cur += xRun; count += xRun
+            if cur > line + width: spilled = True
             line += width
+        runs = np.array(runs, dtype = np.int64)
+        _blit(np.frombuffer(bd, dtype = np.uint16), _runIndex(np.array(dst, dtype = np.int64), runs), bdata[_runIndex(np.array(src, dtype = np.int64), runs)] ^ 0x8000, spilled)
 
     #region ITexture
 
@@ -3,7 +3,7 @@ from pathlib import Path
 from ctypes import c_ulong, c_ulonglong
 from io import BytesIO
 from openstk.core import _pathExtension
-from gamex import BinaryArchive, ArcBinaryT, FileSource, DesSer
+from gamex import BinaryArchive, ArcBinaryT, FileSource, FileTable, DesSer
 from gamex.families.Origin.formats.UO.binary import *
 from gamex.families.Xbox.formats.binary import Binary_Xnb
 
@@ -174,11 +174,10 @@ class Binary_UO(ArcBinaryT):
         self.count = idxLength if idxLength > 0 else 0
 
         # find hashes
-        hashes = {}
-        for i in range(length): hashes[self.createUopHash(f'build/{uopPattern}/{i:08}{extension}'.encode('ascii'))] = i
+        hashes = self.getUopHashes(uopPattern, extension, length)
 
-        # load files
-        files = [None] * length
+        # load entries: idx -> [offset, fileSize, compressed]
+        entries = {}
         nextBlock = header.nextBlock
         r.seek(nextBlock)
         while True:
@@ -189,23 +188,68 @@ class Binary_UO(ArcBinaryT):
                 if record.offset == 0 or record.hash not in hashes: continue
                 idx = hashes[record.hash]
                 if idx < 0 or idx > length: raise Exception('hashes dictionary and files collection have different count of entries!')
-                file = files[idx] = FileSource(
-                    id = idx,
-                    path = pathFunc(idx),
-                    offset = record.offset + record.headerLength,
-                    fileSize = record.fileSize)
+                entry = entries[idx] = [record.offset + record.headerLength, record.fileSize, 0]
                 # load extra
                 if not extra: continue
                 def peek_(z):
-                    r.seek(file.offset)
+                    r.seek(entry[0])
                     extra = r.readBytes(8)
                     extra1 = ((extra[3] << 24) | (extra[2] << 16) | (extra[1] << 8) | extra[0]) & 0xffff
                     extra2 = ((extra[7] << 24) | (extra[6] << 16) | (extra[5] << 8) | extra[4]) & 0xffff
-                    file.offset += 8
-                    file.compressed = extra1 << 16 | extra2
+                    entry[0] += 8
+                    entry[2] = extra1 << 16 | extra2
                 r.peek(peek_)
             if r.f.seek(nextBlock, os.SEEK_SET) == 0: break
-        source.files = [s for s in files if s]
+
+        # load files
+        source.files = files = FileTable()
+        for idx in sorted(entries):
+            offset, fileSize, compressed = entries[idx]
+            files.append(id = idx, path = pathFunc(idx), offset = offset, fileSize = fileSize, compressed = compressed)
+
+    uopHashes: dict[tuple, dict[int, int]] = {} # (pattern, extension, length) -> hash -> index, shared by every open
+
+    # gets the hash to index table of the names build/{pattern}/{i:08}{extension}
+    @staticmethod
+    def getUopHashes(uopPattern: str, extension: str, length: int) -> dict[int, int]:
+        key = (uopPattern, extension, length)
+        if (z := Binary_UO.uopHashes.get(key)) != None: return z
+        if length <= 0: return {}
+        # names share one length, only the eight digits differ
+        prefix = np.frombuffer(f'build/{uopPattern}/'.encode('ascii'), np.uint8); suffix = np.frombuffer(f'{extension}'.encode('ascii'), np.uint8)
+        digits = (np.arange(length, dtype = np.int64)[:, None] // 10 ** np.arange(7, -1, -1, dtype = np.int64) % 10 + 48).astype(np.uint8)
+        names = np.hstack((np.broadcast_to(prefix, (length, len(prefix))), digits, np.broadcast_to(suffix, (length, len(suffix)))))
+        z = Binary_UO.uopHashes[key] = dict(zip(Binary_UO.createUopHashes(names).tolist(), range(length)))
+        return z
+
+    # createUopHash over rows of equal-length names, vectorized across rows
+    @staticmethod
+    def createUopHashes(s: np.ndarray) -> np.ndarray:
+        count, length = s.shape
+        blocks = (length + 11) // 12
+        k = np.zeros((count, blocks * 12), np.uint8); k[:, :length] = s
+        k = k.view('<u4').astype(np.uint32)
+        ebx = np.full(count, (length + 0xDEADBEEF) & 0xffffffff, np.uint32); edi = ebx.copy(); esi = ebx.copy()
+        for i in range(0, (blocks - 1) * 3, 3):
+            edi += k[:, i + 1]; esi += k[:, i + 2]
+            edx = k[:, i] - esi
+            edx = (edx + ebx) ^ (esi >> 28) ^ (esi << 4); esi += edi
+            edi = (edi - edx) ^ (edx >> 26) ^ (edx << 6); edx += esi
+            esi = (esi - edi) ^ (edi >> 24) ^ (edi << 8); edi += edx
+            ebx = (edx - esi) ^ (esi >> 16) ^ (esi << 16); esi += edi
+            edi = (edi - ebx) ^ (ebx >> 13) ^ (ebx << 19); ebx += esi
+            esi = (esi - edi) ^ (edi >> 28) ^ (edi << 4); edi += ebx
+        # tail, zero padded
+        i = (blocks - 1) * 3
+        esi += k[:, i + 2]; edi += k[:, i + 1]; ebx += k[:, i]
+        esi = (esi ^ edi) - ((edi >> 18) ^ (edi << 14))
+        ecx = (esi ^ ebx) - ((esi >> 21) ^ (esi << 11))
+        edi = (edi ^ ecx) - ((ecx >> 7) ^ (ecx << 25))
+        esi = (esi ^ edi) - ((edi >> 16) ^ (edi << 16))
+        edx = (esi ^ ecx) - ((esi >> 28) ^ (esi << 4))
+        edi = (edi ^ edx) - ((edx >> 18) ^ (edx << 14))
+        eax = (esi ^ edi) - ((edi >> 8) ^ (edi << 24))
+        return edi.astype(np.uint64) << np.uint64(32) | eax
 
     @staticmethod
     def createUopHash2(s: str) -> int:
@@ -316,15 +360,9 @@ class Binary_UO(ArcBinaryT):
         self.count = r.length // 12
 
         # load files
-        id = 0
-        files: list[FileSource] = [FileSource(
-            id = id,
-            path = pathFunc(id),
-            offset = s.offset,
-            fileSize = s.fileSize,
-            compressed = s.extra,
-            tag = (id := id + 1)) for s in r.readSArray(self.IdxFile, self.count)]
-        source.files = files
+        source.files = files = FileTable()
+        for id, s in enumerate(r.readSArray(self.IdxFile, self.count)):
+            files.append(id = id, path = pathFunc(id), offset = s.offset, fileSize = s.fileSize, compressed = s.extra)
         # fill with empty
         # for i in range(self.count, length):
         #     files.append(FileSource(
@@ -338,10 +376,9 @@ class Binary_UO(ArcBinaryT):
         verdata = Binary_Verdata.instance
         if verdata and fileId in verdata.patches:
             for patch in [patch for patch in verdata.patches[fileId] if patch.index > 0 and patch.index < len(files)]:
-                file = files[patch.index]
-                file.offset = patch.offset
-                file.fileSize = patch.fileSize | (1 << 31)
-                file.compressed = patch.extra
+                files.offset[patch.index] = patch.offset
+                files.fileSize[patch.index] = patch.fileSize | (1 << 31)
+                files.compressed[patch.index] = patch.extra
 
         # public static int Art_MaxItemId
         #     => Art_Instance.Count >= 0x13FDC ? 0xFFDC // High Seas
@@ -356,6 +393,14 @@ class Binary_UO(ArcBinaryT):
 
     #endregion
 
+    # readDataView
+    def readDataView(self, source: BinaryArchive, file: FileSource, option: object = None) -> object:
+        return source.readView(file.offset, file.fileSize) if file.offset >= 0 and file.fileSize >= 0 and (file.fileSize & (1 << 31)) == 0 else None
+
+    # dataRange
+    def dataRange(self, source: BinaryArchive, file: FileSource) -> tuple[str, int, int]:
+        return (None, file.offset, file.fileSize) if file.offset >= 0 and file.fileSize >= 0 and (file.fileSize & (1 << 31)) == 0 else None
+
     # readData
     def readData(self, source: BinaryArchive, r: BinaryReader, file: FileSource, option: object = None) -> BytesIO:
         if file.offset < 0: return None
@@ -1,5 +1,5 @@
 from __future__ import annotations
-import sys, os, io, struct, array, ctypes
+import sys, os, io, struct, array, ctypes, threading
 from enum import Enum
 from zstandard import ZstdDecompressor
 
@@ -460,8 +460,12 @@ class NoneDecompressor:
     def __init__(self): self.eof = False
     def decompress(self, data): self.eof = True; return data
 
+# one reused zstd context per thread, entries decompress in a single call
+_zstdLocal = threading.local()
 class ZStdWrapDecompressor:
-    def __init__(self): self._decomp = ZstdDecompressor(); self.eof = False
+    def __init__(self):
+        if (z := getattr(_zstdLocal, 'decomp', None)) == None: z = _zstdLocal.decomp = ZstdDecompressor()
+        self._decomp = z; self.eof = False
     def decompress(self, data): data = self._decomp.decompress(data); self.eof = True; return data
 
 DEFAULT_CUSTOMIV = bytes([0x70, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0])
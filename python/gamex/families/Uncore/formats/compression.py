@@ -1,14 +1,157 @@
 from __future__ import annotations
+import time, threading
 from io import BytesIO
-from zstandard import ZstdDecompressor
+from zstandard import ZstdDecompressor, ZstdCompressionDict
+
+# typedefs
+class BinaryReader: pass
+
+#region Codec
+
+# tag::Codec[]
+# Codec - decompresses whole buffers, or into a preallocated buffer of the known unpacked size, counting throughput
+# zlib, zstd, lz4 frames and the pure-python decoders write into dst through a bounded window, native lz4 blocks decode then copy
+class Codec:
+    window: int = 256 * 1024 # largest intermediate output of a streamed decompressInto
+    def __init__(self, name: str):
+        self.name = name
+        self.lock = threading.Lock()
+        self.calls = 0; self.bytesIn = 0; self.bytesOut = 0; self.elapsed = 0.
+    def __repr__(self): return f'Codec:{self.name}'
+
+    def decompress(self, src: bytes, newLength: int = None) -> bytes:
+        start = time.perf_counter()
+        res = self._decompress(src, newLength)
+        self._count(len(src), len(res), start)
+        return res
+
+    # decompresses into dst, returns the written length
+    def decompressInto(self, src: bytes, dst: memoryview) -> int:
+        start = time.perf_counter()
+        res = self._decompressInto(src, dst)
+        self._count(len(src), res, start)
+        return res
+
+    def _count(self, bytesIn: int, bytesOut: int, start: float) -> None:
+        elapsed = time.perf_counter() - start
+        with self.lock: self.calls += 1; self.bytesIn += bytesIn; self.bytesOut += bytesOut; self.elapsed += elapsed
+
+    def _decompress(self, src: bytes, newLength: int) -> bytes:
+        dst = bytearray(newLength)
+        return dst[:self._decompressInto(src, memoryview(dst))]
+    def _decompressInto(self, src: bytes, dst: memoryview) -> int:
+        res = self._decompress(src, len(dst)); dst[:len(res)] = res
+        return len(res)
+
+    def stats(self) -> dict[str, object]:
+        return { 'calls': self.calls, 'bytesIn': self.bytesIn, 'bytesOut': self.bytesOut, 'elapsed': self.elapsed,
+            'mbPerSec': self.bytesOut / self.elapsed / 1048576 if self.elapsed else 0. }
+    def reset(self) -> None:
+        with self.lock: self.calls = 0; self.bytesIn = 0; self.bytesOut = 0; self.elapsed = 0.
+# end::Codec[]
+
+# tag::Codec.codecs[]
+class ZlibCodec(Codec):
+    def __init__(self, name: str, wbits: int): super().__init__(name); self.wbits = wbits
+    def _decompress(self, src: bytes, newLength: int) -> bytes:
+        import zlib
+        return zlib.decompress(src, wbits = self.wbits, bufsize = newLength or zlib.DEF_BUF_SIZE)
+    def _decompressInto(self, src: bytes, dst: memoryview) -> int:
+        import zlib
+        z = zlib.decompressobj(wbits = self.wbits); pos = 0; size = len(dst)
+        while pos < size and not z.eof:
+            if not (out := z.decompress(src, min(self.window, size - pos))): break
+            dst[pos:pos + len(out)] = out; pos += len(out); src = z.unconsumed_tail
+        return pos
+
+# zstd with a reused decompression context per thread, and an optional pre-trained dictionary
+class ZstdCodec(Codec):
+    def __init__(self, name: str, dictionary: bytes = None):
+        super().__init__(name)
+        self.dictionary = ZstdCompressionDict(dictionary) if dictionary else None
+        self.local = threading.local()
+    def context(self) -> ZstdDecompressor:
+        if (z := getattr(self.local, 'context', None)) == None:
+            z = self.local.context = ZstdDecompressor(dict_data = self.dictionary) if self.dictionary else ZstdDecompressor()
+        return z
+    def _decompress(self, src: bytes, newLength: int) -> bytes:
+        return self.context().decompress(src, max_output_size = newLength or 0)
+    def _decompressInto(self, src: bytes, dst: memoryview) -> int:
+        pos = 0; size = len(dst)
+        with self.context().stream_reader(src, read_size = self.window) as s:
+            while pos < size and (n := s.readinto(dst[pos:])): pos += n
+        return pos
+
+    # registers a codec for an archive family's dictionary, as zstd:family
+    @staticmethod
+    def withDictionary(family: str, dictionary: bytes) -> ZstdCodec: return registerCodec(ZstdCodec(f'zstd:{family}', dictionary))
+
+# lz4 frames, or raw lz4 blocks, using the lz4 package when installed
+class Lz4Codec(Codec):
+    def __init__(self, name: str, frame: bool):
+        super().__init__(name); self.frame = frame
+        try: import lz4.frame, lz4.block; self.native = lz4
+        except ImportError: self.native = None
+    def _decompress(self, src: bytes, newLength: int) -> bytes:
+        if self.native: return self.native.frame.decompress(src) if self.frame else self.native.block.decompress(src, uncompressed_size = newLength)
+        if newLength == None and self.frame:
+            from ...._LIB.compression.lz4 import Lz4
+            newLength = Lz4.frameContentSize(src)
+        if newLength == None: raise Exception(f'{self.name}: unknown unpacked size')
+        return super()._decompress(src, newLength)
+    def _decompressInto(self, src: bytes, dst: memoryview) -> int:
+        if self.native and self.frame:
+            z = self.native.frame.LZ4FrameDecompressor(); pos = 0; size = len(dst)
+            while pos < size and not z.eof:
+                if not (out := z.decompress(src, min(self.window, size - pos))): break
+                dst[pos:pos + len(out)] = out; pos += len(out); src = b''
+            return pos
+        elif self.native: return super()._decompressInto(src, dst) # lz4.block has no output buffer, one block is copied
+        from ...._LIB.compression.lz4 import Lz4
+        return Lz4.decodeFrame(src, dst) if self.frame else Lz4.decodeBlock(memoryview(src), dst)
+
+class LzssCodec(Codec):
+    def _decompress(self, src: bytes, newLength: int) -> bytes:
+        from ...._LIB.compression.lzss import Lzss
+        return Lzss(BytesIO(src), newLength).decompress()
+
+class BlastCodec(Codec):
+    def _decompress(self, src: bytes, newLength: int) -> bytes:
+        from ...._LIB.compression.blast import Blast
+        res = bytearray(newLength)
+        Blast().decompress(src, res)
+        return res
+# end::Codec.codecs[]
+
+# tag::Codec.registry[]
+codecs: dict[str, Codec] = {}
+def registerCodec(codec: Codec) -> Codec: codecs[codec.name] = codec; return codec
+def getCodec(name: str) -> Codec:
+    if (z := codecs.get(name)) == None: raise Exception(f'Unknown codec: {name}')
+    return z
+def codecStats() -> dict[str, dict[str, object]]: return { k: v.stats() for k, v in codecs.items() if v.calls }
+registerCodec(ZlibCodec('zlib', 0))
+registerCodec(ZlibCodec('deflate', -15))
+registerCodec(ZstdCodec('zstd'))
+registerCodec(Lz4Codec('lz4', True))
+registerCodec(Lz4Codec('lz4block', False))
+registerCodec(LzssCodec('lzss'))
+registerCodec(BlastCodec('blast'))
+# end::Codec.registry[]
+
+# reads length bytes and decompresses them into dst with a registered codec
+def decompressInto(r: BinaryReader, name: str, length: int, dst: memoryview) -> int: return getCodec(name).decompressInto(r.readBytes(length), dst)
+
+#endregion
 
 def decompressUnknown(r: BinaryReader, length: int, newLength: int) -> bytes: raise NotImplementedError('decompressUnknown')
-def decompressZlibStream(r: BinaryReader, noHeader: bool = False) -> bytes: 
+STREAM_BUFFER = 256 * 1024
+def decompressZlibStream(r: BinaryReader, noHeader: bool = False, bufferSize: int = None) -> bytes: 
     import zlib
     z = zlib.decompressobj(wbits = (-15 if noHeader else 0))
-    outs = []
+    outs = []; bufferSize = bufferSize or STREAM_BUFFER
     while True:
-        if not (buf := r.f.read(1024)): break # Read in chunks (e.g., 4KB) #4096
+        if not (buf := r.f.read(bufferSize)): break # unused input is seeked back below
         out = z.decompress(buf)
         if out: outs.append(out)
         if z.eof: break
@@ -18,25 +161,13 @@ def decompressZlib(r: BinaryReader, length: int, newLength: int, noHeader: bool
     import zlib
     data = r.readBytes(length)
     return \
-        zlib.decompress(data, wbits = (-15 if noHeader else 0)) if full else \
+        getCodec('deflate' if noHeader else 'zlib').decompress(data, newLength) if full else \
         zlib.decompressobj(wbits = (-15 if noHeader else 0)).decompress(data)
-def decompressZlib2(r: BinaryReader, length: int, newLength: int) -> bytes:
-    import zlib
-    data = r.readBytes(length)
-    return zlib.decompress(data)
-def decompressZstd(r: BinaryReader, length: int, newLength: int) -> bytes:
-    return ZstdDecompressor().decompress(r.readBytes(length))
-def decompressLzss(r: BinaryReader, length: int, newLength: int) -> bytes:
-    from ...._LIB.compression.lzss import Lzss
-    return Lzss(BytesIO(r.readBytes(length)), newLength).decompress()
-def decompressBlast(r: BinaryReader, length: int, newLength: int) -> bytes:
-    from ...._LIB.compression.blast import Blast
-    z = Blast()
-    data = r.readBytes(length)
-    res = bytearray(newLength)
-    z.decompress(data, res)
-    return res
-def decompressLz4(r: BinaryReader, length: int, newLength: int) -> bytes: raise NotImplementedError('decompressLz4')
+def decompressZlib2(r: BinaryReader, length: int, newLength: int) -> bytes: return getCodec('zlib').decompress(r.readBytes(length), newLength)
+def decompressZstd(r: BinaryReader, length: int, newLength: int, codec: str = 'zstd') -> bytes: return getCodec(codec).decompress(r.readBytes(length), newLength)
+def decompressLzss(r: BinaryReader, length: int, newLength: int) -> bytes: return getCodec('lzss').decompress(r.readBytes(length), newLength)
+def decompressBlast(r: BinaryReader, length: int, newLength: int) -> bytes: return getCodec('blast').decompress(r.readBytes(length), newLength)
+def decompressLz4(r: BinaryReader, length: int, newLength: int) -> bytes: return getCodec('lz4').decompress(r.readBytes(length), newLength)
 
 def decompressXbox(r: BinaryReader, length: int, newLength: int, codec: int = 1) -> bytes:
     from ...._LIB.compression.xcompress import XMEMCODEC, DecompressionContext
@@ -4,12 +4,14 @@ from io import BytesIO
 from enum import Enum, Flag
 from openstk.core import _throw, _pathExtension, unsafe, BinaryReader, X_LumpON, X_LumpNO, X_LumpNO2, X_Lump2NO
 from openstk.gfx import Raster, Texture_Bytes, ITexture, ITextureFrames, TextureFlags, TextureFormat, TexturePixel
-from gamex import Archive, BinaryArchive, ArcBinary, ArcBinaryT, FileSource, MetaInfo, MetaManager, MetaContent, IHaveMetaInfo
+from gamex import Archive, BinaryArchive, ArcBinary, ArcBinaryT, FileSource, FileTable, MetaInfo, MetaManager, MetaContent, IHaveMetaInfo
+from gamex.core.pool import FileHandles
 from gamex.families.Uncore.formats.compression import decompressBlast
-from hashlib import md5
+from hashlib import md5, sha256
+from concurrent.futures import ThreadPoolExecutor
 from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.backends import default_backend
-from cryptography.hazmat.primitives.asymmetric import padding
+from cryptography.hazmat.primitives.asymmetric import padding, utils
 from cryptography.hazmat.primitives import serialization
 
 #region Binary_Bsp30 - tag::Binary_Bsp30[]
@@ -1031,9 +1033,14 @@ class Binary_Mdl40(IHaveMetaInfo):
 
 # Binary_Vpk
 class Binary_Vpk(ArcBinaryT):
+    cacheVersion = 2
+    verifyOnOpen: bool = False          # checks the directory hashes and signature on every open
+    verifyBuffer: int = 1024 * 1024     # streaming buffer size of verification
+
     #region Headers
 
     MAGIC = 0x55AA1234
+    E_Entry = np.dtype([('hash', '<u4'), ('preload', '<u2'), ('id', '<u2'), ('offset', '<u4'), ('fileSize', '<u4'), ('terminator', '<u2')]) # fixed 18-byte tree record
 
     class V_HeaderV2:
         _struct = ('<4I', 16)
@@ -1059,10 +1066,11 @@ class Binary_Vpk(ArcBinaryT):
         publicKey: bytearray = bytearray()                     # Gets the public key.
         signature: tuple = (0, bytearray())                    # Gets the signature.
 
-        def __init__(self, r: BinaryReader, h: V_HeaderV2):
+        def __init__(self, r: BinaryReader, h: V_HeaderV2, treeSize: int, headerPosition: int):
+            self.header = h; self.treeSize = treeSize; self.headerPosition = headerPosition
             # archive md5
             if h.archiveMd5SectionSize != 0:
-                self.archiveMd5s = (r.tell(), r.readSArray(PakBinary_Vpk.V_ArchiveMd5, h.archiveMd5SectionSize // 28))
+                self.archiveMd5s = (r.tell(), r.readSArray(Binary_Vpk.V_ArchiveMd5, h.archiveMd5SectionSize // 28))
             # other md5
             if h.otherMd5SectionSize != 0:
                 self.treeChecksum = r.readBytes(16)
@@ -1072,55 +1080,72 @@ class Binary_Vpk(ArcBinaryT):
             if h.signatureSectionSize != 0:
                 position = r.tell()
                 publicKeySize = r.readInt32()
-                if h.signatureSectionSize == 20 and publicKeySize == self.MAGIC: return; # CS2 has this
+                if h.signatureSectionSize == 20 and publicKeySize == Binary_Vpk.MAGIC: return; # CS2 has this
                 self.publicKey = r.readBytes(publicKeySize)
                 self.signature = (position, r.readBytes(r.readInt32()))
 
-        # Verify checksums and signatures provided in the VPK
-        def verifyHashes(self, r: BinaryReader, treeSize: int, h: V_HeaderV2, headerPosition: int) -> None:
-            # treeChecksum
-            r.seek(headerPosition)
-            hash = md5(r.readBytes(treeSize)).digest()
-            if hash != self.treeChecksum: raise Exception(f'File tree checksum mismatch ({hash.hex()} != expected {self.treeChecksum.hex()})')
-            # archiveMd5SectionSize
-            r.seek(self.archiveMd5s[0])
-            hash = md5(r.readBytes(h.archiveMd5SectionSize)).digest()
-            if hash != self.archiveMd5EntriesChecksum: raise Exception(f'Archive MD5 checksum mismatch ({hash.hex()} != expected {self.archiveMd5EntriesChecksum.hex()})')
-            # wholeFileChecksum
-            r.seek(0)
-            hash = md5(r.readBytes(self.wholeFileChecksum[0])).digest()
-            if hash != self.wholeFileChecksum[1]: raise Exception(f'Package checksum mismatch ({hash.hex()} != expected {self.wholeFileChecksum[1].hex()})')
-
-        # Verifies the RSA signature
-        def verifySignature(self, r: BinaryReader) -> None:
-            if not self.publicKey or not self.signature[1]: return
-            publicKey = serialization.load_der_public_key(self.publicKey, backend = default_backend())
-            r.seek(0)
-            data = r.readBytes(self.signature[0])
-            publicKey.verify(
-                self.signature[1],
-                data,
-                padding.PKCS1v15(),
-                hashes.SHA256())
+        # Verify checksums and signature provided in the VPK, in a single streamed pass, returns the errors
+        def verifyHashes(self, r: BinaryReader, bufferSize: int = None) -> list[str]:
+            h = self.header; errors = []
+            checks = []
+            if h.otherMd5SectionSize != 0:
+                checks.append(('File tree', self.headerPosition, self.headerPosition + self.treeSize, md5(), self.treeChecksum))
+                checks.append(('Archive MD5', self.archiveMd5s[0], self.archiveMd5s[0] + h.archiveMd5SectionSize, md5(), self.archiveMd5EntriesChecksum))
+                checks.append(('Package', 0, self.wholeFileChecksum[0], md5(), self.wholeFileChecksum[1]))
+            signed = self.publicKey and self.signature[1]
+            if signed: checks.append(('Signature', 0, self.signature[0], sha256(), None))
+            if not checks: return errors
+            Binary_Vpk.streamHashes(r, [s[1:4] for s in checks], bufferSize)
+            for name, _, _, hash, expected in checks:
+                if expected == None: continue
+                if (z := hash.digest()) != expected: errors.append(f'{name} checksum mismatch ({z.hex()} != expected {expected.hex()})')
+            # Verifies the RSA signature
+            if signed:
+                publicKey = serialization.load_der_public_key(self.publicKey, backend = default_backend())
+                try: publicKey.verify(self.signature[1], checks[-1][3].digest(), padding.PKCS1v15(), utils.Prehashed(hashes.SHA256()))
+                except Exception: errors.append('Signature verification failed')
+            return errors
+
+    # verification report, the failed checks and the files in failed cache lines
+    class Report:
+        def __init__(self): self.errors: list[str] = []; self.files: list[str] = []
+        def __repr__(self): return f'Report:{'ok' if self.ok else f'{len(self.errors)} errors, {len(self.files)} files'}'
+        @property
+        def ok(self) -> bool: return not self.errors
+
+    # hashes ranges of (start, stop, hasher) in a single pass through a fixed buffer
+    @staticmethod
+    def streamHashes(r: BinaryReader, ranges: list[tuple[int, int, object]], bufferSize: int = None) -> None:
+        bufferSize = bufferSize or Binary_Vpk.verifyBuffer
+        start = min(s[0] for s in ranges); end = max(s[1] for s in ranges)
+        view = memoryview(bytearray(bufferSize)); pos = start
+        r.seek(start)
+        while pos < end:
+            if not (n := r.f.readinto(view[:min(bufferSize, end - pos)])): break
+            for a, b, hash in ranges:
+                a = max(a, pos); b = min(b, pos + n)
+                if a < b: hash.update(view[a - pos:b - pos])
+            pos += n
 
     #endregion
 
-    # read
-    def read(self, source: BinaryArchive, r: BinaryReader, tag: object = None) -> None:
-        source.files = files = []
+    # file mask
+    @staticmethod
+    def fileMask(path: str) -> str:
+        extension = _pathExtension(path)
+        if extension.endswith('_c'): extension = extension[:-2]
+        if extension.startswith('.v'): extension = extension[2:]
+        return f'{os.path.splitext(os.path.basename(path))[0]}{extension}'
 
-        # file mask
-        def fileMask(path: str) -> str:
-            extension = _pathExtension(path)
-            if extension.endswith('_c'): extension = extension[:-2]
-            if extension.startswith('.v'): extension = extension[2:]
-            return f'{os.path.splitext(os.path.basename(path))[0]}{extension}'
-        source.fileMask = fileMask
+    # archivePath - the chunk archive of an entry id, None for the dir archive
+    @staticmethod
+    def archivePath(source: BinaryArchive, id: int) -> str:
+        return None if id == 0x7FFF else f'{source.binPath[:-8] if source.binPath.endswith("_dir.vpk") else source.binPath}_{id:03d}.vpk'
 
-        # binPath
-        binPath = source.binPath
-        dirVpk = binPath.endswith('_dir.vpk')
-        if dirVpk: binPath = binPath[:-8]
+    # read
+    def read(self, source: BinaryArchive, r: BinaryReader, tag: object = None) -> None:
+        source.files = files = FileTable()
+        dirVpk = source.binPath.endswith('_dir.vpk')
 
         # read header
         if r.readUInt32() != self.MAGIC: raise Exception('BAD MAGIC')
@@ -1131,60 +1156,126 @@ class Binary_Vpk(ArcBinaryT):
         headerV2 = r.readS(self.V_HeaderV2) if version == 2 else None
         headerPosition = r.tell()
         
-        # read entires
-        ms = BytesIO()
-        while True:
-            typeName = r.readVWString(ms=ms)
-            if not typeName: break
-            while True:
-                directoryName = r.readVWString(ms=ms)
-                if not directoryName: break
-                while True:
-                    fileName = r.readVWString(ms=ms)
-                    if not fileName: break
-                    # get file
-                    file = FileSource(
-                        path = f'{f'{directoryName}/' if directoryName[0] != ' ' else ''}{fileName}.{typeName}',
-                        hash = r.readUInt32(),
-                        data = bytearray(r.readUInt16()),
-                        id = r.readUInt16(),
-                        offset = r.readUInt32(),
-                        fileSize = r.readUInt32())
-                    terminator = r.readUInt16()
-                    if terminator != 0xFFFF: raise Exception(f'Invalid terminator, was 0x{terminator:X} but expected 0x{0xFFFF:X}')
-                    if len(file.data) > 0: r.read(file.data, 0, len(file.data))
-                    if file.id != 0x7FFF:
-                        if not dirVpk: raise Exception('Given VPK is not a _dir, but entry is referencing an external archive.')
-                        file.tag = f'{binPath}_{file.id:03d}.vpk'
-                    else: file.tag = headerPosition + treeSize
-                    # add file
-                    files.append(file)
-
-        # verification
-        if version == 2:
-            # skip over file data, if any
-            r.skip(headerV2.fileDataSectionSize)
-            v = self.Verification(r, headerV2)
-            v.verifyHashes(r, treeSize, headerV2, headerPosition)
-            v.verifySignature(r)
-
-    # readData
-    def readData(self, source: BinaryArchive, r: BinaryReader, file: FileSource, option: object = None) -> BytesIO:
-        fileDataLength = len(file.data)
+        # read entires, the id column is the archive index and the preload bytes are kept by entry
+        paths, records, entries, tree = self.readTree(r.readBytes(treeSize))
+        source.tag = headerPosition + treeSize # data offset of the dir archive
+        ids = entries['id']
+        if not dirVpk and (ids != 0x7FFF).any(): raise Exception('Given VPK is not a _dir, but entry is referencing an external archive.')
+        preloads = np.flatnonzero(entries['preload'])
+        files.extend(paths,
+            data = {i: tree[s:s + n] for i, s, n in zip(preloads.tolist(), (records[preloads] + 18).tolist(), entries['preload'][preloads].tolist())},
+            id = ids, offset = entries['offset'], fileSize = entries['fileSize'], hash = entries['hash'])
+
+        # verification, on request
+        if version == 2 and self.verifyOnOpen:
+            r.seek(headerPosition + treeSize + headerV2.fileDataSectionSize)
+            if errors := self.Verification(r, headerV2, treeSize, headerPosition).verifyHashes(r): raise Exception(errors[0])
+
+    # readTree - splits the extension/directory/name tree on NULs in one pass, then takes the fixed entry records through a structured view
+    @staticmethod
+    def readTree(tree: bytes) -> tuple[list[str], np.ndarray, np.ndarray, bytes]:
+        paths = []; records = []; find = tree.find; pos = 0
+        def name() -> str:
+            nonlocal pos
+            if (end := find(b'\0', pos)) < 0: raise Exception('Truncated VPK directory tree')
+            s = tree[pos:end].decode('utf-8'); pos = end + 1
+            return s
+        while (typeName := name()):
+            while (directoryName := name()):
+                prefix = f'{directoryName}/' if directoryName[0] != ' ' else ''
+                while (fileName := name()):
+                    paths.append(f'{prefix}{fileName}.{typeName}'); records.append(pos)
+                    if pos + 18 > len(tree): raise Exception('Truncated VPK directory tree')
+                    pos += 18 + (tree[pos + 4] | tree[pos + 5] << 8)
+        # a record starts at every byte of the view, so indexing by position copies only the records
+        records = np.array(records, np.int64)
+        entries = np.ndarray((max(len(tree) - 17, 0),), Binary_Vpk.E_Entry, tree, 0, (1,))[records]
+        if (bad := np.flatnonzero(entries['terminator'] != 0xFFFF)).size: raise Exception(f'Invalid terminator, was 0x{int(entries["terminator"][bad[0]]):X} but expected 0x{0xFFFF:X}')
+        return paths, records, entries, tree
+
+    # reads the verification sections, None for unsigned (v1) packages
+    def readVerification(self, r: BinaryReader) -> Verification:
+        r.seek(0)
+        if r.readUInt32() != self.MAGIC: raise Exception('BAD MAGIC')
+        version = r.readUInt32(); treeSize = r.readUInt32()
+        if version != 2: return None
+        headerV2 = r.readS(self.V_HeaderV2); headerPosition = r.tell()
+        r.seek(headerPosition + treeSize + headerV2.fileDataSectionSize)
+        return self.Verification(r, headerV2, treeSize, headerPosition)
+
+    # verifies the directory hashes and signature, and the cache lines of the chunk archives in parallel
+    def verify(self, source: BinaryArchive, archives: bool = True, bufferSize: int = None, workers: int = None) -> Report:
+        report = self.Report()
+        v = source.readerT(lambda r: (z := self.readVerification(r)) and (z, z.verifyHashes(r, bufferSize)))
+        if not v: return report
+        v, report.errors = v
+        if not archives or not v.archiveMd5s[1]: return report
+        # cache lines by archive, each archive read in offset order
+        dataOffset = v.headerPosition + v.treeSize
+        lines: dict[int, list[V_ArchiveMd5]] = {}
+        for s in v.archiveMd5s[1]: lines.setdefault(s.archiveIndex, []).append(s)
+        def verifyArchive(index: int) -> list[V_ArchiveMd5]:
+            items = sorted(lines[index], key = lambda s: s.offset)
+            base = dataOffset if index == 0x7FFF else 0
+            digests = [md5() for s in items]
+            def _stream(r: BinaryReader) -> None:
+                for s, hash in zip(items, digests): Binary_Vpk.streamHashes(r, [(base + s.offset, base + s.offset + s.length, hash)], bufferSize)
+            try: source.reader(_stream, self.archivePath(source, index), True)
+            except Exception: return items
+            return [s for s, hash in zip(items, digests) if hash.digest() != s.checksum]
+        with ThreadPoolExecutor(workers) as pool: failed = [s for z in pool.map(verifyArchive, lines) for s in z]
+        if not failed: return report
+        # files overlapping a failed cache line
+        report.errors.extend(f'Cache line checksum mismatch ({"dir" if s.archiveIndex == 0x7FFF else f"{s.archiveIndex:03d}"}:{s.offset}+{s.length})' for s in failed)
+        failedBy: dict[int, list[V_ArchiveMd5]] = {}
+        for s in failed: failedBy.setdefault(s.archiveIndex, []).append(s)
+        files = source.files
+        report.files = [files.path(i) for i, (id, offset, fileSize) in enumerate(zip(files.id, files.offset, files.fileSize)) if fileSize and (z := failedBy.get(id)) and \
+            any(s.offset < offset + fileSize and offset < s.offset + s.length for s in z)]
+        return report
+
+    # process
+    def process(self, source: BinaryArchive) -> None:
+        source.fileMask = self.fileMask
+        # one descriptor per chunk archive, held until closing
+        chunks = set(source.files.id) - {0x7FFF}
+        if chunks: source.fileHandles = FileHandles(len(chunks) + 1)
+
+    # readDataView
+    def readDataView(self, source: BinaryArchive, file: FileSource, option: object = None) -> object:
+        if file.data or file.fileSize == 0: return None
+        elif file.id == 0x7FFF: return source.readView(file.offset + source.tag, file.fileSize)
+        else: return source.readView(file.offset, file.fileSize, self.archivePath(source, file.id))
+
+    # dataRange
+    def dataRange(self, source: BinaryArchive, file: FileSource) -> tuple[str, int, int]:
+        return (None, file.offset + source.tag, file.fileSize) if file.id == 0x7FFF else (self.archivePath(source, file.id), file.offset, file.fileSize)
+
+    # rangeOrder - the dir archive, then chunk archives by index
+    def rangeOrder(self, source: BinaryArchive, path: str) -> object:
+        return -1 if path == source.binPath else int(path[path.rindex('_') + 1:-4])
+
+    # readDataAt
+    def readDataAt(self, source: BinaryArchive, r: BinaryReader, file: FileSource, option: object = None) -> BytesIO:
+        fileDataLength = len(file.data) if file.data else 0
         data = bytearray(fileDataLength + file.fileSize); mv = memoryview(data)
-        if fileDataLength > 0: data[0:] = file.data
-        def _str(r2: BinaryReader): r2.seek(file.offset); r2.read(mv, fileDataLength, file.fileSize)
-        if file.fileSize == 0: pass
-        elif isinstance(file.tag, int): r.seek(file.offset + file.tag); r.read(mv, fileDataLength, file.fileSize)
-        elif isinstance(file.tag, str): source.reader(_str, file.tag)
+        if fileDataLength > 0: mv[:fileDataLength] = file.data
+        if file.fileSize != 0: r.seek(file.offset + (source.tag if file.id == 0x7FFF else 0)); r.read(mv, fileDataLength, file.fileSize)
         return BytesIO(data)
 
+    # readData
+    def readData(self, source: BinaryArchive, r: BinaryReader, file: FileSource, option: object = None) -> BytesIO: return \
+        source.readerT(lambda r2: self.readDataAt(source, r2, file, option), self.archivePath(source, file.id), True) if file.id != 0x7FFF and file.fileSize != 0 else \
+        self.readDataAt(source, r, file, option)
+
 #endregion - end::Binary_Vpk[]
 
 #region Binary_Wad3 - tag::Binary_Wad3[]
 
 # Binary_Wad3
 class Binary_Wad3(ArcBinaryT):
+    cacheVersion = 1
+
     #region Headers
 
     W_MAGIC = 0x33444157 #: WAD3
@@ -1218,7 +1309,7 @@ class Binary_Wad3(ArcBinaryT):
 
     # read
     def read(self, source: BinaryArchive, r: BinaryReader, tag: object = None) -> None:
-        source.files = files = []
+        source.files = files = FileTable()
 
         # read file
         header = r.readS(self.W_Header)
@@ -1234,12 +1325,19 @@ class Binary_Wad3(ArcBinaryT):
                 case 0x43: path = f'{name}.tex'
                 case 0x46: path = f'{name}.fnt'
                 case _: path = f'{name}.{lump.type:x}'
-            files.append(FileSource(
+            files.append(
                 path = path,
                 offset = lump.offset,
                 compressed = lump.compression,
                 fileSize = lump.diskSize,
-                packedSize = lump.size))
+                packedSize = lump.size)
+
+    # readDataView
+    def readDataView(self, source: BinaryArchive, file: FileSource, option: object = None) -> object:
+        return source.readView(file.offset, file.fileSize) if file.compressed == 0 else None
+
+    # dataRange
+    def dataRange(self, source: BinaryArchive, file: FileSource) -> tuple[str, int, int]: return (None, file.offset, file.fileSize)
 
     # readData
     def readData(self, source: BinaryArchive, r: BinaryReader, file: FileSource, option: object = None) -> BytesIO:
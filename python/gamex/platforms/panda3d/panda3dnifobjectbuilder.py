@@ -142,18 +142,18 @@ class Panda3dNifObjectBuilder:
         vdata.setNumRows(length)
         # vertex positions
         vertex = GeomVertexWriter(vdata, 'vertex')
-        for t in s.vertices: z = t / NifObjectBuilder.MeterInUnits; vertex.addData3(z[0], z[1], z[2])
+        for z in s.vertices / NifObjectBuilder.MeterInUnits: vertex.addData3(z[0], z[1], z[2])
         # vertex normals
-        if s.normals:
+        if s.normals is not None:
             normal = GeomVertexWriter(vdata, 'normal')
             for t in s.normals: normal.addData3(t[0], t[1], t[2])
         # vertex UV coordinates
-        if s.uvSets:
+        if s.uvSets is not None and len(s.uvSets):
             texcoord = GeomVertexWriter(vdata, 'texcoord')
-            for t in s.uvSets[0]: texcoord.addData2(t.u, t.v)
+            for t in s.uvSets[0]: texcoord.addData2(t[0], t[1])
         # triangle vertex indices
         prim = GeomTriangles(Geom.UHStatic)
-        for t in s.triangles: prim.addVertices(t.v1, t.v3, t.v2) # Reverse triangle winding order.
+        for t in s.triangles[:, (0, 2, 1)].tolist(): prim.addVertices(*t) # Reverse triangle winding order.
         # create the mesh.
         geom = Geom(vdata)
         geom.addPrimitive(prim)
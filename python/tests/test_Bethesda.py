@@ -1,19 +1,477 @@
-from gamex import family
+import struct
+from io import BytesIO
+from unittest import TestCase, main
+import numpy as np
+from openstk.core import BinaryReader, Int3
+from gamex.families.Bethesda.formats.records import Reader, FormType, FieldType, LANDRecord
+import zlib
+from gamex import FileSource
+from gamex.families.Bethesda.formats.binary import Binary_Ba2, Binary_Bsa, LoadOrder
+import os, tempfile
+from types import SimpleNamespace
+from openstk.vfx import DirectoryFileSystem
+from gamex.core.binary import BinaryState
+from gamex.families.Bethesda.formats.records import RecordGroup, CellIndex, RecordIndex
+from gamex.families.GameX_Bethesda import BethesdaArchive
+from gamex.core.cache import IndexCache
+from gamex.core.meta import PathIndex
+import asyncio
+import pickle, pathlib
+from gamex.core.app.exportManager import DecodeState, ExportManager
 
-# get family
-family = family.getFamily('Bethesda')
-print(f'studio: {family.studio}')
+# TestLAND
+class TestLAND(TestCase):
+    @staticmethod
+    def land(size: int, x: int = 0, y: int = 0) -> LANDRecord:
+        rng = np.random.default_rng((size, x, y))
+        vhgt = struct.pack('<f', 8.) + rng.integers(-4, 4, size * size, dtype = np.int8).tobytes() + bytes(3)
+        vnml = rng.integers(-127, 127, size * size * 3, dtype = np.int8).tobytes()
+        vclr = rng.integers(0, 255, size * size * 3, dtype = np.uint8).tobytes()
+        r = Reader(BinaryReader(BytesIO(vhgt + vnml + vclr)), 'test.esm', FormType.TES3, False)
+        land = LANDRecord(); land.gridId = Int3(x, y, 0)
+        land.readField(r, FieldType.VHGT, len(vhgt)); land.readField(r, FieldType.VNML, len(vnml)); land.readField(r, FieldType.VCLR, len(vclr))
+        return land
 
-file = ('game:/Morrowind.esm#Morrowind', 'sample:0')
-# file = ('game:/Oblivion - Meshes.bsa#Oblivion', 'GRAPH/particles/DEFAULT.jpg')
-# file = ('game:/Fallout - Meshes.bsa#Fallout3', 'strings/english_m.lang')
-# file = ('game:/Fallout4 - Meshes.ba2#Fallout4', 'Meshes/Marker_Error.NIF')
+    def test_size33(self):
+        land = self.land(33)
+        self.assertEqual(33, land.size)
+        self.assertEqual((33, 33, 3), land.VNML.shape)
+        self.assertEqual((33, 33, 3), land.VCLR.shape)
+        self.assertEqual((33, 33), land.heightMap.shape)
+        self.assertEqual(8. + land.heights[0], land.heightMap[0, 0])
 
-# get arc with game:/uri
-archive = family.getArchive(file[0])
-sample = archive.game.getSample(file[1][7:]).path if file[1].startswith('sample') else file[1]
-print(f'arc: {archive}, {sample}')
+    def test_stitch(self):
+        lands = { (0, 0): self.land(33, 0, 0), (1, 0): self.land(33, 1, 0) }
+        heights, normals, colors = LANDRecord.stitch(lambda s: lands.get((s.x, s.y)), 0, 0, 1, 0)
+        self.assertEqual((33, 65), heights.shape)
+        self.assertTrue((heights[:, 32:] == lands[(1, 0)].heightMap).all())
+        self.assertTrue((colors[:, :32] == lands[(0, 0)].VCLR[:, :32]).all())
 
-# get file
-data = archive.getData(sample)
-print(f'dat: {data}')
\ No newline at end of file
+    def test_stitchMixed(self):
+        lands = { (0, 0): self.land(65, 0, 0), (1, 0): self.land(33, 1, 0) }
+        heights, _, _ = LANDRecord.stitch(lambda s: lands.get((s.x, s.y)), 0, 0, 1, 0)
+        self.assertEqual((65, 129), heights.shape)
+        self.assertTrue((heights[:, :64] == lands[(0, 0)].heightMap[:, :64]).all())
+        self.assertTrue((heights[::2, 64::2] == lands[(1, 0)].heightMap).all())
+
+# TestBa2 - texture headers against known layouts, and mip range reads
+class TestBa2(TestCase):
+    @staticmethod
+    def tex(format: int, width: int, height: int, numMips: int, numChunks: int = 1, isCubemap: int = 0) -> Binary_Ba2.TEX5:
+        return Binary_Ba2.TEX5((0, 0, 0, 0, numChunks, 24, height, width, numMips, format, isCubemap, 8))
+
+    def test_ddsHeaderDxt1(self):
+        # 256x256 BC1 with 9 mips, as texconv writes it
+        expected = bytes.fromhex(
+            '44445320' '7c000000' '07100a00' '00010000' '00010000' '00800000' '00000000' '09000000' + '00000000' * 11 +
+            '20000000' '04000000' '44585431' + '00000000' * 5 +
+            '08104000' + '00000000' * 4)
+        self.assertEqual(expected, Binary_Ba2.ddsHeader(self.tex(71, 256, 256, 9)))
+
+    def test_ddsHeaderDx10(self):
+        # BC7 adds the DXT10 header: dxgiFormat, TEXTURE2D, no misc flags, one array slice, unknown alpha
+        header = Binary_Ba2.ddsHeader(self.tex(98, 64, 32, 7))
+        self.assertEqual(148, len(header))
+        self.assertEqual((32, 64, 64 * 32, 7), struct.unpack_from('<3I4xI', header, 12))
+        self.assertEqual(b'DX10', header[84:88])
+        self.assertEqual((98, 3, 0, 1, 0), struct.unpack_from('<5I', header, 128))
+
+    def test_ddsHeaderRgba(self):
+        header = Binary_Ba2.ddsHeader(self.tex(87, 16, 16, 1))
+        self.assertEqual((32, 0x41, 0, 32, 0x00FF0000, 0x0000FF00, 0x000000FF, 0xFF000000), struct.unpack_from('<8I', header, 76))
+        self.assertEqual(16 * 16 * 4, struct.unpack_from('<I', header, 20)[0])
+
+    def test_ddsHeaderMips(self):
+        # a partial read from mip 3 halves the dimensions three times, but never below one texel
+        header = Binary_Ba2.ddsHeader(self.tex(71, 256, 8, 9), 3, 2)
+        self.assertEqual((1, 32, 32 * 1 // 2, 0, 2), struct.unpack_from('<5I', header, 12))
+
+    def test_ddsHeaderUnsupported(self): self.assertRaises(Exception, Binary_Ba2.ddsHeader, self.tex(2, 16, 16, 1))
+
+    def test_gnfHeader(self):
+        # 'GNF ', content size 248, version 2, one texture, alignment 8, then the big-endian stream size and the gnm texture header
+        gnmf = Binary_Ba2.GNMF5((0, 0, 0, 0, 1, 0, bytes(range(32)), 0, 0, 0, 0, 0))
+        expected = b'GNF ' + bytes.fromhex('f8000000' '02010800') + (1000 + 256).to_bytes(4, 'big') + bytes(range(32)) + bytes(208)
+        self.assertEqual(expected, Binary_Ba2.gnfHeader(gnmf, 1000))
+        self.assertEqual(256, len(expected))
+
+    # a 16x16 BC1 texture of 5 mips, mips 0-2 in a zlib chunk and mips 3-4 in a raw chunk
+    def texture(self) -> tuple[FileSource, bytes, bytes]:
+        mips = [bytes([i]) * max(8, (16 >> i) * (16 >> i) // 2) for i in range(5)]
+        chunk0 = b''.join(mips[:3]); chunk1 = b''.join(mips[3:])
+        packed = zlib.compress(chunk0)
+        chunks = [Binary_Ba2.TEXC5((0, len(packed), len(chunk0), 0, 2, 0)), Binary_Ba2.TEXC5((len(packed), 0, len(chunk1), 3, 4, 0))]
+        return FileSource(tag = (self.tex(71, 16, 16, 5, 2), chunks)), packed + chunk1, chunk0 + chunk1
+
+    def test_readTexture(self):
+        file, data, pixels = self.texture()
+        tex = file.tag[0]
+        for parallel in (False, True):
+            self.assertEqual(Binary_Ba2.ddsHeader(tex) + pixels, Binary_Ba2().readTexture(BinaryReader(BytesIO(data)), file, parallel = parallel))
+
+    def test_readTextureSmallestMip(self):
+        file, data, pixels = self.texture()
+        tex = file.tag[0]
+        res = Binary_Ba2().readData(None, BinaryReader(BytesIO(data)), file, Binary_Ba2.TextureOption((-1, -1)))
+        # only the raw chunk holding mips 3-4 is read, and the header starts at mip 3
+        self.assertEqual(Binary_Ba2.ddsHeader(tex, 3, 2) + pixels[-16:], res.getvalue())
+        self.assertEqual((2, 2, 2), struct.unpack_from('<2I8xI', res.getvalue(), 12))
+
+    def test_readTextureMips(self):
+        file, data, pixels = self.texture()
+        tex = file.tag[0]
+        # mip 1 lies in the first chunk, which holds mips 0-2
+        res = Binary_Ba2().readTexture(BinaryReader(BytesIO(data)), file, (1, 1))
+        self.assertEqual(Binary_Ba2.ddsHeader(tex, 0, 3) + pixels[:-16], res)
+
+# synthetic TES4 plugins
+def zstring(s: str) -> bytes: return s.encode('latin-1') + b'\x00'
+def field(type: bytes, data: bytes) -> bytes: return type + struct.pack('<H', len(data)) + data
+def record(type: bytes, id: int, *fields: bytes) -> bytes: data = b''.join(fields); return type + struct.pack('<4I', len(data), 0, id, 0) + data
+def group(label: bytes | int, type: int, *items: bytes) -> bytes:
+    data = b''.join(items)
+    return b'GRUP' + struct.pack('<I', len(data) + 20) + (label if isinstance(label, bytes) else struct.pack('<I', label)) + struct.pack('<iI', type, 0) + data
+def glob(id: int, name: str, value: float) -> bytes: return record(b'GLOB', id, field(b'EDID', zstring(name)), field(b'FNAM', b'f'), field(b'FLTV', struct.pack('<f', value)))
+def cell(id: int, name: str = None, grid: tuple[int, int] = None) -> bytes: return record(b'CELL', id, field(b'EDID', zstring(name or f'cell{id:x}')), field(b'DATA', b'\x01' if grid == None else b'\x00'), *([field(b'XCLC', struct.pack('<2i', *grid))] if grid != None else []))
+def land(id: int) -> bytes: return record(b'LAND', id)
+def exterior(id: int, grid: tuple[int, int], landId: int = None) -> bytes: return cell(id, grid = grid) + (group(id, 6, group(id, 9, land(landId))) if landId else b'')
+def world(id: int, *cells: bytes) -> bytes: return group(b'WRLD', 0, record(b'WRLD', id, field(b'EDID', zstring(f'world{id:x}'))), group(id, 1, group(0, 4, group(0, 5, *cells))))
+def plugin(masters: list[str], *groups: bytes) -> bytes:
+    return record(b'TES4', 0, field(b'HEDR', struct.pack('<fiI', 1., 0, 0)), *[field(b'MAST', zstring(s)) + field(b'DATA', bytes(8)) for s in masters]) + b''.join(groups)
+def master() -> bytes:
+    return plugin([],
+        group(b'GLOB', 0, glob(0x10, 'gold', 1.), glob(0x11, 'silver', 2.)),
+        group(b'GMST', 0, record(b'GMST', 0x20, field(b'EDID', zstring('iLevel')), field(b'DATA', struct.pack('<i', 5)))),
+        group(b'CELL', 0, group(0, 2, group(0, 3, cell(0x30, 'Vault')))),
+        world(0x3C, exterior(0x100, (1, 2), 0x101), exterior(0x102, (-1, 0), 0x103)))
+
+# LocalFileSystem - a directory of plugins
+class LocalFileSystem(DirectoryFileSystem):
+    def __init__(self, root: str): self.root = root
+    def fileExists(self, path: str) -> bool: return os.path.exists(os.path.join(self.root, path))
+    def fileInfo(self, path: str) -> tuple[str, int]: path = os.path.join(self.root, path); return (path, os.path.getsize(path)) if os.path.exists(path) else (None, 0)
+    def open(self, path: str, mode: str = None) -> object: return open(os.path.join(self.root, path), 'rb')
+
+# PluginCase - plugins written to a temporary directory and opened as archives
+class PluginCase(TestCase):
+    def setUp(self): self.dir = tempfile.TemporaryDirectory(); self.vfx = LocalFileSystem(self.dir.name); self.arcs = []
+    def tearDown(self):
+        for s in self.arcs: s.close()
+        self.dir.cleanup()
+    def archive(self, name: str, data: bytes, game: str = 'Oblivion', **options) -> BethesdaArchive:
+        # None opens the file already written
+        if data != None:
+            with open(os.path.join(self.dir.name, name), 'wb') as f: f.write(data)
+        arc = BethesdaArchive(None, BinaryState(self.vfx, SimpleNamespace(id = game, family = None), None, name))
+        arc.useIndexCache = False
+        for k, v in options.items(): setattr(arc, k, v)
+        self.arcs.append(arc)
+        return arc
+
+# TestEsm
+class TestEsm(PluginCase):
+    def setUp(self):
+        super().setUp()
+        self.factorySet = RecordGroup._factorySet; RecordGroup._factorySet = { FormType.GLOB, FormType.GMST }
+    def tearDown(self): RecordGroup._factorySet = self.factorySet; super().tearDown()
+
+    def read(self, parallel: int) -> tuple[list, list]:
+        arc = self.archive('a.esm', master(), parallel = parallel).open()
+        groups = [(k, [(s.id, s.EDID) for s in v.records]) for k, v in arc.arcBinary.groups.items()]
+        files = [(s.path, s.flags, [z.id for z in s.tag] if isinstance(s.tag, list) else s.tag.positions if isinstance(s.tag, CellIndex.Node) else None) for s in arc.files]
+        arc.close()
+        return groups, files
+
+    def test_parallel(self):
+        # a pool of two reads the GLOB and GMST groups in their own processes
+        groups, files = self.read(0)
+        self.assertEqual([FormType.GLOB, FormType.GMST, FormType.CELL, FormType.WRLD], [k for k, _ in groups])
+        self.assertEqual([(0x10, 'gold'), (0x11, 'silver')], groups[0][1])
+        self.assertEqual(['TES4', 'GLOB/GLOB', 'GMST/GMST', 'WRLD/WRLD', 'CELL/CELL', 'CELL/LAND'], [s[0] for s in files])
+        self.assertEqual((groups, files), self.read(2))
+
+# TestRecordIndex
+class TestRecordIndex(PluginCase):
+    def setUp(self):
+        super().setUp()
+        self.root = IndexCache.root; IndexCache.root = os.path.join(self.dir.name, 'index')
+    def tearDown(self): IndexCache.root = self.root; super().tearDown()
+
+    # opens the index, failing when it is built from the plugin instead of loaded from the sidecar
+    def open(self, arc: BethesdaArchive, format: FormType = FormType.TES4, build: bool = True) -> RecordIndex:
+        if not build: arc.readerT = lambda func: self.fail('index rebuilt')
+        try: return RecordIndex.open(arc, format, False)
+        finally: arc.__dict__.pop('readerT', None)
+
+    def test_sidecar(self):
+        data = master()
+        arc = self.archive('a.esm', data, useIndexCache = True)
+        index = self.open(arc)
+        path = os.path.join(self.dir.name, 'a.esm')
+        key = index.key(); stat = os.stat(path)
+        self.assertTrue(os.path.exists(key[0]))
+        self.assertEqual((os.path.abspath(path), len(data), stat.st_mtime_ns), key[1][-3:])
+        # group label, offset, data size and compression of each FormID, cells keyed under their top group
+        self.assertEqual((FormType.GLOB, data.index(glob(0x10, 'gold', 1.)), 28, 0), index.byId[0x10])
+        self.assertEqual(FormType.WRLD, index.byId[0x100][0])
+        self.assertEqual(FormType.WRLD, index.byId[0x101][0])
+        self.assertEqual(0x11, index.byEditorId['silver'])
+        # a second open loads the sidecar
+        cached = self.open(arc, build = False)
+        self.assertEqual((index.byId, index.byEditorId), (cached.byId, cached.byEditorId))
+        self.assertEqual(2., cached.getByEditorId('silver').FLTV)
+        self.assertEqual('iLevel', cached.get(0x20).EDID)
+        self.assertEqual('cell100', cached.get(0x100).EDID)
+        self.assertIsNone(cached.get(0x99)); self.assertIsNone(cached.getByEditorId('copper'))
+
+    def test_stamp(self):
+        arc = self.archive('a.esm', master(), useIndexCache = True)
+        self.open(arc)
+        # a new mtime misses the sidecar
+        path = os.path.join(self.dir.name, 'a.esm'); stat = os.stat(path)
+        os.utime(path, ns = (stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        self.assertRaises(AssertionError, self.open, arc, build = False)
+        self.open(arc); self.open(arc, build = False)
+        # so does a new size
+        arc.close()
+        arc = self.archive('a.esm', plugin([], group(b'GLOB', 0, glob(0x12, 'copper', 3.))), useIndexCache = True)
+        index = self.open(arc)
+        self.assertEqual([0, 0x12], list(index.byId))
+        self.assertEqual(3., index.getByEditorId('copper').FLTV)
+
+    def test_cacheOff(self):
+        arc = self.archive('a.esm', master(), useIndexCache = False)
+        index = self.open(arc)
+        self.assertIsNone(index.key())
+        self.assertFalse(os.path.exists(IndexCache.root))
+        self.assertEqual(1., index.getByEditorId('gold').FLTV)
+
+    def test_tes3(self):
+        # TES3 records have no FormID, their offset stands in for it
+        def field(type: bytes, data: bytes) -> bytes: return type + struct.pack('<I', len(data)) + data
+        def record(type: bytes, *fields: bytes) -> bytes: data = b''.join(fields); return type + struct.pack('<3I', len(data), 0, 0) + data
+        header = record(b'TES3')
+        gold = record(b'GLOB', field(b'NAME', zstring('gold')), field(b'FNAM', b'f'), field(b'FLTV', struct.pack('<f', 1.)))
+        silver = record(b'GLOB', field(b'NAME', zstring('silver')), field(b'FNAM', b'f'), field(b'FLTV', struct.pack('<f', 2.)))
+        arc = self.archive('a.esm', header + gold + silver, game = 'Morrowind', useIndexCache = True)
+        index = self.open(arc, FormType.TES3)
+        self.assertEqual([0, len(header), len(header) + len(gold)], list(index.byId))
+        self.assertEqual((FormType.GLOB, len(header), len(gold) - 16, 0), index.byId[len(header)])
+        self.assertEqual(len(header) + len(gold), index.byEditorId['silver'])
+        cached = self.open(arc, FormType.TES3, build = False)
+        self.assertEqual(index.byId, cached.byId)
+        self.assertEqual(2., cached.getByEditorId('silver').FLTV)
+
+# TestLoadOrder
+class TestLoadOrder(PluginCase):
+    # a.esm and c.esm, then b.esp over both, listing its masters in another order than the load order
+    def loadOrder(self) -> LoadOrder:
+        a = self.archive('a.esm', master())
+        c = self.archive('c.esm', plugin([], group(b'GLOB', 0, glob(0x10, 'lead', 5.))))
+        b = self.archive('b.esp', plugin(['c.esm', 'a.esm'],
+            group(b'GLOB', 0, glob(0x01000011, 'silver', 4.), glob(0x10, 'tin', 6.), glob(0x02000050, 'platinum', 7.)),
+            group(b'CELL', 0, group(0, 2, group(0, 3, cell(0x01000030, 'Vault')))),
+            world(0x0100003C, exterior(0x01000100, (1, 2), 0x02000060))))
+        return LoadOrder([a, c, b])
+
+    def test_globalId(self):
+        lo = self.loadOrder()
+        a, c, b = lo.plugins
+        self.assertEqual([0], a.remap); self.assertEqual([1], c.remap); self.assertEqual([1, 0, 2], b.remap)
+        self.assertEqual(0x10, a.globalId(0x10))
+        self.assertEqual(0x01000010, c.globalId(0x10))
+        self.assertEqual(0x01000010, b.globalId(0x10))
+        self.assertEqual(0x11, b.globalId(0x01000011))
+        self.assertEqual(0x02000050, b.globalId(0x02000050))
+
+    def test_records(self):
+        lo = self.loadOrder()
+        # the last plugin wins an overridden FormID, under its load order FormID
+        self.assertEqual((2, 0x01000011), lo.byId[0x11])
+        self.assertEqual(4., lo.findRecord(0x11).FLTV)
+        self.assertEqual('tin', lo.findRecord(0x01000010).EDID)
+        self.assertEqual('platinum', lo.findRecord(0x02000050).EDID)
+        self.assertEqual(1., lo.findRecord(0x10).FLTV)
+        self.assertEqual('iLevel', lo.findRecord(0x20).EDID)
+        self.assertEqual(4., lo.findRecordByEditorId('silver').FLTV)
+        self.assertEqual(4., lo.MANYsById.get('silver').FLTV)
+        self.assertIsNone(lo.findRecord(0x03000010))
+
+    def test_cells(self):
+        lo = self.loadOrder()
+        self.assertEqual([0x3C], list(lo.WRLDsById))
+        self.assertEqual(0x0100003C, lo.WRLDsById[0x3C].id)
+        # the overriding cell and its land win, the other cell stays with the master
+        self.assertEqual(2, lo.cellsById[Int3(1, 2, 0x3C)][0])
+        self.assertEqual(0x01000100, lo.cells.findCell(Int3(1, 2, 0x3C)).id)
+        self.assertEqual(0x02000060, lo.cells.findLand(Int3(1, 2, 0x3C)).id)
+        self.assertEqual(0x102, lo.cells.findCell(Int3(-1, 0, 0x3C)).id)
+        self.assertEqual(0x103, lo.cells.findLand(Int3(-1, 0, 0x3C)).id)
+        self.assertEqual(0x01000030, lo.cells.findCellByName('Vault').id)
+        self.assertIsNone(lo.cells.findCell(Int3(0, 0, 0x3C)))
+
+    def test_missingMaster(self):
+        b = self.archive('b.esp', plugin(['a.esm'], group(b'GLOB', 0, glob(0x01000011, 'silver', 4.))))
+        self.assertRaises(Exception, LoadOrder, [b])
+
+# TestCellIndex
+class TestCellIndex(PluginCase):
+    def setUp(self): super().setUp(); self.cacheSize = CellIndex.cacheSize
+    def tearDown(self): CellIndex.cacheSize = self.cacheSize; super().tearDown()
+
+    # two worlds sharing a grid, and a land-less exterior cell before one with a land
+    def cells(self) -> tuple[CellIndex, bytes]:
+        data = plugin([],
+            group(b'CELL', 0, group(0, 2, group(0, 3, cell(0x30, 'Vault'), cell(0x31, 'Cave')))),
+            world(0x3C, exterior(0x100, (1, 2)), exterior(0x102, (-1, 0), 0x103)) + world(0x3D, exterior(0x200, (1, 2), 0x201)))
+        arc = self.archive('a.esm', data).open()
+        return arc.arcBinary.cells, data
+
+    def test_grid(self):
+        cells, data = self.cells()
+        self.assertEqual({ Int3(1, 2, 0x3C): data.index(cell(0x100, grid = (1, 2))), Int3(-1, 0, 0x3C): data.index(cell(0x102, grid = (-1, 0))), Int3(1, 2, 0x3D): data.index(cell(0x200, grid = (1, 2))) }, cells.cells)
+        self.assertEqual([0x3C, 0x3D], list(cells.worlds))
+        self.assertEqual(0x100, cells.findCell(Int3(1, 2, 0x3C)).id)
+        self.assertEqual(0x200, cells.findCell(Int3(1, 2, 0x3D)).id)
+        self.assertIsNone(cells.findCell(Int3(1, 2, 0)))
+
+    def test_land(self):
+        # each land goes to the cell whose children hold it
+        cells, data = self.cells()
+        self.assertEqual({ Int3(-1, 0, 0x3C): data.index(land(0x103)), Int3(1, 2, 0x3D): data.index(land(0x201)) }, cells.lands)
+        self.assertIsNone(cells.findLand(Int3(1, 2, 0x3C)))
+        self.assertEqual(0x103, cells.findLand(Int3(-1, 0, 0x3C)).id)
+
+    def test_interior(self):
+        cells, data = self.cells()
+        self.assertEqual(['Vault', 'Cave'], list(cells.cellsByName))
+        self.assertEqual(0x31, cells.findCellByName('Cave').id)
+        self.assertIsNone(cells.findCellByName('cell100'))
+        self.assertEqual(sorted([*cells.cells.values(), *cells.cellsByName.values()]), cells.node(FormType.CELL).positions)
+
+    def test_evict(self):
+        CellIndex.cacheSize = 2
+        cells, _ = self.cells()
+        a = cells.findCell(Int3(1, 2, 0x3C)); cells.findCellByName('Vault')
+        self.assertIs(a, cells.findCell(Int3(1, 2, 0x3C)))
+        self.assertEqual((2, 1), (cells.loads, cells.hits))
+        # a third record evicts the least recently used one
+        cells.findCellByName('Cave')
+        self.assertEqual(2, len(cells.cache))
+        self.assertIs(a, cells.findCell(Int3(1, 2, 0x3C)))
+        cells.findCellByName('Vault')
+        self.assertEqual((4, 2), (cells.loads, cells.hits))
+
+# TestPathFinders
+class TestPathFinders(PluginCase):
+    def test_findTexture(self):
+        arc = self.archive('a.bsa', b'')
+        arc.files = [FileSource(path = 'Textures\\Armor\\Iron.DDS'), FileSource(path = 'textures/Sky.tga'), FileSource(path = 'Meshes\\Armor\\Iron.nif')]
+        arc.filesByPath = PathIndex(s.path for s in arc.files)
+        # the stored path of the entry, not the normalized key
+        self.assertEqual('Textures\\Armor\\Iron.DDS', arc.findTexture('TEXTURES\\ARMOR\\IRON.TGA'))
+        self.assertEqual('Textures\\Armor\\Iron.DDS', arc.findTexture('textures/armor/iron.dds'))
+        self.assertEqual('textures/Sky.tga', arc.findTexture('Data\\sky.dds'))
+        self.assertIsNone(arc.findTexture('textures/armor/steel.dds'))
+        self.assertEqual(7, arc.findTexture(7))
+
+# TestBsa - synthetic TES4 archives
+class TestBsa(PluginCase):
+    files = { 'textures/armor/a.dds': b'a' * 300, 'textures/armor/b.dds': bytes(range(256)) * 3, 'textures/c.tga': b'c' * 40, 'meshes/d.nif': b'nif' * 90 }
+    def setUp(self):
+        super().setUp()
+        self.root = IndexCache.root; IndexCache.root = os.path.join(self.dir.name, 'index')
+    def tearDown(self): IndexCache.root = self.root; super().tearDown()
+
+    # a version 0x67 archive of folder records, folder names and file records, the file names, then the data; compressed files hold their size and a zlib stream
+    @staticmethod
+    def bsa(files: dict[str, bytes], compress: bool = False) -> bytes:
+        folders = {}
+        for k, v in files.items(): folders.setdefault(os.path.dirname(k), []).append((os.path.basename(k), struct.pack('<I', len(v)) + zlib.compress(v) if compress else v))
+        names = b''.join(zstring(s) for z in folders.values() for s, _ in z)
+        offset = 36 + 16 * len(folders) + sum(len(k) + 2 + 16 * len(z) for k, z in folders.items()) + len(names)
+        records = b''; data = b''
+        for i, (k, z) in enumerate(folders.items()):
+            records += bytes([len(k) + 1]) + zstring(k.replace('/', '\\'))
+            for s, v in z: records += struct.pack('<Q2I', i, len(v), offset + len(data)); data += v
+        header = struct.pack('<I8I', Binary_Bsa.OB_MAGIC, Binary_Bsa.OB_VERSION, 36, 3 | (4 if compress else 0), len(folders), len(files), sum(len(k) + 1 for k in folders), len(names), 0)
+        return header + b''.join(struct.pack('<Q2I', i, len(z), 0) for i, z in enumerate(folders.values())) + records + names + data
+
+    # the entries and state of an opened archive, and the data of each entry
+    @staticmethod
+    def table(arc: BethesdaArchive) -> tuple[list, tuple, list]:
+        files = [tuple(getattr(s, k) for k in IndexCache.FILE_FIELDS) for s in arc.files]
+        return files, tuple(getattr(arc, k) for k in IndexCache.STATE_FIELDS), [asyncio.run(arc.getData(s)).read() for s in arc.files]
+
+    def test_indexCache(self):
+        for compress in (False, True):
+            name = f'{compress}.bsa'
+            fresh = self.archive(name, self.bsa(self.files, compress)).open()
+            expected = self.table(fresh)
+            self.assertEqual(list(self.files.values()), expected[2])
+            self.assertEqual([compress] * 4, [s[5] == 1 for s in expected[0]])
+            # a cold open stores the index, a warm one loads it without reading the archive
+            cold = self.archive(name, None, useIndexCache = True).open()
+            self.assertTrue(os.path.exists(IndexCache.key(cold)[0]))
+            self.assertEqual(expected, self.table(cold))
+            warm = self.archive(name, None, useIndexCache = True)
+            warm.read = lambda tag = None: self.fail('index rebuilt')
+            self.assertEqual(expected, self.table(warm.open()))
+
+    def test_getDataMany(self):
+        for compress in (False, True):
+            arc = self.archive(f'{compress}.bsa', self.bsa(self.files, compress)).open()
+            files = list(arc.files)
+            async def many(**options) -> list: return [(s.path, z.read()) async for s, z in arc.getDataMany(files[::-1], **options)]
+            # entries come back in offset order however they were asked for, and however the reads are batched
+            expected = [(s.path, asyncio.run(arc.getData(s)).read()) for s in files]
+            for options in ({}, { 'gap': 0 }, { 'maxRead': 1 }): self.assertEqual(expected, asyncio.run(many(**options)))
+            self.assertEqual(list(self.files.items()), expected)
+
+    def test_planRanges(self):
+        arc = self.archive('a.bsa', self.bsa(self.files)).open()
+        a, b, c, d = arc.files
+        def plan(files: list, **options) -> list: groups, rest = arc.planRanges(files, **options); self.assertEqual([], rest); return [(start, end, [s[3].path for s in z]) for _, start, end, z in groups]
+        # adjacent entries make one read, in offset order
+        self.assertEqual([(a.offset, d.offset + d.fileSize, [a.path, b.path, c.path, d.path])], plan([d, b, a, c]))
+        # an entry not asked for is read through while the gap is within the limit
+        self.assertEqual([(a.offset, c.offset + c.fileSize, [a.path, c.path])], plan([c, a], gap = b.fileSize))
+        self.assertEqual([(a.offset, b.offset, [a.path]), (c.offset, d.offset, [c.path])], plan([c, a], gap = b.fileSize - 1))
+        # reads are split at maxRead, but never below one entry
+        self.assertEqual([[a.path], [b.path], [c.path, d.path]], [s[2] for s in plan([a, b, c, d], maxRead = c.fileSize + d.fileSize)])
+        self.assertEqual([[a.path], [b.path], [c.path], [d.path]], [s[2] for s in plan([a, b, c, d], maxRead = 1)])
+
+    def test_export(self):
+        arc = self.archive('a.bsa', self.bsa(self.files, True)).open()
+        # the decode pool gets a slotted snapshot of the archive state
+        state = pickle.loads(pickle.dumps(DecodeState(arc)))
+        self.assertEqual([getattr(arc, k) for k in IndexCache.STATE_FIELDS], [getattr(state, k) for k in IndexCache.STATE_FIELDS])
+        self.assertRaises(AttributeError, setattr, state, 'files', None)
+        # a pipelined export of two jobs, decoding in processes, writes the same files as a single job
+        for jobs in (1, 2): asyncio.run(ExportManager.exportPak2Async(arc, os.path.join(self.dir.name, str(jobs)), None, 0, None, None, lambda file, msg: self.fail(msg), jobs))
+        exported = [{ s.relative_to(root).as_posix(): s.read_bytes() for s in root.rglob('*') if s.is_file() } for root in (pathlib.Path(self.dir.name, '1'), pathlib.Path(self.dir.name, '2'))]
+        self.assertEqual(self.files, exported[0])
+        self.assertEqual(exported[0], exported[1])
+
+if __name__ == "__main__":
+    from gamex import getFamily
+
+    # get family
+    family = getFamily('Bethesda')
+    print(f'studio: {family.studio}')
+
+    file = ('game:/Morrowind.esm#Morrowind', 'sample:0')
+    # file = ('game:/Oblivion - Meshes.bsa#Oblivion', 'GRAPH/particles/DEFAULT.jpg')
+    # file = ('game:/Fallout - Meshes.bsa#Fallout3', 'strings/english_m.lang')
+    # file = ('game:/Fallout4 - Meshes.ba2#Fallout4', 'Meshes/Marker_Error.NIF')
+
+    # get arc with game:/uri
+    archive = family.getArchive(file[0])
+    sample = archive.game.getSample(file[1][7:]).path if file[1].startswith('sample') else file[1]
+    print(f'arc: {archive}, {sample}')
+
+    # get file
+    data = archive.getData(sample)
+    print(f'dat: {data}')
+
+    main(verbosity=1)
@@ -0,0 +1,341 @@
+import os, re, asyncio, fnmatch, tempfile, zlib
+from io import BytesIO
+from unittest import TestCase, main
+import numpy as np
+from gamex import FileOption, FileSource
+from gamex.core.meta import FileTable, PathIndex, PathMatcher
+from gamex.core.app.exportManager import ExportJournal, ExportManager
+from types import SimpleNamespace
+from gamex.core.binary import BinaryArchive, BinaryState, ViewStream
+from gamex.core.cache import AssetCache
+import threading, time
+from concurrent.futures import ThreadPoolExecutor
+from gamex.core.pool import FileHandles, ReaderPool
+
+# TestPathIndex
+class TestPathIndex(TestCase):
+    paths = ['Meshes\\Armor\\Iron.nif', 'meshes/armor/steel.NIF', 'meshes/clutter/cup.nif', 'textures/armor/iron.dds', 'readme.txt', None, 'MESHES/ARMOR/IRON.NIF', 'meshes/armor/old/bronze.nif']
+
+    def test_find(self):
+        index = PathIndex(self.paths)
+        self.assertEqual([0, 6], index['meshes/armor/iron.nif'])
+        self.assertEqual([0, 6], index.find('MESHES\\Armor\\iron.NIF'))
+        self.assertIsNone(index.find('meshes/armor/gold.nif'))
+        self.assertEqual(6, len(index))
+        self.assertEqual('Textures\\Armor\\Iron.dds', index.first('textures/iron.dds', 'Textures\\Armor\\Iron.dds'))
+        self.assertEqual(['meshes/armor/iron.nif', 'meshes/armor/steel.nif', 'meshes/clutter/cup.nif', 'meshes/armor/old/bronze.nif'], index.byExtension('.NIF'))
+
+    def test_trie(self):
+        index = PathIndex(self.paths); index._build()
+        self.assertEqual({ '': ['readme.txt'], 'meshes/armor': ['meshes/armor/iron.nif', 'meshes/armor/steel.nif'], 'meshes/clutter': ['meshes/clutter/cup.nif'], 'textures/armor': ['textures/armor/iron.dds'], 'meshes/armor/old': ['meshes/armor/old/bronze.nif'] }, index._files)
+        self.assertEqual({ '': ['meshes', 'textures'], 'meshes': ['meshes/armor', 'meshes/clutter'], 'textures': ['textures/armor'], 'meshes/armor': ['meshes/armor/old'] }, index._dirs)
+
+    def test_list(self):
+        index = PathIndex(self.paths)
+        self.assertEqual(['readme.txt'], index.list())
+        self.assertEqual(['meshes/armor/iron.nif', 'meshes/armor/steel.nif'], index.list('Meshes\\Armor\\'))
+        self.assertEqual([], index.list('meshes'))
+        self.assertEqual([], index.list('sounds', True))
+        self.assertEqual(sorted(s for s in index if s.startswith('meshes/')), sorted(index.list('meshes', True)))
+        self.assertEqual(sorted(index), sorted(index.list('', True)))
+
+    def test_glob(self):
+        index = PathIndex(self.paths)
+        self.assertEqual(['meshes/armor/iron.nif'], index.glob('Meshes\\Armor\\IRON.nif'))
+        self.assertEqual([], index.glob('meshes/armor/gold.nif'))
+        # matches a brute-force fnmatch over every path
+        for pattern in ('*.nif', 'meshes/*/iron.nif', 'meshes/armor/*', 'MESHES\\*\\*.NIF', 'meshes/arm?r/*.nif', 'meshes/[ac]*/*', '*/armor/*', 'textures/*', 'sounds/*', '*'):
+            self.assertEqual(sorted(s for s in index if fnmatch.fnmatchcase(s, pattern.replace('\\', '/').lower())), sorted(index.glob(pattern)), pattern)
+
+# TestPathMatcher
+class TestPathMatcher(TestCase):
+    paths = ['Meshes\\Armor\\Iron.nif', 'meshes/armor/steel.NIF', 'meshes/armor/old/bronze.nif', 'meshes/clutter/cup.nif', 'Textures\\Armor\\Iron.dds', 'textures/sky.tga',
+        'readme', 'readme.txt', 'sound/fx/a.wav.bak', 'data/v1.0/x.nif', 'MESHES/ARMOR/IRON.NIF']
+    # pattern and the fast path it takes
+    cases = [
+        ('meshes/armor/iron.nif', 'literal'), ('MESHES\\Armor\\Iron.NIF', 'literal'), ('meshes/armor/gold.nif', 'literal'), ('readme', 'literal'),
+        ('*.nif', 'ext'), ('*.NIF', 'ext'), ('*.tga', 'ext'), ('*.zip', 'ext'),
+        ('meshes/*', 'dir'), ('Meshes\\Armor\\*', 'dir'), ('sounds/*', 'dir'),
+        ('meshes/arm*', 'glob'), ('meshes/*/iron.*', 'glob'), ('*.wav.*', 'glob'), ('*/v1.0/*', 'glob'), ('read*', 'glob'), ('textures\\[as]*', 'glob'), ('*', 'glob'),
+        ('re:iron', 're'), ('re:\\.nif$', 're'), ('re:^textures/', 're'), ('re:old/|cup', 're')]
+
+    def table(self) -> FileTable:
+        table = FileTable()
+        for s in self.paths: table.append(s)
+        return table.freeze()
+
+    def test_select(self):
+        table = self.table()
+        index = PathIndex(table.paths())
+        keys = [s.replace('\\', '/').lower() for s in table.paths()]
+        for pattern, kind in self.cases:
+            matcher = PathMatcher(pattern)
+            if kind == 're': expected = [i for i, s in enumerate(keys) if re.search(pattern[3:], s, re.IGNORECASE)]
+            else: expected = [i for i, s in enumerate(keys) if fnmatch.fnmatchcase(s, pattern.replace('\\', '/').lower())]
+            self.assertEqual(expected, matcher.select(index), pattern)
+            self.assertEqual(expected, [i for i, s in enumerate(table.paths()) if matcher(s)], pattern)
+            self.assertEqual(kind, 'literal' if matcher.literal != None else 'ext' if matcher.ext != None else 'dir' if matcher.dir != None else 'glob' if matcher.glob != None else 're', pattern)
+
+# TestExportJournal
+class TestExportJournal(TestCase):
+    # Source - an archive of in-memory entries
+    class Source:
+        def __init__(self, data: dict[str, bytes]): self.binPath = 'a.bsa'; self.data = data; self.reads = []
+        async def getData(self, file: FileSource, option: object = None) -> BytesIO: self.reads.append(file.path); return BytesIO(self.data[file.path])
+
+    def setUp(self): self.dir = tempfile.TemporaryDirectory(); self.path = os.path.join(self.dir.name, '.export.journal'); self.syncEvery = ExportJournal.SyncEvery
+    def tearDown(self): ExportJournal.SyncEvery = self.syncEvery; self.dir.cleanup()
+
+    def write(self, name: str, data: bytes) -> str:
+        path = os.path.join(self.dir.name, name)
+        with open(path, 'wb') as f: f.write(data)
+        return path
+
+    def lines(self) -> list[str]:
+        with open(self.path, 'r', encoding = 'utf-8', newline = '\n') as f: return f.read().split('\n')
+
+    def test_record(self):
+        ExportJournal.SyncEvery = 3
+        source = TestExportJournal.Source({})
+        with ExportJournal(self.path) as journal:
+            for i in range(5):
+                journal.record(source, FileSource(path = f'f{i}'), self.write(f'f{i}', bytes([i]) * (i + 1)))
+                # appended records are flushed in batches of SyncEvery
+                self.assertEqual((i + 1) % 3, journal.pending)
+                self.assertEqual(3 if i >= 2 else 0, len(self.lines()) - 1)
+            journal.record(source, FileSource(path = 'missing'), os.path.join(self.dir.name, 'missing'))
+        self.assertEqual([f'a.bsa\tf{i}\t{i + 1}\t{zlib.crc32(bytes([i]) * (i + 1))}' for i in range(5)] + [''], self.lines())
+        # a reopened journal skips what still verifies
+        with ExportJournal(self.path) as journal:
+            self.assertEqual(5, len(journal.done))
+            self.assertTrue(journal.skip(source, FileSource(path = 'f2'), os.path.join(self.dir.name, 'f2')))
+            self.assertFalse(journal.skip(source, FileSource(path = 'f2'), None))
+            self.assertFalse(journal.skip(source, FileSource(path = 'f9'), os.path.join(self.dir.name, 'f9')))
+            os.remove(os.path.join(self.dir.name, 'f3'))
+            self.assertFalse(journal.skip(source, FileSource(path = 'f3'), os.path.join(self.dir.name, 'f3')))
+
+    def test_verify(self):
+        source = TestExportJournal.Source({}); file = FileSource(path = 'f')
+        path = self.write('f', b'abcd')
+        with ExportJournal(self.path) as journal: journal.record(source, file, path)
+        # same size, other bytes
+        self.write('f', b'abce')
+        with ExportJournal(self.path) as journal: self.assertFalse(journal.skip(source, file, path))
+        with ExportJournal(self.path, verify = False) as journal: self.assertTrue(journal.skip(source, file, path))
+        self.write('f', b'abc')
+        with ExportJournal(self.path, verify = False) as journal: self.assertFalse(journal.skip(source, file, path))
+
+    def test_tornLine(self):
+        source = TestExportJournal.Source({})
+        path = self.write('f', b'abcd'); crc = zlib.crc32(b'abcd')
+        with open(self.path, 'w', encoding = 'utf-8', newline = '\n') as f: f.write(f'a.bsa\tf\t4\t{crc}\nbad line\na.bsa\tg\t4\t{crc}\na.bsa\th\t4')
+        with ExportJournal(self.path) as journal:
+            # complete lines are kept, a torn last line is dropped and terminated before the next record
+            self.assertEqual({ ('a.bsa', 'f'): (4, crc), ('a.bsa', 'g'): (4, crc) }, journal.done)
+            journal.record(source, FileSource(path = 'h'), path)
+        self.assertEqual(f'a.bsa\th\t4\na.bsa\th\t4\t{crc}', '\n'.join(self.lines()[3:5]))
+        with ExportJournal(self.path) as journal: self.assertEqual(3, len(journal.done))
+
+    def test_parts(self):
+        source = TestExportJournal.Source({ 'a.dds': b'head', 'a.1': b'part1', 'a.2': b'part2' })
+        file = FileSource(path = 'a.dds', parts = [FileSource(path = 'a.1'), FileSource(path = 'a.2')])
+        newPath = os.path.join(self.dir.name, 'a.dds')
+        with ExportJournal(self.path) as journal:
+            # raw exports the parts to their own files, journaling the entry last
+            asyncio.run(ExportManager._exportWithParts(file, source, self.dir.name, newPath, FileOption.Raw, FileOption.Raw, journal)); journal.sync()
+            self.assertEqual(['a.1', 'a.2', 'a.dds'], [s.split('\t')[1] for s in self.lines()[:-1]])
+            self.assertEqual(zlib.crc32(b'part2'), journal.done[('a.bsa', 'a.2')][1])
+            self.assertTrue(ExportManager._skip(journal, source, file, self.dir.name, newPath, FileOption.Raw))
+            # a changed part exports the entry again
+            self.write('a.2', b'PART2')
+            self.assertFalse(ExportManager._skip(journal, source, file, self.dir.name, newPath, FileOption.Raw))
+            self.assertTrue(ExportManager._skip(journal, source, file, self.dir.name, newPath, FileOption.Default))
+        # not raw, the parts are appended to the entry
+        newPath = os.path.join(self.dir.name, 'b.dds')
+        with ExportJournal(self.path) as journal:
+            asyncio.run(ExportManager._exportWithParts(file, source, self.dir.name, newPath, FileOption.Default, FileOption.Default, journal))
+            self.assertEqual((14, zlib.crc32(b'headpart1part2')), journal.done[('a.bsa', 'a.dds')])
+        with open(newPath, 'rb') as f: self.assertEqual(b'headpart1part2', f.read())
+
+# TestAssetCache
+class TestAssetCache(TestCase):
+    def test_inflight(self):
+        cache = AssetCache(1000); calls = []
+        async def factory():
+            calls.append(1); await asyncio.sleep(.01)
+            return b'x' * 10
+        async def run(): return await asyncio.gather(*[cache.getOrAdd((1, 'a'), factory) for _ in range(5)])
+        values = asyncio.run(run())
+        # one load for all concurrent callers, sharing its value
+        self.assertEqual(1, len(calls))
+        self.assertTrue(all(s is values[0] for s in values))
+        self.assertEqual((4, 1), (cache.hits, cache.misses))
+        self.assertIs(values[0], asyncio.run(cache.getOrAdd((1, 'a'), factory)))
+        self.assertEqual(({}, 1, 10), (cache.inflight, len(calls), cache.size))
+
+    def test_inflightError(self):
+        cache = AssetCache(1000); calls = []
+        async def factory():
+            calls.append(1); await asyncio.sleep(.01)
+            raise ValueError('bad')
+        async def run(): return await asyncio.gather(*[cache.getOrAdd((1, 'a'), factory) for _ in range(3)], return_exceptions = True)
+        # waiters re-raise the error, which is not cached
+        self.assertTrue(all(isinstance(s, ValueError) for s in asyncio.run(run())))
+        self.assertEqual((1, {}, 0), (len(calls), cache.inflight, len(cache.items)))
+
+    def test_evict(self):
+        cache = AssetCache(100)
+        for k in 'abc': cache.add((1, k), k.encode() * 40)
+        # over the budget, least recently used first
+        self.assertEqual([(1, 'b'), (1, 'c')], list(cache.items))
+        self.assertEqual((80, 1), (cache.size, cache.evictions))
+        asyncio.run(cache.getOrAdd((1, 'b'), None))
+        cache.add((1, 'd'), b'd' * 30)
+        self.assertEqual([(1, 'b'), (1, 'd')], list(cache.items))
+        # replaced values keep the size exact, oversized values and streams are not cached
+        cache.add((1, 'd'), b'd' * 10); cache.add((1, 'e'), b'e' * 101); cache.add((1, 'f'), BytesIO(b'f'))
+        self.assertEqual(([(1, 'b'), (1, 'd')], 50), (list(cache.items), cache.size))
+        # buffers are sized one level into a value
+        self.assertEqual(8000, AssetCache.sizeOf(np.zeros(1000)))
+        self.assertEqual(8000 + 40, AssetCache.sizeOf(SimpleNamespace(heights = np.zeros(1000), name = 'x' * 40)) - AssetCache.sizeOf(SimpleNamespace(heights = None, name = '')))
+
+    def test_token(self):
+        game = SimpleNamespace(id = 'test', family = None)
+        a = BinaryArchive(None, BinaryState(None, game, None, 'a.bsa'), None); b = BinaryArchive(None, BinaryState(None, game, None, 'a.bsa'), None)
+        # unlike id(), a token is never shared with a later archive
+        self.assertNotEqual(a.assetToken, b.assetToken)
+        cache = AssetCache(1000)
+        cache.add((a.assetToken, 'x'), b'a' * 10); cache.add((b.assetToken, 'x'), b'b' * 10)
+        cache.invalidate(a)
+        self.assertEqual(([(b.assetToken, 'x')], 10), (list(cache.items), cache.size))
+        del a
+        self.assertNotIn(BinaryArchive(None, BinaryState(None, game, None, 'a.bsa'), None).assetToken, (s[0] for s in cache.items))
+
+# TestPool
+class TestPool(TestCase):
+    def setUp(self): self.dir = tempfile.TemporaryDirectory()
+    def tearDown(self): self.dir.cleanup()
+    def file(self, name: str, data: bytes) -> str:
+        path = os.path.join(self.dir.name, name)
+        with open(path, 'wb') as f: f.write(data)
+        return path
+    @staticmethod
+    def read(handles: FileHandles, path: str, position: int, size: int) -> bytes:
+        b = bytearray(size); n = handles.pread(path, memoryview(b), position); return bytes(b[:n])
+
+    def test_maxOpen(self):
+        handles = FileHandles()
+        self.assertEqual(64, handles.maxOpen)
+        paths = [self.file(f'{i}.bin', bytes([i]) * 8) for i in range(70)]
+        try:
+            for i, s in enumerate(paths): self.assertEqual(bytes([i]) * 2, self.read(handles, s, 3, 2))
+            # the least recently used descriptors over the cap are closed
+            self.assertEqual({ 'open': 64, 'maxOpen': 64, 'opens': 70, 'closes': 6, 'hits': 0 }, handles.stats())
+            self.assertEqual(paths[6:], list(handles.handles))
+            # a hit moves the path to the end, a miss evicts the oldest
+            self.read(handles, paths[6], 0, 1); self.read(handles, paths[0], 0, 1)
+            self.assertEqual(paths[8:] + [paths[6], paths[0]], list(handles.handles))
+            # a descriptor in use is never closed, the cap is met again on release
+            z = handles._acquire(paths[8])
+            for s in paths[1:6]: self.read(handles, s, 0, 1)
+            self.assertIn(paths[8], handles.handles)
+            self.assertEqual(64, len(handles.handles))
+            handles._release(z)
+            self.assertEqual(64, len(handles.handles))
+        finally: handles.close()
+        self.assertEqual(0, len(handles.handles))
+
+    def test_reopen(self):
+        handles = FileHandles(4)
+        path = self.file('a.bin', b'0123456789')
+        pool = ReaderPool.local(path, 2, handles)
+        self.assertEqual(b'3456', pool.func(lambda r: (r.seek(3), r.readBytes(4))[1]))
+        self.assertEqual(b'01', pool.func(lambda r: r.readBytes(2)))
+        self.assertEqual({ 'idle': 1, 'retain': 2, 'created': 1, 'reused': 1, 'dropped': 0 }, pool.stats())
+        # disposing the pool closes its descriptor, so a rewritten file is reopened with its new size
+        pool.dispose()
+        self.assertEqual(0, len(handles.handles))
+        path = self.file('a.bin', b'abcdefghijklmnopqrst')
+        pool = ReaderPool.local(path, 2, handles)
+        self.assertEqual(b'pqrst', pool.func(lambda r: (r.seek(15), r.readBytes(10))[1]))
+        self.assertEqual(2, handles.stats()['opens'])
+        pool.dispose()
+
+    def test_concurrent(self):
+        data = bytes(range(256)) * 64
+        pool = ReaderPool.local(self.file('a.bin', data), 4, FileHandles(4))
+        lock = threading.Lock(); inUse = set(); shared = []
+        # each checkout has a reader to itself, positioned at the start
+        def _read(i: int) -> bytes:
+            def _lambdax(r) -> bytes:
+                with lock:
+                    if id(r) in inUse: shared.append(i)
+                    inUse.add(id(r))
+                try:
+                    if r.tell() != 0: shared.append(i)
+                    r.seek(i * 7); time.sleep(0.0005); return r.readBytes(100)
+                finally:
+                    with lock: inUse.discard(id(r))
+            return pool.func(_lambdax)
+        with ThreadPoolExecutor(8) as executor: results = list(executor.map(_read, range(200)))
+        self.assertEqual([], shared)
+        self.assertEqual([data[i * 7:i * 7 + 100] for i in range(200)], results)
+        stats = pool.stats()
+        # readers over the retained count are disposed on release
+        self.assertEqual(200, stats['created'] + stats['reused'])
+        self.assertEqual(min(4, stats['created']), stats['idle'])
+        self.assertEqual(stats['created'] - stats['idle'], stats['dropped'])
+        pool.dispose()
+
+# TestViewStream - a window over a container, positioned by absolute offsets
+class TestViewStream(TestCase):
+    def test_read(self):
+        data = bytes(range(32))
+        s = ViewStream(memoryview(data)[8:24], 8)
+        self.assertEqual((16, 8), (len(s), s.tell()))
+        self.assertEqual(data[8:12], s.read(4))
+        self.assertEqual(data[12:24], s.read())
+        self.assertEqual((b'', 24), (s.read(4), s.tell()))
+        b = bytearray(6); s.seek(20)
+        self.assertEqual((4, data[20:24]), (s.readinto(b), bytes(b[:4])))
+        self.assertEqual(data[8:24], s.getvalue())
+
+    def test_seek(self):
+        s = ViewStream(memoryview(bytes(range(32)))[8:24], 8)
+        # absolute offsets, relative to the position or to the end of the window
+        self.assertEqual(10, s.seek(10)); self.assertEqual(b'\x0a', s.read(1))
+        self.assertEqual(14, s.seek(3, os.SEEK_CUR)); self.assertEqual(b'\x0e', s.read(1))
+        self.assertEqual(22, s.seek(-2, os.SEEK_END)); self.assertEqual(b'\x16\x17', s.read())
+        self.assertRaises(ValueError, s.seek, 7)
+        self.assertRaises(ValueError, s.seek, 0, 3)
+        # a seek past the end reads nothing
+        self.assertEqual(40, s.seek(40)); self.assertEqual(b'', s.read())
+
+    def test_slice(self):
+        data = bytearray(range(64))
+        s = ViewStream(memoryview(data)[16:48], 16)
+        # the buffer is a slice of the container, not a copy, and a stream over a slice of it keeps the same base
+        self.assertIs(data, s.getbuffer().obj)
+        data[20] = 0xFF
+        s2 = ViewStream(s.getbuffer()[:], 16); s2.seek(20)
+        self.assertEqual(b'\xff\x15', s2.read(2))
+        s2.close(); s.close()
+
+    def test_close(self):
+        data = bytearray(range(16))
+        s = ViewStream(memoryview(data)[4:12], 4)
+        self.assertRaises(BufferError, data.extend, b'x')
+        # closing releases the view, so the container is no longer exported
+        s.close()
+        self.assertTrue(s.closed)
+        data.extend(b'x')
+        s.close()
+        # a view still exported, here to numpy, is left to the collector
+        s = ViewStream(memoryview(bytes(range(16)))[4:12], 4)
+        a = np.frombuffer(s.getbuffer(), np.uint8)
+        s.close()
+        self.assertTrue(s.closed)
+        self.assertEqual(list(range(4, 12)), a.tolist())
+
+if __name__ == "__main__":
+    main(verbosity=1)
@@ -0,0 +1,165 @@
+import json, struct
+from enum import Enum
+from io import BytesIO
+from unittest import TestCase, main
+import numpy as np
+from openstk.core import BinaryReader
+from gamex.core.desser import CustomEncoder
+from gamex.families.Gamebryo.formats.nif import NiReader, Z, Ref, SkinPartition, NiTriShapeData, NiTriStripsData, NiNode, NiSourceTexture, BSXFlags
+from types import SimpleNamespace
+from gamex.core.binary import ViewStream
+from gamex.families.Gamebryo.formats.binary import Binary_Nif
+
+# Reader - a NiReader over a single block at a version, without a header
+class Reader(NiReader):
+    def __init__(self, data: bytes, v: int, uv2: int = 0): BinaryReader.__init__(self, BytesIO(data)); self.v = v; self.uv2 = uv2
+
+# values exact in a half, so per-element and bulk reads agree bit for bit
+def values(count: int, seed: int) -> list[float]: return [((seed * 31 + i * 7) % 64 - 32) / 8 for i in range(count)]
+
+# TestReadArray - Z.readArray against the per-element reads it replaced
+class TestReadArray(TestCase):
+    def test_scalars(self):
+        for t, f in (('<f4', 'f'), ('<u2', 'H'), ('u1', 'B')):
+            items = [int(abs(s) * 8) for s in values(7, 1)] if f != 'f' else values(7, 1)
+            r = Reader(struct.pack(f'<{len(items)}{f}', *items) + b'\xff', 0x04000002)
+            s = Z.readArray(r, t, len(items))
+            self.assertEqual((7,), s.shape); self.assertEqual(items, s.tolist())
+            self.assertEqual(0xff, r.readByte())
+
+    def test_half(self):
+        # halfs widen to float32, like readHalf per element
+        items = values(12, 2) + [65504., 2. ** -14]
+        s = Z.readArray(Reader(struct.pack(f'<{len(items)}e', *items), 0x04000002), '<f2', len(items))
+        self.assertEqual(np.float32, s.dtype); self.assertEqual(items, s.tolist())
+
+    def test_nested(self):
+        # a fixed array of fixed arrays of vectors, as uvSets: [set][vertex] (u, v)
+        items = values(2 * 3 * 2, 3)
+        s = Z.readArray(Reader(struct.pack(f'<{len(items)}f', *items), 0x04000002), '<f4', 2, 3, 2)
+        self.assertEqual([[[items[(k * 3 + i) * 2 + j] for j in range(2)] for i in range(3)] for k in range(2)], s.tolist())
+
+    def test_empty(self): self.assertEqual((0, 3), Z.readArray(Reader(b'', 0x04000002), '<f4', 0, 3).shape)
+
+# TestGeometry - geometry blocks with each bulk type, against the values per element
+class TestGeometry(TestCase):
+    @staticmethod
+    def geometry(n: int, sets: int) -> tuple[bytes, dict]:
+        e = { 'vertices': values(n * 3, 1), 'normals': values(n * 3, 2), 'vertexColors': values(n * 4, 3), 'uvSets': values(sets * n * 2, 4) }
+        data = struct.pack('<HI', n, 1) + struct.pack(f'<{n * 3}f', *e['vertices']) + struct.pack('<I', 1) + struct.pack(f'<{n * 3}f', *e['normals']) + \
+            struct.pack('<4f', 1., 2., 3., 4.) + struct.pack('<I', 1) + struct.pack(f'<{n * 4}f', *e['vertexColors']) + struct.pack('<HI', sets, 1) + struct.pack(f'<{sets * n * 2}f', *e['uvSets'])
+        e = { 'vertices': np.reshape(e['vertices'], (n, 3)).tolist(), 'normals': np.reshape(e['normals'], (n, 3)).tolist(), 'vertexColors': np.reshape(e['vertexColors'], (n, 4)).tolist(), 'uvSets': np.reshape(e['uvSets'], (sets, n, 2)).tolist() }
+        return data, e
+
+    def assertGeometry(self, s: object, e: dict) -> None:
+        for k, v in e.items(): self.assertEqual(v, getattr(s, k).tolist(), k)
+
+    def test_triShapeData(self):
+        data, e = self.geometry(4, 2)
+        triangles = [[0, 1, 2], [2, 1, 3]]
+        data += struct.pack('<HI', 2, 6) + struct.pack('<6H', *sum(triangles, [])) + struct.pack('<H', 0)
+        r = Reader(data, 0x04000002); s = NiTriShapeData(r)
+        self.assertGeometry(s, e)
+        self.assertEqual(triangles, s.triangles.tolist())
+        self.assertEqual(len(data), r.tell())
+
+    def test_triStripsData(self):
+        # jagged strips read one array per strip
+        data, e = self.geometry(5, 1)
+        strips = [[0, 1, 2, 3], [4, 3, 2]]
+        data += struct.pack('<3H', 3, 2, 4) + struct.pack('<H', 3) + struct.pack('<7H', *sum(strips, []))
+        r = Reader(data, 0x04000002); s = NiTriStripsData(r)
+        self.assertGeometry(s, e)
+        self.assertEqual([4, 3], s.stripLengths.tolist())
+        self.assertEqual(strips, [z.tolist() for z in s.points])
+        self.assertEqual(len(data), r.tell())
+
+    def test_skinPartitionHalf(self):
+        # half vertex weights and strips, 20.2.0.7
+        weights = values(3 * 4, 5); strips = [[0, 1, 2], [2, 1, 0, 1]]
+        data = struct.pack('<4H', 3, 2, 2, 4) + struct.pack('<2H', 7, 9) + b'\x01' + struct.pack('<3H', 2, 1, 0) + b'\x0f' + struct.pack('<12e', *weights) + \
+            struct.pack('<2H', 3, 4) + b'\x01' + struct.pack('<7H', *sum(strips, [])) + b'\x00'
+        r = Reader(data, 0x14020007); s = SkinPartition(r)
+        self.assertEqual([7, 9], s.bones.tolist())
+        self.assertEqual([2, 1, 0], s.vertexMap.tolist())
+        self.assertEqual(np.float32, s.vertexWeights.dtype)
+        self.assertEqual(np.reshape(weights, (3, 4)).tolist(), s.vertexWeights.tolist())
+        self.assertEqual(strips, [z.tolist() for z in s.strips])
+        self.assertEqual(len(data), r.tell())
+
+    def test_skinPartitionTriangles(self):
+        # float vertex weights and triangles, 10.0.1.2
+        weights = values(6 * 2, 6); triangles = [[0, 1, 2], [3, 4, 5]]
+        data = struct.pack('<4H', 6, 1, 0, 2) + struct.pack('<H', 3) + struct.pack('<6H', *range(6)) + struct.pack('<12f', *weights) + struct.pack('<6H', *sum(triangles, [])) + b'\x00'
+        r = Reader(data, 0x0A000102); s = SkinPartition(r)
+        self.assertEqual(list(range(6)), s.vertexMap.tolist())
+        self.assertEqual(np.reshape(weights, (6, 2)).tolist(), s.vertexWeights.tolist())
+        self.assertEqual(triangles, s.triangles.tolist())
+        self.assertEqual(len(data), r.tell())
+
+# TestDesSer - bulk geometry serializes by row
+class TestDesSer(TestCase):
+    def test_bulk(self):
+        uvs = np.array([[.5, 1.], [0., .25], [1., 0.]], dtype = np.float32)
+        self.assertEqual('["0.5 1", "0 0.25", "1 0"]', json.dumps(uvs, cls = CustomEncoder))
+        self.assertEqual('["0 1 2", "2 1 3"]', json.dumps(np.array([[0, 1, 2], [2, 1, 3]], dtype = '<u2'), cls = CustomEncoder))
+        self.assertEqual('[4, 3, 2, 1, 0]', json.dumps(np.array([4, 3, 2, 1, 0], dtype = '<u2'), cls = CustomEncoder))
+        self.assertEqual('["1 0 0", "0 1 0", "0 0 1"]', json.dumps(np.eye(3), cls = CustomEncoder))
+
+# TestLazy - blocks skipped by their header sizes resolve as the eager parse, 20.2.0.7
+class TestLazy(TestCase):
+    @staticmethod
+    def nif() -> bytes:
+        def l32(s: bytes) -> bytes: return struct.pack('<I', len(s)) + s
+        net = struct.pack('<Ii', 0, -1) # no extra data, no controller
+        node = net + struct.pack('<H13f', 14, 1, 2, 3, 1, 0, 0, 0, 1, 0, 0, 0, 1, 2) + struct.pack('<Ii', 0, -1) + struct.pack('<I2iI', 2, 1, 2, 0)
+        flags = struct.pack('<I', 7)
+        texture = net + b'\x01' + l32(b'textures/a.dds') + struct.pack('<i3IB', -1, 6, 2, 3, 1) + b'\x01\x00'
+        blocks = [node, flags, texture]
+        return b'Gamebryo File Format, Version 20.2.0.7\n' + struct.pack('<IBII', 0x14020007, 1, 0, len(blocks)) + \
+            struct.pack('<H', 3) + l32(b'NiNode') + l32(b'BSXFlags') + l32(b'NiSourceTexture') + struct.pack('<3H', 0, 1, 2) + struct.pack('<3I', *map(len, blocks)) + \
+            struct.pack('<3I', 0, 0, 0) + b''.join(blocks) + struct.pack('<Ii', 1, 0)
+
+    # a block as plain values, refs by index
+    @staticmethod
+    def plain(s: object) -> object:
+        if s is None or isinstance(s, (int, float, str, Enum)): return s
+        if isinstance(s, Ref): return ('ref', s.v)
+        if isinstance(s, np.ndarray): return s.tolist()
+        if isinstance(s, list): return [TestLazy.plain(z) for z in s]
+        return (type(s).__name__, { k: TestLazy.plain(v) for k, v in vars(s).items() })
+
+    def test_resolve(self):
+        data = self.nif()
+        eager = NiReader(BinaryReader(BytesIO(data)))
+        self.assertEqual(len(data), eager.tell())
+        lazy = NiReader(BinaryReader(BytesIO(data)), lazy = True)
+        self.assertEqual(len(data), lazy.tell()); self.assertEqual({0, 1, 2}, lazy.blocks.pending)
+        # refs resolve through the skipped blocks, parsing only those reached
+        node = lazy.roots[0].value
+        self.assertEqual({1, 2}, lazy.blocks.pending)
+        self.assertEqual('textures/a.dds', node.children[1].value.fileName)
+        self.assertEqual({1}, lazy.blocks.pending)
+        self.assertEqual([self.plain(s) for s in eager.blocks], [self.plain(s) for s in lazy.blocks])
+        self.assertFalse(lazy.blocks.pending); self.assertEqual(len(data), lazy.tell())
+
+    def test_types(self):
+        # only the blocks of types are parsed upfront
+        r = NiReader(BinaryReader(BytesIO(self.nif())), (NiSourceTexture,), True)
+        self.assertEqual({0, 1}, r.blocks.pending)
+        self.assertEqual(['textures/a.dds'], [s.fileName for s in r.blocks.ofType(NiSourceTexture)])
+        self.assertEqual([7], [s.integerData for s in r.blocks.ofType(BSXFlags)])
+        self.assertEqual({0}, r.blocks.pending)
+        self.assertIsInstance(r.blocks[0], NiNode)
+
+    def test_source(self):
+        # a private BytesIO entry is read in place, a mapped view is copied before it is released
+        f = SimpleNamespace(path = 'meshes/a.nif'); data = self.nif()
+        b = BytesIO(data); s = Binary_Nif(BinaryReader(b), f, None, lazy = True)
+        self.assertIs(b, s.f); self.assertEqual(['textures/a.dds'], list(s.getTexturePaths()))
+        view = ViewStream(memoryview(bytearray(data)))
+        s = Binary_Nif(BinaryReader(view), f, None, lazy = True); view.close()
+        self.assertIsNot(view, s.f); self.assertEqual(['textures/a.dds'], list(s.getTexturePaths()))
+
+if __name__ == "__main__":
+    main(verbosity=1)
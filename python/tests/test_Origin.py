@@ -1,16 +1,202 @@
-from gamex import family
+import struct, random
+from io import BytesIO
+from unittest import TestCase, main
+import numpy as np
+from openstk.core import BinaryReader
+from gamex.families.Origin.formats.binary import Binary_UO
+from gamex.families.Origin.formats.UO.binary import Binary_Gump, Binary_Art, Binary_Land, Binary_Light
+from types import SimpleNamespace
+from gamex.core.meta import FileTable
 
-# get family
-family = family.getFamily('Origin')
-print(f'studio: {family.studio}')
+# TestUopHash
+class TestUopHash(TestCase):
+    def test_vectorized(self):
+        # names of 12n, 12n+1 and 12n-1 bytes, with and without an extension
+        for pattern, extension, length in [('artlegacymul', '.tga', 0x400), ('gumpartlegacymul', '.tga', 0x400), ('soundlegacymul', '.dat', 0x100), ('abcdefghi', '', 40), ('abcdefghij', '', 40), ('abcdefgh', '', 40), ('x', '.tga', 50), ('a' * 33, '', 40)]:
+            expected = {Binary_UO.createUopHash(f'build/{pattern}/{i:08}{extension}'.encode('ascii')): i for i in range(length)}
+            self.assertEqual(expected, Binary_UO.getUopHashes(pattern, extension, length), pattern)
 
-file = ('game:/#UO', 'sample:0')
+    def test_empty(self): self.assertEqual({}, Binary_UO.getUopHashes('empty', '.tga', 0))
 
-# get arc with game:/uri
-archive = family.getArchive(file[0])
-sample = archive.game.getSample(file[1][7:]).path if file[1].startswith('sample') else file[1]
-print(f'arc: {archive}, {sample}')
+# TestUoDecode - the bulk decoders against the per-pixel loops they replaced
+class TestUoDecode(TestCase):
+    @staticmethod
+    def gumpRef(data: bytes, width: int, height: int) -> bytearray:
+        lookup = np.frombuffer(data, dtype = np.int32); dat = np.frombuffer(data, dtype = np.uint16); lookup_ = 0; datLen = len(dat)
+        bd = bytearray(width * height << 1)
+        mv = memoryview(np.frombuffer(bd, dtype = np.uint16))
+        line = 0
+        for y in range(height):
+            count = lookup[lookup_] << 1; lookup_ += 1
+            cur = line; end = line + width
+            while cur < end:
+                if count < datLen: color = dat[count + 0]; next = cur + int(dat[count + 1]); count += 2
+                else: color = 0
+                if color == 0: cur = next
+                else:
+                    color ^= 0x8000
+                    while cur < next: mv[cur] = color; cur += 1
+            line += width
+        return bd
 
-# get file
-data = archive.getData(sample)
-print(f'dat: {data}')
\ No newline at end of file
+    @staticmethod
+    def artRef(data: bytes) -> bytearray:
+        bdata = np.frombuffer(data, dtype = np.uint16)
+        count = 2
+        width = bdata[count]; count += 1
+        height = bdata[count]; count += 1
+        start = height + 4
+        lookups = [start + bdata[count + i] for i in range(height)]; count += height
+        bd = bytearray(width * height << 1)
+        mv = memoryview(np.frombuffer(bd, dtype = np.uint16))
+        line = 0
+        for y in range(height):
+            count = lookups[y]
+            cur = line
+            xOffset = xRun = 0
+            while (xOffset := bdata[count+0]) + (xRun := bdata[count+1]) != 0:
+                count += 2
+                if xOffset > width: break
+                cur += xOffset
+                if xOffset + xRun > width: break
+                end = cur + xRun
+                while cur < end: mv[cur] = bdata[count] ^ 0x8000; cur += 1; count += 1
+            line += width
+        return bd
+
+    @staticmethod
+    def landRef(data: bytes) -> bytearray:
+        bdata = np.frombuffer(data, dtype = np.uint16); bdata_ = 0
+        bd = bytearray(44 * 44 << 1)
+        mv = memoryview(np.frombuffer(bd, dtype = np.uint16))
+        line = 0; xOffset = 21; xRun = 2
+        for y in range(22):
+            cur = line + xOffset; end = cur + xRun
+            while cur < end: mv[cur] = bdata[bdata_] ^ 0x8000; cur += 1; bdata_ += 1
+            xOffset -= 1; xRun += 2; line += 44
+        xOffset = 0; xRun = 44
+        for y in range(22):
+            cur = line + xOffset; end = cur + xRun
+            while cur < end: mv[cur] = bdata[bdata_] ^ 0x8000; cur += 1; bdata_ += 1
+            xOffset += 1; xRun -= 2; line += 44
+        return bd
+
+    @staticmethod
+    def lightRef(data: bytes, width: int, height: int) -> bytearray:
+        bdata = np.frombuffer(data, dtype = np.int8); bdata_ = 0
+        bd = bytearray(width * height << 1)
+        mv = memoryview(np.frombuffer(bd, dtype = np.uint16))
+        for cur in range(width * height): v = int(bdata[bdata_]); bdata_ += 1; mv[cur] = (((0x1f + v) << 10) + ((0x1F + v) << 5) + (0x1F + v)) & 0xFFFF
+        return bd
+
+    # (color, run) pairs behind an int32 row lookup, some runs spill into the next row
+    @staticmethod
+    def gump(rng: random.Random, width: int, height: int) -> bytes:
+        pairs = []; lookup = []
+        for y in range(height):
+            lookup.append(height + len(pairs)); x = 0
+            while x < width:
+                run = rng.randint(1, width - x) if rng.random() < 0.95 or y == height - 1 else rng.randint(1, width)
+                pairs.append((rng.choice([0, rng.getrandbits(16)]), run)); x += run
+        return struct.pack(f'<{height}i', *lookup) + b''.join(struct.pack('<2H', *s) for s in pairs)
+
+    # (offset, run) headers per row, with an occasional header past the row width
+    @staticmethod
+    def art(rng: random.Random, width: int, height: int) -> bytes:
+        rows = []
+        for y in range(height):
+            words = []; x = 0
+            while x < width and rng.random() < 0.8:
+                offset = rng.randint(0, width - x); run = rng.randint(0, width - x - offset)
+                if offset + run == 0: break
+                words += [offset, run] + [rng.getrandbits(16) for _ in range(run)]; x += offset + run
+            if rng.random() < 0.05: words += [rng.randint(width + 1, width + 9), rng.randint(1, 9)]
+            rows.append(words + [0, 0])
+        lookups = []; end = 0
+        for s in rows: lookups.append(end); end += len(s)
+        return struct.pack(f'<{4 + height + end}H', 0, 0, width, height, *lookups, *[v for s in rows for v in s])
+
+    def test_gump(self):
+        rng = random.Random(1)
+        for i in range(100):
+            width, height = rng.randint(1, 100), rng.randint(1, 100)
+            data = self.gump(rng, width, height)
+            self.assertEqual(self.gumpRef(data, width, height), Binary_Gump(BinaryReader(BytesIO(data)), len(data), width << 16 | height).pixels, (width, height))
+
+    def test_gumpSpill(self):
+        # row 0 runs 6 pixels into row 1, row 1 then overwrites only its first pixel
+        data = struct.pack('<2i', 2, 3) + struct.pack('<6H', 1, 6, 2, 1, 0, 3)
+        expected = np.array([0x8001] * 4 + [0x8002, 0x8001, 0, 0], np.uint16).tobytes()
+        self.assertEqual(expected, self.gumpRef(data, 4, 2))
+        self.assertEqual(expected, Binary_Gump(BinaryReader(BytesIO(data)), len(data), 4 << 16 | 2).pixels)
+
+    def test_artPastWidth(self):
+        # a run of two pixels, then a header past the row width ends the row
+        data = struct.pack('<11H', 0, 0, 4, 1, 0, 1, 2, 0x1234, 0x0567, 5, 1)
+        expected = np.array([0, 0x9234, 0x8567, 0], np.uint16).tobytes()
+        self.assertEqual(expected, self.artRef(data))
+        self.assertEqual(expected, Binary_Art(BinaryReader(BytesIO(data)), len(data)).pixels)
+
+    def test_art(self):
+        rng = random.Random(2)
+        for i in range(100):
+            width, height = rng.randint(1, 120), rng.randint(1, 120)
+            data = self.art(rng, width, height)
+            self.assertEqual(self.artRef(data), Binary_Art(BinaryReader(BytesIO(data)), len(data)).pixels, (width, height))
+
+    def test_land(self):
+        rng = random.Random(3)
+        for i in range(10):
+            data = rng.randbytes(44 * 44 << 1)
+            self.assertEqual(self.landRef(data), Binary_Land(BinaryReader(BytesIO(data)), len(data)).pixels)
+
+    def test_light(self):
+        rng = random.Random(4)
+        for i in range(10):
+            width, height = rng.randint(1, 60), rng.randint(1, 60)
+            data = rng.randbytes(width * height)
+            self.assertEqual(self.lightRef(data, width, height), Binary_Light(BinaryReader(BytesIO(data)), len(data), height << 16 | width).pixels)
+
+# TestUop - a synthetic gump UOP, whose packed width and height fill the compressed column
+class TestUop(TestCase):
+    def test_readUop(self):
+        hashes = { v: k for k, v in Binary_UO.getUopHashes('gumpartlegacymul', '.tga', 0xFFFF).items() }
+        gumps = [(5, 0xFFFF, 0x20, b'a' * 16), (0x1234, 0x8001, 0xFFFF, b'b' * 4), (0x20, 1, 2, b'c' * 8)]
+        start = 28 + 12 + 34 * len(gumps); records = b''; data = b''
+        for id, width, height, s in gumps:
+            records += struct.pack('<q3iQIh', start + len(data), 0, 8 + len(s), 8 + len(s), hashes[id], 0, 0)
+            data += struct.pack('<2I', width, height) + s
+        buf = struct.pack('<i2q2i', Binary_UO.UOP_MAGIC, 5, 28, len(gumps), len(gumps)) + struct.pack('<iq', len(gumps), 0) + records + data
+        source = SimpleNamespace(binPath = 'gumpartLegacyMUL.uop')
+        Binary_UO().read(source, BinaryReader(BytesIO(buf)), None)
+        files = source.files
+        self.assertIsInstance(files, FileTable)
+        self.assertEqual(['q', 'q', 'q', 'i', 'Q'], [s.typecode for s in (files.offset, files.fileSize, files.compressed, files.flags, files.hash)])
+        # sorted by id, each offset past the extra header, the packed value above 2**31 kept unsigned
+        expected = [(0x5, 'file00005.tex', start + 8, 24, 0xFFFF0020), (0x20, 'file00020.tex', start + 24 + 12 + 8, 16, 0x00010002), (0x1234, 'file01234.tex', start + 24 + 8, 12, 0x8001FFFF)]
+        self.assertEqual(expected, [(s.id, s.path, s.offset, s.fileSize, s.compressed) for s in files])
+        self.assertGreater(files[0].compressed, 2 ** 31)
+        # columns never written read back as 0, not None
+        self.assertEqual([(0, 0, 0, None, None)] * 3, [(s.packedSize, s.flags, s.hash, s.data, s.tag) for s in files])
+        # and survive the index cache columns
+        self.assertEqual([(s.id, s.offset, s.fileSize, s.compressed) for s in files], [(s.id, s.offset, s.fileSize, s.compressed) for s in FileTable.fromColumns(files.toColumns())])
+
+if __name__ == "__main__":
+    from gamex import getFamily
+
+    # get family
+    family = getFamily('Origin')
+    print(f'studio: {family.studio}')
+
+    file = ('game:/#UO', 'sample:0')
+
+    # get arc with game:/uri
+    archive = family.getArchive(file[0])
+    sample = archive.game.getSample(file[1][7:]).path if file[1].startswith('sample') else file[1]
+    print(f'arc: {archive}, {sample}')
+
+    # get file
+    data = archive.getData(sample)
+    print(f'dat: {data}')
+
+    main(verbosity=1)
@@ -0,0 +1,114 @@
+import random, struct, threading, zlib
+from io import BytesIO
+from unittest import TestCase, main, skipIf
+import zstandard
+try: import lz4.frame, lz4.block
+except ImportError: lz4 = None
+from openstk.core import BinaryReader
+from gamex.families.Uncore.formats.compression import Codec, ZlibCodec, ZstdCodec, Lz4Codec, LzssCodec, BlastCodec, codecs, getCodec, decompressZstd
+
+# TestCodec - decompressInto against decompress for each codec, through a small window
+class TestCodec(TestCase):
+    data = bytes(range(256)) * 100 + random.Random(1).randbytes(5000) + b'abc' * 10000
+    def setUp(self): self.window = Codec.window; Codec.window = 1000
+    def tearDown(self): Codec.window = self.window
+
+    # both paths give the data, into an exact, a larger and a smaller buffer; decoders sized by the caller fill the whole buffer
+    def roundTrip(self, codec: Codec, src: bytes, data: bytes = None, larger: bool = True, partial: bool = True) -> None:
+        data = data or self.data
+        self.assertEqual(data, bytes(codec.decompress(src, len(data))))
+        dst = bytearray(len(data))
+        self.assertEqual(len(data), codec.decompressInto(src, memoryview(dst)))
+        self.assertEqual(data, dst)
+        if larger:
+            # bytes past the written length are not defined, zstd may scratch them
+            dst = bytearray(len(data) + 10)
+            self.assertEqual(len(data), codec.decompressInto(src, memoryview(dst)))
+            self.assertEqual(data, dst[:len(data)])
+        if not partial: return
+        dst = bytearray(100)
+        self.assertEqual(100, codec.decompressInto(src, memoryview(dst)))
+        self.assertEqual(data[:100], dst)
+
+    def test_zlib(self):
+        self.roundTrip(ZlibCodec('zlib', 0), zlib.compress(self.data))
+        z = zlib.compressobj(wbits = -15); self.roundTrip(ZlibCodec('deflate', -15), z.compress(self.data) + z.flush())
+
+    def test_zstd(self): self.roundTrip(ZstdCodec('zstd'), zstandard.ZstdCompressor().compress(self.data))
+
+    # lz4 is optional, but encodes the frames and blocks decoded here
+    @skipIf(lz4 == None, 'lz4 not installed')
+    def test_lz4(self):
+        frame = lz4.frame.compress(self.data, block_size = lz4.frame.BLOCKSIZE_MAX64KB, block_linked = True, content_checksum = True, block_checksum = True, store_size = True)
+        block = lz4.block.compress(self.data, store_size = False)
+        self.roundTrip(Lz4Codec('lz4', True), frame)
+        # a native block decodes whole, then copies into dst
+        self.roundTrip(Lz4Codec('lz4block', False), block, partial = False)
+        # the pure-python decoders, linked blocks reaching back into earlier output
+        codec = Lz4Codec('lz4', True); codec.native = None
+        self.roundTrip(codec, frame, partial = False)
+        self.assertEqual(self.data, bytes(codec.decompress(frame)))
+        codec = Lz4Codec('lz4block', False); codec.native = None
+        self.roundTrip(codec, block, partial = False)
+        # a block has no unpacked size of its own
+        self.assertRaises(Exception, codec.decompress, block)
+        # incompressible data is stored as an uncompressed block of the frame, and copied
+        raw = random.Random(2).randbytes(300)
+        codec = Lz4Codec('lz4', True); codec.native = None
+        self.roundTrip(codec, lz4.frame.compress(raw, store_size = True), raw, partial = False)
+
+    def test_lzss(self):
+        # raw blocks, a negative big-endian length, until a zero length
+        src = b''.join(struct.pack('>h', -len(s)) + s for s in (self.data[:20000], self.data[20000:40000])) + b'\x00\x00'
+        self.roundTrip(LzssCodec('lzss'), src, self.data[:40000], larger = False, partial = False)
+
+    def test_blast(self):
+        # the reference vector of blast.c
+        self.roundTrip(BlastCodec('blast'), bytes.fromhex('00048224258f807f'), b'AIAIAIAIAIAIA', larger = False, partial = False)
+
+    def test_stats(self):
+        codec = ZlibCodec('zlib', 0); src = zlib.compress(self.data)
+        codec.decompress(src, len(self.data)); codec.decompressInto(src, memoryview(bytearray(len(self.data))))
+        stats = codec.stats()
+        self.assertEqual((2, 2 * len(src), 2 * len(self.data)), (stats['calls'], stats['bytesIn'], stats['bytesOut']))
+        codec.reset()
+        self.assertEqual(0, codec.stats()['calls'])
+        self.assertIsInstance(getCodec('lz4'), Lz4Codec)
+        self.assertRaises(Exception, getCodec, 'lzma')
+
+# TestZstd - a decompression context per thread, and family dictionaries
+class TestZstd(TestCase):
+    def test_threads(self):
+        codec = ZstdCodec('zstd'); data = TestCodec.data
+        src = [zstandard.ZstdCompressor(level = i + 1).compress(data[i:]) for i in range(8)]
+        barrier = threading.Barrier(8); contexts = [None] * 8; results = [None] * 8
+        # every thread decompresses while the others are alive, each reusing its own context
+        def _run(i: int) -> None:
+            barrier.wait()
+            z = codec.context()
+            for _ in range(4): results[i] = codec.decompress(src[i], len(data) - i); dst = bytearray(len(data) - i); codec.decompressInto(src[i], memoryview(dst))
+            contexts[i] = (z, codec.context() is z, bytes(dst))
+            barrier.wait()
+        threads = [threading.Thread(target = _run, args = (i,)) for i in range(8)]
+        for s in threads: s.start()
+        for s in threads: s.join()
+        self.assertEqual([data[i:] for i in range(8)], results)
+        self.assertEqual([(True, data[i:]) for i in range(8)], [s[1:] for s in contexts])
+        self.assertEqual(8, len({ id(s[0]) for s in contexts }))
+        self.assertEqual(64, codec.stats()['calls'])
+
+    def test_withDictionary(self):
+        dictionary = b'"LightmappedGeneric" { "$basetexture" "" "$surfaceprop" "" }' * 4
+        data = b'"LightmappedGeneric" { "$basetexture" "brick" "$surfaceprop" "stone" }'
+        src = zstandard.ZstdCompressor(dict_data = zstandard.ZstdCompressionDict(dictionary)).compress(data)
+        try:
+            codec = ZstdCodec.withDictionary('test', dictionary)
+            self.assertIs(codec, getCodec('zstd:test'))
+            self.assertEqual(data, codec.decompress(src, len(data)))
+            self.assertEqual(data, decompressZstd(BinaryReader(BytesIO(src)), len(src), len(data), 'zstd:test'))
+            # the plain codec cannot decode it
+            self.assertRaises(zstandard.ZstdError, getCodec('zstd').decompress, src, len(data))
+        finally: codecs.pop('zstd:test', None)
+
+if __name__ == "__main__":
+    main(verbosity=1)
@@ -1,16 +1,210 @@
-from gamex import family
+import os, struct, asyncio, tempfile, zlib
+from hashlib import md5
+from unittest import TestCase, main
+from types import SimpleNamespace
+from openstk.vfx import DirectoryFileSystem
+from gamex.core.binary import BinaryState
+from gamex.core.cache import IndexCache
+from gamex.families.Valve.formats.binary import Binary_Vpk
+from gamex.families.GameX_Valve import ValveArchive
+import pathlib
+from gamex.core.app.exportManager import ExportManager
 
-# get family
-family = family.getFamily('Valve')
-print(f'studio: {family.studio}')
+# synthetic VPK v2 packages, entries of (path, data, archive index, preload length), data of the dir archive at index 0x7FFF
+def vpk(name: str, entries: list[tuple[str, bytes, int, int]], line: int = 64) -> dict[str, bytes]:
+    archives = {}; tree = {}
+    for path, data, index, preload in entries:
+        directory, _, fileName = path.rpartition('/'); fileName, _, typeName = fileName.rpartition('.')
+        body = data[preload:]; archive = archives.setdefault(index, bytearray())
+        record = zstring(fileName) + struct.pack('<IHHIIH', zlib.crc32(data), preload, index, len(archive) if body else 0, len(body), 0xFFFF) + data[:preload]
+        tree.setdefault(typeName, {}).setdefault(directory or ' ', []).append(record); archive += body
+    tree = b''.join(zstring(k) + b''.join(zstring(d) + b''.join(z) + b'\x00' for d, z in v.items()) + b'\x00' for k, v in tree.items()) + b'\x00'
+    # cache lines of each archive, the dir archive by its data section
+    md5s = b''.join(struct.pack('<3I', k, i, len(v[i:i + line])) + md5(v[i:i + line]).digest() for k, v in sorted(archives.items()) for i in range(0, len(v), line))
+    dirData = bytes(archives.get(0x7FFF, b''))
+    head = struct.pack('<7I', Binary_Vpk.MAGIC, 2, len(tree), len(dirData), len(md5s), 48, 0) + tree + dirData + md5s + md5(tree).digest() + md5(md5s).digest()
+    files = { f'{name}_dir.vpk': head + md5(head).digest() }
+    files.update((f'{name}_{k:03d}.vpk', bytes(v)) for k, v in archives.items() if k != 0x7FFF)
+    return files
+def zstring(s: str) -> bytes: return s.encode('utf-8') + b'\x00'
 
-file = ('game:/#HL', 'COLOR.PAL')
+# a package of a root file, preloaded and split entries, and two chunk archives
+ENTRIES = [
+    ('readme.txt', b'readme' * 20, 0x7FFF, 0),
+    ('materials/a.vmt', b'"LightmappedGeneric" {}', 0x7FFF, 23),
+    ('materials/b.vmt', b'"UnlitGeneric" { "$basetexture" "b" }' * 3, 0x7FFF, 10),
+    ('materials/c.vtf', bytes(range(256)) * 2, 0, 0),
+    ('models/d.mdl', b'IDST' + bytes(200), 0, 16),
+    ('models/e.mdl', b'IDST' + bytes(range(100)), 1, 0)]
 
-# get arc with game:/uri
-archive = family.getArchive(file[0])
-sample = archive.game.getSample(file[1][7:]).path if file[1].startswith('sample') else file[1]
-print(f'arc: {archive}, {sample}')
+# LocalFileSystem - a directory of packages
+class LocalFileSystem(DirectoryFileSystem):
+    def __init__(self, root: str): self.root = root
+    def fileExists(self, path: str) -> bool: return os.path.exists(os.path.join(self.root, path))
+    def fileInfo(self, path: str) -> tuple[str, int]: path = os.path.join(self.root, path); return (path, os.path.getsize(path)) if os.path.exists(path) else (None, 0)
+    def open(self, path: str, mode: str = None) -> object: return open(os.path.join(self.root, path), 'rb')
 
-# get file
-data = archive.getData(sample)
-print(f'dat: {data}')
\ No newline at end of file
+# VpkCase - packages written to a temporary directory and opened as archives
+class VpkCase(TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory(); self.vfx = LocalFileSystem(self.dir.name); self.arcs = []
+        self.root = IndexCache.root; IndexCache.root = os.path.join(self.dir.name, 'index')
+    def tearDown(self):
+        for s in self.arcs: s.close()
+        IndexCache.root = self.root
+        self.dir.cleanup()
+    # None opens the files already written
+    def archive(self, files: dict[str, bytes], name: str = 'pak01_dir.vpk', **options) -> ValveArchive:
+        for k, v in (files or {}).items():
+            with open(os.path.join(self.dir.name, k), 'wb') as f: f.write(v)
+        arc = ValveArchive(None, BinaryState(self.vfx, SimpleNamespace(id = 'HL2', engine = ('Source', None), family = None), None, name))
+        arc.useIndexCache = False
+        for k, v in options.items(): setattr(arc, k, v)
+        self.arcs.append(arc)
+        return arc
+
+# TestVpk
+class TestVpk(VpkCase):
+    # the entries and state of an opened archive, and the data of each entry
+    @staticmethod
+    def table(arc: ValveArchive) -> tuple[list, tuple, list]:
+        files = [tuple(getattr(s, k) for k in IndexCache.FILE_FIELDS) for s in arc.files]
+        return files, tuple(getattr(arc, k) for k in IndexCache.STATE_FIELDS), [asyncio.run(arc.getData(s)).read() for s in arc.files]
+
+    def test_indexCache(self):
+        fresh = self.archive(vpk('pak01', ENTRIES)).open()
+        expected = self.table(fresh)
+        self.assertEqual([s[1] for s in ENTRIES], expected[2])
+        # a cold open stores the index, a warm one loads it without reading the archive
+        cold = self.archive(None, useIndexCache = True).open()
+        self.assertTrue(os.path.exists(IndexCache.key(cold)[0]))
+        self.assertEqual(expected, self.table(cold))
+        warm = self.archive(None, useIndexCache = True)
+        warm.read = lambda tag = None: self.fail('index rebuilt')
+        self.assertEqual(expected, self.table(warm.open()))
+
+    def test_export(self):
+        arc = self.archive(vpk('pak01', ENTRIES)).open()
+        # a pipelined export of two jobs writes the same files as a single job, preloaded and chunked entries alike
+        for jobs in (1, 2): asyncio.run(ExportManager.exportPak2Async(arc, os.path.join(self.dir.name, str(jobs)), None, 0, None, None, lambda file, msg: self.fail(msg), jobs))
+        exported = [{ s.relative_to(root).as_posix(): s.read_bytes() for s in root.rglob('*') if s.is_file() } for root in (pathlib.Path(self.dir.name, '1'), pathlib.Path(self.dir.name, '2'))]
+        self.assertEqual({ s[0]: s[1] for s in ENTRIES }, exported[0])
+        self.assertEqual(exported[0], exported[1])
+
+# TestVerify
+class TestVerify(VpkCase):
+    # a package with one byte flipped in a file
+    def corrupt(self, name: str, position: int) -> ValveArchive:
+        files = vpk('pak01', ENTRIES)
+        data = bytearray(files[name]); data[position] ^= 0xFF; files[name] = bytes(data)
+        return self.archive(files).open()
+
+    def test_ok(self):
+        arc = self.archive(vpk('pak01', ENTRIES)).open()
+        report = arc.arcBinary.verify(arc, bufferSize = 16)
+        self.assertTrue(report.ok)
+        self.assertEqual(([], []), (report.errors, report.files))
+        self.assertEqual('Report:ok', repr(report))
+
+    def test_chunkLine(self):
+        # the second cache line of chunk 000 lies in c.vtf
+        arc = self.corrupt('pak01_000.vpk', 100)
+        report = arc.arcBinary.verify(arc, bufferSize = 16, workers = 2)
+        self.assertFalse(report.ok)
+        self.assertEqual(['Cache line checksum mismatch (000:64+64)'], report.errors)
+        self.assertEqual(['materials/c.vtf'], report.files)
+        self.assertTrue(arc.arcBinary.verify(arc, archives = False).ok)
+
+    def test_dirLine(self):
+        # the dir data follows the header and tree, and is also covered by the package checksum
+        treeSize = struct.unpack_from('<I', vpk('pak01', ENTRIES)['pak01_dir.vpk'], 8)[0]
+        arc = self.corrupt('pak01_dir.vpk', 28 + treeSize + 5)
+        report = arc.arcBinary.verify(arc)
+        self.assertEqual(2, len(report.errors))
+        self.assertTrue(report.errors[0].startswith('Package checksum mismatch'))
+        self.assertEqual('Cache line checksum mismatch (dir:0+64)', report.errors[1])
+        self.assertEqual(['readme.txt'], report.files)
+
+    def test_missingChunk(self):
+        arc = self.archive(vpk('pak01', ENTRIES)).open()
+        os.remove(os.path.join(self.dir.name, 'pak01_001.vpk'))
+        report = arc.arcBinary.verify(arc)
+        self.assertEqual(['Cache line checksum mismatch (001:0+64)', 'Cache line checksum mismatch (001:64+40)'], report.errors)
+        self.assertEqual(['models/e.mdl'], report.files)
+
+# TestRangeOrder
+class TestRangeOrder(VpkCase):
+    def test_rangeOrder(self):
+        source = SimpleNamespace(binPath = 'pak01_dir.vpk')
+        paths = [Binary_Vpk.archivePath(source, s) for s in (1000, 999, 0, 0x7FFF)]
+        self.assertEqual(['pak01_1000.vpk', 'pak01_999.vpk', 'pak01_000.vpk', None], paths)
+        # the dir archive first, then chunks by index, where a string sort puts _1000 before _999
+        paths[-1] = source.binPath
+        self.assertEqual([1000, 999, 0, -1], [Binary_Vpk().rangeOrder(source, s) for s in paths])
+        self.assertEqual(['pak01_dir.vpk', 'pak01_000.vpk', 'pak01_999.vpk', 'pak01_1000.vpk'], sorted(paths, key = lambda s: Binary_Vpk().rangeOrder(source, s)))
+
+    def test_planRanges(self):
+        arc = self.archive(vpk('pak01', ENTRIES)).open()
+        groups, rest = arc.planRanges(list(arc.files)[::-1])
+        # preloaded entries still have a range, of their remaining bytes, empty when fully preloaded
+        self.assertEqual([], rest)
+        self.assertEqual([('pak01_dir.vpk', ['readme.txt', 'materials/b.vmt']), ('pak01_000.vpk', ['materials/c.vtf', 'models/d.mdl']), ('pak01_001.vpk', ['models/e.mdl'])],
+            [(path, [s[3].path for s in z if s[2]]) for path, _, _, z in groups])
+
+# TestReadTree - the bulk tree parse against a record-by-record walk
+class TestReadTree(VpkCase):
+    @staticmethod
+    def walk(tree: bytes) -> list[tuple]:
+        entries = []; pos = 0
+        def name() -> str:
+            nonlocal pos
+            end = tree.index(b'\x00', pos); s = tree[pos:end].decode('utf-8'); pos = end + 1
+            return s
+        while (typeName := name()):
+            while (directoryName := name()):
+                while (fileName := name()):
+                    hash, preload, id, offset, fileSize, terminator = struct.unpack_from('<IHHIIH', tree, pos)
+                    entries.append((f'{directoryName}/{fileName}.{typeName}'.lstrip(' /'), hash, id, offset, fileSize, tree[pos + 18:pos + 18 + preload] or None, pos)); pos += 18 + preload
+        return entries
+
+    def test_readTree(self):
+        files = vpk('pak01', ENTRIES)
+        treeSize = struct.unpack_from('<I', files['pak01_dir.vpk'], 8)[0]
+        tree = files['pak01_dir.vpk'][28:28 + treeSize]
+        expected = self.walk(tree)
+        self.assertEqual(sorted(s[0] for s in ENTRIES), sorted(s[0] for s in expected))
+        paths, records, entries, _ = Binary_Vpk.readTree(tree)
+        self.assertEqual([s[0] for s in expected], paths)
+        self.assertEqual([s[1:5] for s in expected], [tuple(int(z) for z in s) for s in entries[['hash', 'id', 'offset', 'fileSize']].tolist()])
+        self.assertEqual([s[6] for s in expected], records.tolist())
+        # the file table, with the preload bytes as sparse data and the dir data offset as the tag
+        arc = self.archive(files).open()
+        self.assertEqual([s[:6] for s in expected], [(s.path, s.hash, s.id, s.offset, s.fileSize, s.data) for s in arc.files])
+        self.assertEqual(28 + treeSize, arc.tag)
+        self.assertEqual(sorted(i for i, s in enumerate(expected) if s[5]), sorted(arc.files.data))
+
+    def test_badTree(self):
+        tree = zstring('txt') + zstring(' ') + zstring('a') + struct.pack('<IHHIIH', 0, 0, 0x7FFF, 0, 0, 0xFFFF) + b'\x00\x00\x00'
+        self.assertEqual(['a.txt'], Binary_Vpk.readTree(tree)[0])
+        self.assertRaisesRegex(Exception, 'Truncated', Binary_Vpk.readTree, tree[:20])
+        self.assertRaisesRegex(Exception, 'Invalid terminator, was 0xFFFE', Binary_Vpk.readTree, tree.replace(b'\xff\xff\x00', b'\xfe\xff\x00'))
+
+if __name__ == "__main__":
+    from gamex import getFamily
+
+    # get family
+    family = getFamily('Valve')
+    print(f'studio: {family.studio}')
+
+    file = ('game:/#HL', 'COLOR.PAL')
+
+    # get arc with game:/uri
+    archive = family.getArchive(file[0])
+    sample = archive.game.getSample(file[1][7:]).path if file[1].startswith('sample') else file[1]
+    print(f'arc: {archive}, {sample}')
+
+    # get file
+    data = archive.getData(sample)
+    print(f'dat: {data}')
+
+    main(verbosity=1)